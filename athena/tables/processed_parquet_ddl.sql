@@ -0,0 +1,20 @@
+CREATE EXTERNAL TABLE `processed_parquet`(
+  `artist` string, 
+  `album_name` string, 
+  `track_name` string, 
+  `track_id` string, 
+  `duration_ms` bigint, 
+  `explicit` boolean, 
+  `album_release_date` string, 
+  `track_popularity` bigint, 
+  `album_id` string, 
+  `duration_minutes` double, 
+  `length_category` string, 
+  `album_track_count` bigint, 
+  `album_popularity_rank` bigint)
+STORED AS PARQUET
+LOCATION
+  's3://mani-spotify-etl-data/spotify/processed_parquet/'
+TBLPROPERTIES (
+  'classification'='parquet', 
+  'parquet.compression'='ZSTD')
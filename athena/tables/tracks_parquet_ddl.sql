@@ -0,0 +1,17 @@
+CREATE EXTERNAL TABLE `tracks_parquet`(
+  `artist` string, 
+  `album_name` string, 
+  `track_name` string, 
+  `track_id` string, 
+  `duration_ms` bigint, 
+  `explicit` boolean, 
+  `duration_minutes` double, 
+  `length_category` string, 
+  `album_track_count` bigint, 
+  `album_popularity_rank` bigint)
+STORED AS PARQUET
+LOCATION
+  's3://mani-spotify-etl-data/spotify/tracks_parquet/'
+TBLPROPERTIES (
+  'classification'='parquet', 
+  'parquet.compression'='ZSTD')
@@ -0,0 +1,17 @@
+CREATE EXTERNAL TABLE `transformed_parquet`(
+  `artist` string, 
+  `artist_id` string, 
+  `album_name` string, 
+  `album_id` string, 
+  `track_name` string, 
+  `track_id` string, 
+  `duration_ms` bigint, 
+  `explicit` boolean, 
+  `duration_min` double, 
+  `load_timestamp_utc` string)
+STORED AS PARQUET
+LOCATION
+  's3://mani-spotify-etl-data/spotify/transformed_parquet/'
+TBLPROPERTIES (
+  'classification'='parquet', 
+  'parquet.compression'='ZSTD')
@@ -0,0 +1,175 @@
+"""
+Throughput benchmark for the transform stage (src/transform/transform.py).
+
+Compares the vectorized transform_df against the original per-row
+apply/map implementation on synthetic raw track data. With --backends,
+times each execution backend end to end (CSV read + transform) instead;
+with --workers, times transform() against transform_parallel() file to
+file.
+
+Usage:
+    python benchmarks/bench_transform.py                 # 1M and 10M rows
+    python benchmarks/bench_transform.py --rows 100000   # quick run
+    python benchmarks/bench_transform.py --skip-legacy
+    python benchmarks/bench_transform.py --backends pandas,polars,pyarrow
+    python benchmarks/bench_transform.py --workers 1,2,4,8
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from transform.backends import run_backend  # noqa: E402
+from transform.transform import (  # noqa: E402
+    FINAL_COLUMNS,
+    transform,
+    transform_df,
+    transform_parallel,
+)
+
+
+def make_raw_tracks(n: int, n_albums: int = 5_000, seed: int = 0) -> pd.DataFrame:
+    """Synthetic raw extract: ~10% duplicate track_ids, skewed album sizes."""
+    rng = np.random.default_rng(seed)
+    album_names = np.array([f"Album {i}" for i in range(n_albums)], dtype=object)
+    track_ids = "t" + pd.Series(rng.integers(0, int(n * 0.9) + 1, n)).astype(str)
+
+    return pd.DataFrame(
+        {
+            "artist": rng.choice(np.array(["Artist A", "Artist B", "Artist C"], dtype=object), n),
+            "album_name": album_names[rng.zipf(1.3, n) % n_albums],
+            "track_name": track_ids.str.replace("t", "Song ", regex=False),
+            "track_id": track_ids,
+            "duration_ms": rng.integers(60_000, 420_000, n),
+            "explicit": rng.random(n) < 0.3,
+        }
+    )
+
+
+def legacy_transform_df(df: pd.DataFrame) -> pd.DataFrame:
+    """Original implementation: per-row apply + two map passes."""
+    df = df.dropna(subset=["track_id"])
+    df = df.drop_duplicates(subset=["track_id"])
+    df = df.rename(columns={"album": "album_name", "track": "track_name"})
+    df["duration_minutes"] = (df["duration_ms"] / 1000 / 60).round(2)
+
+    def categorize_length(m):
+        if m < 3:
+            return "Short (<3 min)"
+        elif 3 <= m <= 5:
+            return "Medium (3-5 min)"
+        else:
+            return "Long (>5 min)"
+
+    df["length_category"] = df["duration_minutes"].apply(categorize_length)
+    album_track_counts = df.groupby("album_name")["track_id"].nunique()
+    df["album_track_count"] = df["album_name"].map(album_track_counts)
+    album_rank = (
+        album_track_counts
+        .sort_values(ascending=False)
+        .rank(method="dense", ascending=False)
+    )
+    df["album_popularity_rank"] = df["album_name"].map(album_rank).astype(int)
+    return df[FINAL_COLUMNS]
+
+
+def _time(fn, df: pd.DataFrame) -> tuple[float, pd.DataFrame]:
+    start = time.perf_counter()
+    out = fn(df.copy())
+    return time.perf_counter() - start, out
+
+
+def bench_backends(n: int, backends: list[str]):
+    """End-to-end (read CSV + transform) timing per backend."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "tracks_raw.csv")
+        make_raw_tracks(n).to_csv(path, index=False)
+
+        reference = None
+        for backend in backends:
+            start = time.perf_counter()
+            try:
+                out = run_backend(path, backend)
+            except ImportError as e:
+                print(f"{n:>12,} {backend:>12}   skipped ({e.name} not installed)")
+                continue
+            seconds = time.perf_counter() - start
+            print(f"{n:>12,} {backend:>12} {seconds:>10.3f} {n / seconds:>14,.0f}")
+
+            csv_text = out.to_csv(index=False)
+            if reference is None:
+                reference = csv_text
+            elif csv_text != reference:
+                raise AssertionError(f"{backend} output differs from {backends[0]}")
+
+
+def bench_workers(n: int, workers: list[int]):
+    """File-to-file timing of transform() vs transform_parallel() per worker count."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "tracks_raw.csv")
+        make_raw_tracks(n).to_csv(path, index=False)
+        expected = os.path.join(tmp, "expected.csv")
+
+        start = time.perf_counter()
+        transform(path, expected)
+        seconds = time.perf_counter() - start
+        print(f"{n:>12,} {'transform':>12} {seconds:>10.3f} {n / seconds:>14,.0f}")
+        with open(expected, "rb") as f:
+            reference = f.read()
+
+        for w in workers:
+            out = os.path.join(tmp, f"parallel_{w}.csv")
+            start = time.perf_counter()
+            transform_parallel(path, out, workers=w)
+            seconds = time.perf_counter() - start
+            print(f"{n:>12,} {f'parallel x{w}':>12} {seconds:>10.3f} {n / seconds:>14,.0f}")
+            with open(out, "rb") as f:
+                if f.read() != reference:
+                    raise AssertionError(f"transform_parallel(workers={w}) output differs")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", default="1000000,10000000",
+                        help="comma-separated row counts (default: 1M,10M)")
+    parser.add_argument("--skip-legacy", action="store_true",
+                        help="only time the vectorized implementation")
+    parser.add_argument("--backends",
+                        help="comma-separated transform backends to compare end to end")
+    parser.add_argument("--workers",
+                        help="comma-separated worker counts for transform_parallel")
+    args = parser.parse_args()
+
+    print(f"{'rows':>12} {'impl':>12} {'seconds':>10} {'rows/sec':>14}")
+    for n in (int(x) for x in args.rows.split(",")):
+        if args.backends:
+            bench_backends(n, args.backends.split(","))
+            continue
+        if args.workers:
+            bench_workers(n, [int(w) for w in args.workers.split(",")])
+            continue
+
+        raw = make_raw_tracks(n)
+
+        impls = [("vectorized", transform_df)]
+        if not args.skip_legacy:
+            impls.append(("legacy", legacy_transform_df))
+
+        outputs = {}
+        for name, fn in impls:
+            seconds, outputs[name] = _time(fn, raw)
+            print(f"{n:>12,} {name:>12} {seconds:>10.3f} {n / seconds:>14,.0f}")
+
+        for name, out in outputs.items():
+            pd.testing.assert_frame_equal(out, outputs["vectorized"])
+
+
+if __name__ == "__main__":
+    main()
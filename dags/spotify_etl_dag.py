@@ -28,7 +28,7 @@ for path in (PROJECT_ROOT, SRC_DIR):
 
 # ✅ Import using ingestion.* (because src is on sys.path and
 #    your code lives in src/ingestion/*.py)
-from ingestion.extract_local import extract
+from ingestion.extract_local import extract, extract_incremental
 from ingestion.upload_to_s3 import upload_csv_to_s3
 
 # ────────────────────────────────────────────────────────────
@@ -39,6 +39,10 @@ from ingestion.upload_to_s3 import upload_csv_to_s3
 S3_BUCKET_NAME = "mani-spotify-etl-data"
 S3_PROCESSED_PREFIX = "spotify/processed"
 
+# Incremental extract: album index location (local path or s3://...).
+# Empty = full extract every run.
+SPOTIFY_ALBUM_INDEX = os.environ.get("SPOTIFY_ALBUM_INDEX", "")
+
 # Glue crawler config
 GLUE_CRAWLER_NAME = "spotify-etl-crawler"
 
@@ -66,8 +70,15 @@ AWS_REGION = "us-east-2"
 def run_spotify_extract(**context):
     """
     Run local Spotify extract and write CSV to container.
+
+    With SPOTIFY_ALBUM_INDEX set, only new albums are fetched and the
+    full snapshot is rebuilt from the album index.
     """
-    df = extract()
+    if SPOTIFY_ALBUM_INDEX:
+        delta, df = extract_incremental(SPOTIFY_ALBUM_INDEX, snapshot=True)
+        print(f"✅ Incremental extract: {len(delta)} new tracks")
+    else:
+        df = extract()
 
     output_dir = "/opt/airflow/dags/output"
     os.makedirs(output_dir, exist_ok=True)
@@ -1,12 +1,21 @@
 import os
 import io
 import json
+import asyncio
+import bisect
 import logging
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import csv
+import gzip
+from itertools import islice
 
 import boto3
 import requests
+from requests.adapters import HTTPAdapter
 
 # ---------- LOGGING ----------
 logger = logging.getLogger()
@@ -29,16 +38,186 @@ if not ARTIST_IDS:
         "No ARTIST_IDS provided. Set ARTIST_IDS env var (comma-separated artist IDs)."
     )
 
+# Spotify rate limiting (shared by every request in this container)
+SPOTIFY_MAX_RPS = float(os.environ.get("SPOTIFY_MAX_RPS", "10"))
+SPOTIFY_MAX_RETRIES = int(os.environ.get("SPOTIFY_MAX_RETRIES", "5"))
+
+# Max artists fetched at the same time inside one invocation
+FETCH_CONCURRENCY = int(os.environ.get("FETCH_CONCURRENCY", "8"))
+
+# Sharded fan-out: coordinator splits ARTIST_IDS over worker invocations
+SHARD_COUNT = int(os.environ.get("SHARD_COUNT", "4"))
+SHARD_STRATEGY = os.environ.get("SHARD_STRATEGY", "hash")  # "hash" or "size"
+SHARD_PREFIX = os.environ.get("SHARD_PREFIX", "spotify/shards/")
+WORKER_FUNCTION_NAME = os.environ.get(
+    "WORKER_FUNCTION_NAME", os.environ.get("AWS_LAMBDA_FUNCTION_NAME", "")
+)
+
+# Keep-alive pool size for Spotify HTTPS connections
+HTTP_POOL_SIZE = int(os.environ.get("HTTP_POOL_SIZE", "10"))
+
+# Persisted album aggregates (S3 prefix in S3_BUCKET_NAME). When set, each
+# run transforms only new tracks and emits updates for earlier ones.
+ALBUM_STATE_PREFIX = os.environ.get("ALBUM_STATE_PREFIX", "")
+# Album/rank updates have their own schema: keep them out of S3_PREFIX,
+# which the transform Lambda, Athena and Snowflake all read as tracks
+ALBUM_UPDATES_PREFIX = os.environ.get("ALBUM_UPDATES_PREFIX", "spotify/album_updates/")
+
+# Output format of upload_to_s3: "csv", or "parquet" (needs a pyarrow layer).
+# Parquet goes to its own prefix so the CSV Athena table stays readable.
+OUTPUT_FORMAT = os.environ.get("OUTPUT_FORMAT", "csv")
+PARQUET_COMPRESSION = os.environ.get("PARQUET_COMPRESSION", "zstd")  # or "snappy"
+PARQUET_PREFIX = os.environ.get("PARQUET_PREFIX", "spotify/processed_parquet/")
+# Album updates have their own schema, so they stay out of the tracks tables
+ALBUM_UPDATES_PARQUET_PREFIX = os.environ.get(
+    "ALBUM_UPDATES_PARQUET_PREFIX", "spotify/album_updates_parquet/"
+)
+
+# Streaming CSV upload: multipart part size (S3 minimum is 5 MiB) and gzip
+UPLOAD_PART_MB = int(os.environ.get("UPLOAD_PART_MB", "8"))
+UPLOAD_GZIP = os.environ.get("UPLOAD_GZIP", "false").lower() == "true"
+
+# Refresh the cached token this many seconds before Spotify expires it
+TOKEN_EXPIRY_MARGIN_SECONDS = 60
+
 s3_client = boto3.client("s3")
 
+# One pooled session per container: warm invocations reuse its TCP+TLS
+# connections instead of a new handshake per request.
+http_session = requests.Session()
+http_session.mount(
+    "https://",
+    HTTPAdapter(pool_connections=4, pool_maxsize=HTTP_POOL_SIZE),
+)
+
+# Module-level token cache, also survives across warm invocations
+_token_cache = {"access_token": None, "expires_at": 0.0}
+_token_stats = {"hits": 0, "misses": 0}
+
+
+# ---------- RATE LIMITING ----------
+# Same token bucket as src/ingestion/rate_limit.py; duplicated because
+# this Lambda ships as a single file with only the requests layer.
+def retry_after_seconds(exc: Exception, attempt: int):
+    """Seconds to wait before retrying a 429 HTTPError, or None for other errors."""
+    response = getattr(exc, "response", None)
+    if getattr(response, "status_code", None) != 429:
+        return None
+    try:
+        return max(float(response.headers.get("Retry-After")), 0.0)
+    except (TypeError, ValueError):
+        return float(2 ** attempt)
+
+
+class RateLimiter:
+    """Thread-safe token bucket with Retry-After handling and adaptive backoff."""
+
+    def __init__(self, rate: float, max_retries: int = 5,
+                 clock=time.monotonic, sleep=time.sleep):
+        self.max_retries = max_retries
+        self._lock = threading.Lock()
+        self.set_rate(rate)
+
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = float(self.burst)
+        self._updated = clock()
+        self._blocked_until = 0.0
+        self.reset_counters()
+
+    def set_rate(self, rate: float):
+        """(Re)configure the request rate."""
+        with self._lock:
+            self.max_rate = float(rate)
+            self.rate = float(rate)
+            self.min_rate = max(self.max_rate / 16, 0.1)
+            self.burst = max(1, int(rate))
+
+    def reset_counters(self):
+        self.requests = 0
+        self.throttled = 0
+        self.retried = 0
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = self._clock()
+                if now < self._blocked_until:
+                    wait = self._blocked_until - now
+                else:
+                    elapsed = max(0.0, now - self._updated)
+                    self._tokens = min(self.burst, self._tokens + elapsed * self.rate)
+                    self._updated = max(self._updated, now)
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        self.requests += 1
+                        return
+                    wait = (1 - self._tokens) / self.rate
+            # floor keeps float rounding from spinning on a sub-µs wait
+            self._sleep(max(wait, 0.001))
+
+    def on_throttled(self, retry_after: float):
+        with self._lock:
+            self.throttled += 1
+            self._blocked_until = max(self._blocked_until, self._clock() + retry_after)
+            self._tokens = 0.0
+            self._updated = self._blocked_until
+            self.rate = max(self.min_rate, self.rate / 2)
+
+    def on_success(self):
+        if self.rate < self.max_rate:
+            with self._lock:
+                self.rate = min(self.max_rate, self.rate + self.max_rate / 10)
+
+    def call(self, fn, *args, **kwargs):
+        attempt = 0
+        while True:
+            self.acquire()
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as exc:
+                retry_after = retry_after_seconds(exc, attempt)
+                if retry_after is None or attempt >= self.max_retries:
+                    raise
+                self.on_throttled(retry_after)
+                with self._lock:
+                    self.retried += 1
+                attempt += 1
+                continue
+
+            self.on_success()
+            return result
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "throttled": self.throttled,
+            "retried": self.retried,
+            "current_rate": round(self.rate, 2),
+        }
+
+
+rate_limiter = RateLimiter(rate=SPOTIFY_MAX_RPS, max_retries=SPOTIFY_MAX_RETRIES)
+
 
 # ---------- SPOTIFY AUTH ----------
 def get_spotify_token() -> str:
+    """
+    Return a client-credentials token, reusing the cached one until
+    shortly before its expires_in deadline.
+    """
+    now = time.time()
+    if _token_cache["access_token"] and now < _token_cache["expires_at"]:
+        _token_stats["hits"] += 1
+        return _token_cache["access_token"]
+
+    _token_stats["misses"] += 1
+
     token_url = "https://accounts.spotify.com/api/token"
     payload = {"grant_type": "client_credentials"}
     auth = (SPOTIFY_CLIENT_ID, SPOTIFY_CLIENT_SECRET)
 
-    resp = requests.post(token_url, data=payload, auth=auth)
+    resp = http_session.post(token_url, data=payload, auth=auth)
 
     if not resp.ok:
         logger.error(
@@ -54,176 +233,837 @@ def get_spotify_token() -> str:
             f"Spotify token response missing access_token: {json.dumps(data)}"
         )
 
+    expires_in = int(data.get("expires_in", 3600))
+    _token_cache["access_token"] = token
+    _token_cache["expires_at"] = now + max(expires_in - TOKEN_EXPIRY_MARGIN_SECONDS, 0)
+
     return token
 
 
+def reset_token_cache():
+    _token_cache["access_token"] = None
+    _token_cache["expires_at"] = 0.0
+
+
+# ---------- HTTP CONNECTION STATS ----------
+def connection_stats() -> dict:
+    """Requests sent and connections opened so far by http_session's pools."""
+    requests_sent = 0
+    connections_opened = 0
+
+    for adapter in http_session.adapters.values():
+        pools = adapter.poolmanager.pools
+        for pool_key in pools.keys():
+            pool = pools.get(pool_key)
+            if pool is None:
+                continue
+            requests_sent += pool.num_requests
+            connections_opened += pool.num_connections
+
+    return {"requests": requests_sent, "connections": connections_opened}
+
+
+def _invocation_stats(conn_before: dict, tokens_before: dict) -> dict:
+    conn_after = connection_stats()
+    http_requests = conn_after["requests"] - conn_before["requests"]
+    new_connections = conn_after["connections"] - conn_before["connections"]
+
+    return {
+        "http_requests": http_requests,
+        "new_connections": new_connections,
+        "reused_connections": max(http_requests - new_connections, 0),
+        "token_cache_hits": _token_stats["hits"] - tokens_before["hits"],
+        "token_cache_misses": _token_stats["misses"] - tokens_before["misses"],
+    }
+
+
 # ---------- SPOTIFY DATA FETCH ----------
-def get_artist_top_tracks(artist_id: str, token: str):
-    url = f"https://api.spotify.com/v1/artists/{artist_id}/top-tracks"
+def spotify_get(url: str, token: str, params: dict | None = None, limiter=None) -> dict:
+    """GET a Spotify API URL through limiter (default: the shared rate limiter)."""
     headers = {"Authorization": f"Bearer {token}"}
+
+    def _get():
+        resp = http_session.get(url, headers=headers, params=params)
+        resp.raise_for_status()
+        return resp.json()
+
+    return (limiter or rate_limiter).call(_get)
+
+
+def get_artist_top_tracks(artist_id: str, token: str, limiter=None):
+    url = f"https://api.spotify.com/v1/artists/{artist_id}/top-tracks"
     params = {"market": "US"}
 
-    resp = requests.get(url, headers=headers, params=params)
-    resp.raise_for_status()
+    return spotify_get(url, token, params, limiter).get("tracks", [])
 
-    return resp.json().get("tracks", [])
 
+def track_to_row(t: dict) -> dict:
+    return {
+        "artist": ", ".join([a["name"] for a in t.get("artists", [])]),
+        "album_name": t.get("album", {}).get("name"),
+        "track_name": t.get("name"),
+        "track_id": t.get("id"),
+        "duration_ms": t.get("duration_ms"),
+        "explicit": t.get("explicit"),
+        "album_release_date": t.get("album", {}).get("release_date"),
+        "track_popularity": t.get("popularity"),
+        "album_id": t.get("album", {}).get("id"),
+    }
 
-def fetch_rows(token: str):
-    """Return list[dict] of all tracks for all artists."""
-    all_rows = []
 
-    for artist_id in ARTIST_IDS:
-        tracks = get_artist_top_tracks(artist_id, token)
-        logger.info(f"Artist {artist_id} - fetched {len(tracks)} tracks")
+async def fetch_rows_async(token: str, artist_ids: list[str], concurrency: int,
+                           limiter=None):
+    """
+    Fetch top tracks for all artists concurrently, at most `concurrency`
+    requests in flight. Returns (rows, failures); one artist failing does
+    not cancel the others. Rows keep artist_ids order.
+    """
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(concurrency)
 
-        for t in tracks:
-            row = {
-                "artist": ", ".join([a["name"] for a in t.get("artists", [])]),
-                "album_name": t.get("album", {}).get("name"),
-                "track_name": t.get("name"),
-                "track_id": t.get("id"),
-                "duration_ms": t.get("duration_ms"),
-                "explicit": t.get("explicit"),
-                "album_release_date": t.get("album", {}).get("release_date"),
-                "track_popularity": t.get("popularity"),
-                "album_id": t.get("album", {}).get("id"),
-            }
-            all_rows.append(row)
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
 
-    return all_rows
+        async def _fetch(artist_id):
+            async with semaphore:
+                return await loop.run_in_executor(
+                    pool, get_artist_top_tracks, artist_id, token, limiter
+                )
+
+        results = await asyncio.gather(
+            *(_fetch(a) for a in artist_ids), return_exceptions=True
+        )
+
+    rows = []
+    failures = []
+
+    for artist_id, result in zip(artist_ids, results):
+        if isinstance(result, Exception):
+            logger.warning(f"Artist {artist_id} - fetch failed: {result}")
+            failures.append({"artist_id": artist_id, "error": str(result)})
+            continue
+
+        logger.info(f"Artist {artist_id} - fetched {len(result)} tracks")
+        rows.extend(track_to_row(t) for t in result)
+
+    return rows, failures
+
+
+def fetch_rows(token: str, failures: list | None = None,
+               concurrency: int | None = None):
+    """
+    Return list[dict] of all tracks for all artists.
+
+    Per-artist errors are appended to `failures` (if given) instead of
+    failing the batch; only an all-artists failure raises.
+    """
+    rows, errors = asyncio.run(
+        fetch_rows_async(token, ARTIST_IDS, concurrency or FETCH_CONCURRENCY)
+    )
+
+    if errors and len(errors) == len(ARTIST_IDS):
+        raise RuntimeError(f"All artist fetches failed, first error: {errors[0]['error']}")
+    if failures is not None:
+        failures.extend(errors)
+
+    return rows
 
 
 # ---------- TRANSFORM (PURE PYTHON) ----------
-def transform_rows(rows):
-    """Apply the same logic we had in pandas, but using plain Python."""
+def add_length_features(r):
+    """Set duration_minutes and length_category on one row in place."""
+    ms = r.get("duration_ms")
+    if isinstance(ms, (int, float)):
+        minutes = round(ms / 1000.0 / 60.0, 2)
+    else:
+        minutes = None
+    r["duration_minutes"] = minutes
+
+    if minutes is None:
+        length_cat = None
+    elif minutes < 3:
+        length_cat = "Short (<3 min)"
+    elif 3 <= minutes <= 5:
+        length_cat = "Medium (3-5 min)"
+    else:
+        length_cat = "Long (>5 min)"
 
-    # 1) Drop rows without track_id and remove duplicates
+    r["length_category"] = length_cat
+
+
+def iter_transform_rows(rows, stats=None):
+    """
+    Streaming transform: one pass over rows (any iterable) drops rows
+    without/with duplicate track_id, sets the duration fields and counts
+    albums. The dense rank then comes from the count histogram, sorting
+    only the distinct counts instead of every album, and rows are yielded
+    lazily with counts and ranks attached.
+
+    Rows are annotated in place (no per-row copy) and released as they are
+    yielded. If stats is a dict, stats["rows_out"] is set before the first
+    row is yielded.
+    """
     cleaned = []
     seen_track_ids = set()
+    album_counts = {}
 
     for r in rows:
         tid = r.get("track_id")
-        if not tid:
-            continue
-        if tid in seen_track_ids:
+        if not tid or tid in seen_track_ids:
             continue
         seen_track_ids.add(tid)
-        cleaned.append(dict(r))  # shallow copy
+        add_length_features(r)
+        album = r.get("album_name")
+        if album:
+            album_counts[album] = album_counts.get(album, 0) + 1
+        cleaned.append(r)
+    del seen_track_ids
 
-    # 2) duration_minutes and length_category
-    for r in cleaned:
-        ms = r.get("duration_ms")
-        if isinstance(ms, (int, float)):
-            minutes = round(ms / 1000.0 / 60.0, 2)
-        else:
-            minutes = None
-        r["duration_minutes"] = minutes
-
-        if minutes is None:
-            length_cat = None
-        elif minutes < 3:
-            length_cat = "Short (<3 min)"
-        elif 3 <= minutes <= 5:
-            length_cat = "Medium (3-5 min)"
-        else:
-            length_cat = "Long (>5 min)"
+    # dense rank, higher count = rank 1
+    distinct_counts = sorted(set(album_counts.values()), reverse=True)
+    rank_of_count = {count: rank for rank, count in enumerate(distinct_counts, start=1)}
 
-        r["length_category"] = length_cat
+    if stats is not None:
+        stats["rows_out"] = len(cleaned)
 
-    # 3) album_track_count
-    album_counts = {}
-    for r in cleaned:
-        album = r.get("album_name")
-        if not album:
+    for i, r in enumerate(cleaned):
+        cleaned[i] = None
+        count = album_counts.get(r.get("album_name"))
+        r["album_track_count"] = count
+        r["album_popularity_rank"] = rank_of_count.get(count)
+        yield r
+
+
+def transform_rows(rows):
+    """Apply the same logic we had in pandas, but using plain Python."""
+    return list(iter_transform_rows(dict(r) for r in rows))
+
+
+# ---------- INCREMENTAL ALBUM STATE ----------
+# Same store as src/transform/album_state.py; duplicated because this
+# Lambda ships as a single file. Under ALBUM_STATE_PREFIX: summary.json
+# ({"shards", "histogram": {count: albums}}) and albums/<shard>.json.gz
+# ({album: [track_id, ...]}). Only the shards of albums in a run are read
+# and written, so a run's cost does not grow with the history.
+ALBUM_STATE_SHARDS = 256
+
+
+class AlbumAggregateStore:
+    def __init__(self, prefix="", shards=ALBUM_STATE_SHARDS, histogram=None):
+        self.prefix = prefix
+        self.shards = shards
+        self.histogram = {int(c): n for c, n in (histogram or {}).items() if n}
+        self.distinct = sorted(self.histogram)
+        self._loaded = {}
+        self._dirty = set()
+
+    @staticmethod
+    def _get(key):
+        try:
+            return s3_client.get_object(Bucket=S3_BUCKET_NAME, Key=key)["Body"].read()
+        except s3_client.exceptions.NoSuchKey:
+            return None
+
+    @classmethod
+    def load(cls, prefix):
+        raw = cls._get(f"{prefix}summary.json")
+        if raw is None:
+            return cls(prefix)
+        summary = json.loads(raw)
+        return cls(prefix, summary["shards"], summary["histogram"])
+
+    def save(self):
+        for shard in sorted(self._dirty):
+            data = {album: sorted(ids) for album, ids in self._loaded[shard].items()}
+            s3_client.put_object(
+                Bucket=S3_BUCKET_NAME,
+                Key=self._shard_key(shard),
+                Body=gzip.compress(json.dumps(data, separators=(",", ":")).encode("utf-8")),
+            )
+        self._dirty.clear()
+        summary = {"shards": self.shards, "histogram": self.histogram}
+        s3_client.put_object(
+            Bucket=S3_BUCKET_NAME,
+            Key=f"{self.prefix}summary.json",
+            Body=json.dumps(summary).encode("utf-8"),
+        )
+
+    def _shard_key(self, shard):
+        return f"{self.prefix}albums/{shard:05d}.json.gz"
+
+    def _shard_of(self, album):
+        return zlib.crc32(str(album).encode("utf-8")) % self.shards
+
+    def _shard(self, album):
+        shard = self._shard_of(album)
+        if shard not in self._loaded:
+            raw = self._get(self._shard_key(shard)) if self.prefix else None
+            data = json.loads(gzip.decompress(raw)) if raw is not None else {}
+            self._loaded[shard] = {a: set(ids) for a, ids in data.items()}
+        return self._loaded[shard]
+
+    def tracks(self, album):
+        return self._shard(album).get(album, set())
+
+    def count(self, album):
+        return len(self.tracks(album))
+
+    def rank(self, count):
+        return len(self.distinct) - bisect.bisect_left(self.distinct, count)
+
+    def _move(self, old_count, new_count):
+        if old_count:
+            self.histogram[old_count] -= 1
+            if not self.histogram[old_count]:
+                del self.histogram[old_count]
+                self.distinct.pop(bisect.bisect_left(self.distinct, old_count))
+
+        if new_count not in self.histogram:
+            self.histogram[new_count] = 0
+            bisect.insort(self.distinct, new_count)
+        self.histogram[new_count] += 1
+
+    def apply(self, pairs):
+        """
+        Record (track_id, album) pairs, skipping tracks already in their
+        album. Returns (new_tracks, albums, ranks): the pairs added,
+        album -> (count, rank) for albums whose count changed, and
+        count -> rank for count values whose rank shifted.
+        """
+        old_distinct = list(self.distinct)
+        new_tracks, albums, ranks = [], {}, {}
+
+        old_counts = {}
+        for track_id, album in pairs:
+            ids = self._shard(album).setdefault(album, set())
+            if track_id in ids:
+                continue
+            old_counts.setdefault(album, len(ids))
+            ids.add(track_id)
+            self._dirty.add(self._shard_of(album))
+            new_tracks.append((track_id, album))
+
+        for album, old_count in old_counts.items():
+            self._move(old_count, self.count(album))
+
+        for album in old_counts:
+            count = self.count(album)
+            albums[album] = (count, self.rank(count))
+
+        if old_distinct != self.distinct:
+            for count in self.distinct:
+                old_rank = len(old_distinct) - bisect.bisect_left(old_distinct, count)
+                if count in old_distinct and self.rank(count) != old_rank:
+                    ranks[count] = self.rank(count)
+
+        return new_tracks, albums, ranks
+
+
+def transform_rows_incremental(rows, store):
+    """
+    transform_rows() for a new batch against persisted album state.
+
+    Returns (new_rows, album_updates, rank_updates): rows for tracks the
+    store has not recorded for their album; {album_name, album_track_count,
+    album_popularity_rank} for earlier albums whose count changed; and
+    {album_track_count, album_popularity_rank} for count values whose rank
+    shifted. Apply rank_updates to earlier rows first (by count), then
+    album_updates (by album).
+    """
+    candidates = []
+    batch_ids = set()
+    for r in rows:
+        tid = r.get("track_id")
+        if not tid or tid in batch_ids:
             continue
-        album_counts[album] = album_counts.get(album, 0) + 1
-
-    # 4) album_popularity_rank (dense rank, higher count = rank 1)
-    sorted_albums = sorted(album_counts.items(), key=lambda x: x[1], reverse=True)
-    album_rank = {}
-    current_rank = 0
-    previous_count = None
-
-    for album, count in sorted_albums:
-        if count != previous_count:
-            current_rank += 1
-            previous_count = count
-        album_rank[album] = current_rank
-
-    # 5) Attach counts & ranks back to each row
-    for r in cleaned:
-        album = r.get("album_name")
-        r["album_track_count"] = album_counts.get(album)
-        r["album_popularity_rank"] = album_rank.get(album)
+        batch_ids.add(tid)
+        candidates.append(r)
+
+    new_tracks, albums, ranks = store.apply(
+        (r["track_id"], r["album_name"]) for r in candidates if r.get("album_name")
+    )
+    new_ids = {tid for tid, _ in new_tracks}
+
+    cleaned = []
+    for r in candidates:
+        if r.get("album_name") and r["track_id"] not in new_ids:
+            continue
+        r = dict(r)
+        add_length_features(r)
+        count, rank = albums.get(r.get("album_name"), (None, None))
+        r["album_track_count"] = count
+        r["album_popularity_rank"] = rank
+        cleaned.append(r)
+
+    # albums first seen in this batch have no earlier rows to update
+    added = {}
+    for _, album in new_tracks:
+        added[album] = added.get(album, 0) + 1
+    album_updates = [
+        {"album_name": album, "album_track_count": count, "album_popularity_rank": rank}
+        for album, (count, rank) in albums.items()
+        if count > added[album]
+    ]
+    rank_updates = [
+        {"album_track_count": count, "album_popularity_rank": rank}
+        for count, rank in sorted(ranks.items())
+    ]
+    return cleaned, album_updates, rank_updates
+
+
+# ---------- PARQUET OUTPUT ----------
+# Same column types as src/transform/parquet_output.py PROCESSED_COLUMNS
+# (athena/tables/processed_parquet_ddl.sql); duplicated because this
+# Lambda ships as a single file.
+PROCESSED_PARQUET_COLUMNS = [
+    ("artist", "string"),
+    ("album_name", "string"),
+    ("track_name", "string"),
+    ("track_id", "string"),
+    ("duration_ms", "bigint"),
+    ("explicit", "boolean"),
+    ("album_release_date", "string"),
+    ("track_popularity", "bigint"),
+    ("album_id", "string"),
+    ("duration_minutes", "double"),
+    ("length_category", "string"),
+    ("album_track_count", "bigint"),
+    ("album_popularity_rank", "bigint"),
+]
+
+UPDATE_PARQUET_COLUMNS = {
+    "album_updates": [
+        ("album_name", "string"),
+        ("album_track_count", "bigint"),
+        ("album_popularity_rank", "bigint"),
+    ],
+    "rank_updates": [
+        ("album_track_count", "bigint"),
+        ("album_popularity_rank", "bigint"),
+    ],
+}
+
+PARQUET_ROW_GROUP_ROWS = 128_000
+
+
+def rows_to_parquet(rows, columns, sink, compression=PARQUET_COMPRESSION):
+    """
+    Write dict rows as Parquet into a binary file object, one row group at
+    a time (each with min/max statistics), so a lazy row iterator is never
+    fully listed.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
 
-    return cleaned
+    types = {"string": pa.string(), "bigint": pa.int64(),
+             "boolean": pa.bool_(), "double": pa.float64()}
+    schema = pa.schema([(name, types[hive_type]) for name, hive_type in columns])
+
+    rows = iter(rows)
+    with pq.ParquetWriter(sink, schema, compression=compression, write_statistics=True) as writer:
+        for batch in iter(lambda: list(islice(rows, PARQUET_ROW_GROUP_ROWS)), []):
+            writer.write_table(pa.Table.from_pylist(batch, schema=schema))
 
 
 # ---------- S3 UPLOAD ----------
-def upload_to_s3(rows):
+S3_MIN_PART_SIZE = 5 * 1024 * 1024
+
+
+class S3MultipartWriter:
+    """
+    Write-only file object that streams to S3.
+
+    write() accepts str (encoded as UTF-8) or bytes, optionally gzips it,
+    and uploads a multipart part whenever part_size bytes are buffered, so
+    memory holds at most one part. Output that never fills a part is sent
+    with a single put_object instead. An exception inside the with-block
+    aborts the multipart upload.
+    """
+
+    def __init__(self, bucket, key, part_size=None, compress=False,
+                 content_type="text/csv", client=None):
+        self.bucket = bucket
+        self.key = key
+        self.part_size = max(part_size or UPLOAD_PART_MB * 1024 * 1024, S3_MIN_PART_SIZE)
+        self.content_type = content_type
+        self.client = client or s3_client
+        # wbits=31: gzip container, readable by Athena/Snowflake as .gz
+        self._gzip = zlib.compressobj(wbits=31) if compress else None
+        self._buffer = bytearray()
+        self._upload_id = None
+        self._parts = []
+        self.bytes_written = 0
+        self.peak_buffer = 0
+        self.closed = False
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        size = len(data)
+        if self._gzip is not None:
+            data = self._gzip.compress(data)
+        self._buffer += data
+        self.peak_buffer = max(self.peak_buffer, len(self._buffer))
+        if len(self._buffer) >= self.part_size:
+            self._upload_part()
+        return size
+
+    def _upload_part(self):
+        if self._upload_id is None:
+            self._upload_id = self.client.create_multipart_upload(
+                Bucket=self.bucket, Key=self.key, ContentType=self.content_type
+            )["UploadId"]
+        part_number = len(self._parts) + 1
+        response = self.client.upload_part(
+            Bucket=self.bucket,
+            Key=self.key,
+            UploadId=self._upload_id,
+            PartNumber=part_number,
+            Body=bytes(self._buffer),
+        )
+        self._parts.append({"ETag": response["ETag"], "PartNumber": part_number})
+        self.bytes_written += len(self._buffer)
+        self._buffer.clear()
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        if self._gzip is not None:
+            self._buffer += self._gzip.flush()
+
+        if self._upload_id is None:
+            self.client.put_object(
+                Bucket=self.bucket, Key=self.key, Body=bytes(self._buffer),
+                ContentType=self.content_type,
+            )
+            self.bytes_written += len(self._buffer)
+            self._buffer.clear()
+            return
+
+        if self._buffer:
+            self._upload_part()
+        self.client.complete_multipart_upload(
+            Bucket=self.bucket,
+            Key=self.key,
+            UploadId=self._upload_id,
+            MultipartUpload={"Parts": self._parts},
+        )
+
+    def abort(self):
+        self.closed = True
+        self._buffer.clear()
+        if self._upload_id is not None:
+            self.client.abort_multipart_upload(
+                Bucket=self.bucket, Key=self.key, UploadId=self._upload_id
+            )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def upload_to_s3(rows, name="tracks_transformed"):
     now_str = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
-    key = f"{S3_PREFIX}tracks_transformed_{now_str}.csv"
 
-    csv_buffer = io.StringIO()
+    if OUTPUT_FORMAT == "parquet":
+        if name in UPDATE_PARQUET_COLUMNS:
+            prefix, columns = ALBUM_UPDATES_PARQUET_PREFIX, UPDATE_PARQUET_COLUMNS[name]
+        else:
+            prefix, columns = PARQUET_PREFIX, PROCESSED_PARQUET_COLUMNS
+        key = f"{prefix}{name}_{now_str}.parquet"
+        with S3MultipartWriter(S3_BUCKET_NAME, key,
+                               content_type="application/vnd.apache.parquet") as out:
+            rows_to_parquet(rows, columns, out)
+        logger.info(f"Uploaded transformed data to s3://{S3_BUCKET_NAME}/{key}")
+        return key
+
+    prefix = ALBUM_UPDATES_PREFIX if name in UPDATE_PARQUET_COLUMNS else S3_PREFIX
+    key = f"{prefix}{name}_{now_str}.csv" + (".gz" if UPLOAD_GZIP else "")
+
+    # rows may be a lazy iterator (see iter_transform_rows); each row is
+    # encoded and shipped as it is written, one part in memory at most
+    with S3MultipartWriter(S3_BUCKET_NAME, key, compress=UPLOAD_GZIP) as out:
+        rows = iter(rows)
+        first = next(rows, None)
+        if first is not None:
+            fieldnames = list(first.keys())
+            writer = csv.DictWriter(out, fieldnames=fieldnames)
+            writer.writeheader()
+            writer.writerow(first)
+            writer.writerows(rows)
+        else:
+            # still create a file with just headers for consistency
+            writer = csv.writer(out)
+            writer.writerow(
+                [
+                    "artist",
+                    "album_name",
+                    "track_name",
+                    "track_id",
+                    "duration_ms",
+                    "explicit",
+                    "album_release_date",
+                    "track_popularity",
+                    "album_id",
+                    "duration_minutes",
+                    "length_category",
+                    "album_track_count",
+                    "album_popularity_rank",
+                ]
+            )
+
+    logger.info(f"Uploaded transformed data to s3://{S3_BUCKET_NAME}/{key}")
+    return key
+
+
+def transform_and_upload(raw_rows) -> dict:
+    """
+    Full transform, or with ALBUM_STATE_PREFIX set, an incremental one that
+    also uploads album and rank updates for earlier rows and saves the
+    touched state shards.
+    """
+    if not ALBUM_STATE_PREFIX:
+        stats = {}
+        s3_key = upload_to_s3(iter_transform_rows(raw_rows, stats))
+        logger.info(f"Transformed rows: {stats['rows_out']}")
+        return {"row_count": stats["rows_out"], "s3_key": s3_key}
+
+    store = AlbumAggregateStore.load(ALBUM_STATE_PREFIX)
+    new_rows, album_updates, rank_updates = transform_rows_incremental(raw_rows, store)
+    logger.info(f"New rows: {len(new_rows)}, album updates: {len(album_updates)}, "
+                f"rank updates: {len(rank_updates)}")
+
+    result = {
+        "row_count": len(new_rows),
+        "s3_key": upload_to_s3(new_rows),
+        "albums_updated": len(album_updates),
+        "ranks_updated": len(rank_updates),
+    }
+    if album_updates:
+        result["updates_key"] = upload_to_s3(album_updates, name="album_updates")
+    if rank_updates:
+        result["rank_updates_key"] = upload_to_s3(rank_updates, name="rank_updates")
+    store.save()
+    return result
 
-    if rows:
-        fieldnames = list(rows[0].keys())
-        writer = csv.DictWriter(csv_buffer, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(rows)
+
+# ---------- SHARDED FAN-OUT / FAN-IN ----------
+def shard_artist_ids(artist_ids: list[str], shard_count: int,
+                     strategy: str = "hash") -> list[list[str]]:
+    """
+    Split artist IDs into shard_count deterministic shards.
+
+    "hash": crc32(artist_id) % shard_count, stable as the list grows.
+    "size": contiguous, equally sized slices of the list.
+    """
+    shard_count = max(1, shard_count)
+    shards = [[] for _ in range(shard_count)]
+
+    if strategy == "hash":
+        for artist_id in artist_ids:
+            shards[zlib.crc32(artist_id.encode("utf-8")) % shard_count].append(artist_id)
+    elif strategy == "size":
+        size = -(-len(artist_ids) // shard_count)  # ceil
+        for i in range(shard_count):
+            shards[i] = artist_ids[i * size:(i + 1) * size]
     else:
-        # still create a file with just headers for consistency
-        writer = csv.writer(csv_buffer)
-        writer.writerow(
-            [
-                "artist",
-                "album_name",
-                "track_name",
-                "track_id",
-                "duration_ms",
-                "explicit",
-                "album_release_date",
-                "track_popularity",
-                "album_id",
-                "duration_minutes",
-                "length_category",
-                "album_track_count",
-                "album_popularity_rank",
-            ]
-        )
+        raise ValueError(f"Unknown shard strategy: {strategy}")
+
+    return shards
+
+
+def lambda_invoker(payload: dict) -> dict:
+    """Invoke WORKER_FUNCTION_NAME synchronously and return its response."""
+    lambda_client = boto3.client("lambda")
+    resp = lambda_client.invoke(
+        FunctionName=WORKER_FUNCTION_NAME,
+        InvocationType="RequestResponse",
+        Payload=json.dumps(payload).encode("utf-8"),
+    )
+    return json.loads(resp["Payload"].read())
+
+
+def local_invoker(payload: dict) -> dict:
+    """In-process invoker for local runs and tests."""
+    return lambda_handler(payload, None)
+
+
+def _shard_keys(run_id: str, shard_id: int) -> tuple[str, str]:
+    base = f"{SHARD_PREFIX}{run_id}/"
+    return (
+        f"{base}part-{shard_id:05d}.jsonl",
+        f"{base}manifest/part-{shard_id:05d}.json",
+    )
+
+
+def run_worker(run_id: str, shard_id: int, artist_ids: list[str], limiter=None) -> dict:
+    """
+    Fetch one shard of artists and write its raw rows as a JSON Lines part
+    file plus a manifest entry. Raw rows keep their types, and album
+    aggregates are left to the merge step.
+
+    limiter is this worker's own RateLimiter (set to its slice of
+    SPOTIFY_MAX_RPS); in-process workers must not share the module one.
+    """
+    token = get_spotify_token()
+    rows, failures = asyncio.run(
+        fetch_rows_async(token, artist_ids, FETCH_CONCURRENCY, limiter)
+    )
+
+    part_key, manifest_key = _shard_keys(run_id, shard_id)
+    body = "".join(json.dumps(r) + "\n" for r in rows).encode("utf-8")
+    s3_client.put_object(Bucket=S3_BUCKET_NAME, Key=part_key, Body=body)
 
+    entry = {
+        "run_id": run_id,
+        "shard_id": shard_id,
+        "part_key": part_key,
+        "row_count": len(rows),
+        "artist_ids": artist_ids,
+        "failed_artists": failures,
+    }
     s3_client.put_object(
-        Bucket=S3_BUCKET_NAME,
-        Key=key,
-        Body=csv_buffer.getvalue().encode("utf-8"),
+        Bucket=S3_BUCKET_NAME, Key=manifest_key, Body=json.dumps(entry).encode("utf-8")
     )
 
-    logger.info(f"Uploaded transformed data to s3://{S3_BUCKET_NAME}/{key}")
-    return key
+    logger.info(f"Shard {shard_id}: {len(rows)} rows -> s3://{S3_BUCKET_NAME}/{part_key}")
+    return entry
+
+
+def run_merge(run_id: str) -> dict:
+    """
+    Combine every part listed in the run's manifest (in shard order),
+    compute the global album aggregates once and upload the final file.
+    """
+    manifest_prefix = f"{SHARD_PREFIX}{run_id}/manifest/"
+    entries = []
+
+    paginator = s3_client.get_paginator("list_objects_v2")
+    for page in paginator.paginate(Bucket=S3_BUCKET_NAME, Prefix=manifest_prefix):
+        for obj in page.get("Contents", []):
+            raw = s3_client.get_object(Bucket=S3_BUCKET_NAME, Key=obj["Key"])["Body"].read()
+            entries.append(json.loads(raw))
+
+    entries.sort(key=lambda e: e["shard_id"])
+
+    raw_rows = []
+    for entry in entries:
+        body = s3_client.get_object(Bucket=S3_BUCKET_NAME, Key=entry["part_key"])["Body"]
+        for line in body.iter_lines():
+            if line:
+                raw_rows.append(json.loads(line))
+
+    return {
+        "run_id": run_id,
+        "shards_merged": len(entries),
+        **transform_and_upload(raw_rows),
+        "failed_artists": [f for e in entries for f in e["failed_artists"]],
+    }
+
+
+def run_coordinator(run_id: str | None = None, shard_count: int | None = None,
+                    strategy: str | None = None, invoker=None) -> dict:
+    """
+    Fan out ARTIST_IDS over worker invocations (in parallel), then merge.
+    """
+    run_id = run_id or datetime.utcnow().strftime("%Y%m%d_%H%M%S")
+    invoker = invoker or lambda_invoker
+    shards = shard_artist_ids(
+        ARTIST_IDS, shard_count or SHARD_COUNT, strategy or SHARD_STRATEGY
+    )
+
+    shards = [(i, ids) for i, ids in enumerate(shards) if ids]
+    # Workers run at the same time, so they split SPOTIFY_MAX_RPS between them
+    shard_rps = SPOTIFY_MAX_RPS / max(1, len(shards))
+    payloads = [
+        {"mode": "worker", "run_id": run_id, "shard_id": i, "artist_ids": ids,
+         "max_rps": shard_rps}
+        for i, ids in shards
+    ]
+    logger.info(f"Run {run_id}: fanning out {len(payloads)} shards")
+
+    with ThreadPoolExecutor(max_workers=len(payloads)) as pool:
+        responses = list(pool.map(invoker, payloads))
+
+    failed_shards = [
+        p["shard_id"] for p, r in zip(payloads, responses) if r.get("statusCode") != 200
+    ]
+    if failed_shards:
+        logger.warning(f"Run {run_id}: shards failed: {failed_shards}")
+
+    result = run_merge(run_id)
+    result["failed_shards"] = failed_shards
+    return result
 
 
 # ---------- LAMBDA HANDLER ----------
-def lambda_handler(event, context):
-    try:
-        logger.info("Starting Spotify ETL Lambda")
+def run_single() -> dict:
+    token = get_spotify_token()
+    failed_artists = []
+    raw_rows = fetch_rows(token, failures=failed_artists)
+    logger.info(f"Raw rows fetched: {len(raw_rows)}")
+
+    return {
+        **transform_and_upload(raw_rows),
+        "failed_artists": failed_artists,
+    }
 
-        token = get_spotify_token()
-        raw_rows = fetch_rows(token)
-        logger.info(f"Raw rows fetched: {len(raw_rows)}")
 
-        transformed_rows = transform_rows(raw_rows)
-        logger.info(f"Transformed rows: {len(transformed_rows)}")
+def lambda_handler(event, context):
+    """
+    event["mode"] selects what this invocation does:
+      (none)        fetch + transform + upload in one invocation
+      "coordinator" shard ARTIST_IDS, invoke workers, merge
+      "worker"      fetch one shard, write part file + manifest entry
+      "merge"       combine a run's parts and upload the final file
+    """
+    event = event or {}
+    mode = event.get("mode", "single")
+
+    try:
+        logger.info(f"Starting Spotify ETL Lambda (mode={mode})")
+        if mode == "worker":
+            # Own limiter per worker: with local_invoker, workers share this
+            # process (and the coordinator's limiter)
+            limiter = RateLimiter(
+                rate=event.get("max_rps") or SPOTIFY_MAX_RPS,
+                max_retries=SPOTIFY_MAX_RETRIES,
+            )
+        else:
+            limiter = rate_limiter
+            limiter.reset_counters()
+        conn_before = connection_stats()
+        tokens_before = dict(_token_stats)
 
-        s3_key = upload_to_s3(transformed_rows)
+        if mode == "coordinator":
+            result = run_coordinator(
+                run_id=event.get("run_id"),
+                shard_count=event.get("shard_count"),
+                strategy=event.get("shard_strategy"),
+            )
+        elif mode == "worker":
+            result = run_worker(event["run_id"], event["shard_id"], event["artist_ids"], limiter)
+        elif mode == "merge":
+            result = run_merge(event["run_id"])
+        else:
+            result = run_single()
 
         return {
             "statusCode": 200,
             "body": json.dumps(
                 {
                     "message": "Spotify ETL completed successfully",
-                    "row_count": int(len(transformed_rows)),
-                    "s3_key": s3_key,
+                    **result,
+                    "rate_limit": limiter.stats(),
+                    "http": _invocation_stats(conn_before, tokens_before),
                 }
             ),
         }
@@ -238,4 +1078,4 @@ def lambda_handler(event, context):
                     "error": str(e),
                 }
             ),
-        }
\ No newline at end of file
+        }
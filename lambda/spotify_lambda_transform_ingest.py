@@ -1,16 +1,63 @@
 import boto3
 import csv
+import gzip
 import io
+import json
 import os
 import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from itertools import chain, islice
 
-s3 = boto3.client("s3")
+from botocore.config import Config
 
 # These will come from Lambda environment variables
 BUCKET_NAME = os.environ.get("BUCKET_NAME", "mani-spotify-etl-data")
 PROCESSED_PREFIX = os.environ.get("PROCESSED_PREFIX", "spotify/processed/")
 TRANSFORMED_PREFIX = os.environ.get("TRANSFORMED_PREFIX", "spotify/transformed/")
+# Inputs this Lambda transforms (UPLOAD_GZIP=true in the ingest Lambda writes
+# .csv.gz); the S3 event notification needs a rule for each suffix
+INPUT_SUFFIXES = (".csv", ".csv.gz")
+
+# Merged files written by src/load/compact.py; their rows were transformed already
+COMPACTED_PREFIX = os.environ.get("COMPACTED_PREFIX", "spotify/processed/compacted/")
+
+# Output is streamed to S3 in multipart parts of this size (S3 minimum 5 MiB)
+UPLOAD_PART_MB = int(os.environ.get("UPLOAD_PART_MB", "8"))
+
+# Records of one event processed at the same time. Each in-flight record
+# holds about one upload part, so the default scales with Lambda memory:
+# one record per 128 MB, between 1 and 16.
+_LAMBDA_MEMORY_MB = int(os.environ.get("AWS_LAMBDA_FUNCTION_MEMORY_SIZE", "128"))
+RECORD_CONCURRENCY = int(
+    os.environ.get("RECORD_CONCURRENCY", str(max(1, min(16, _LAMBDA_MEMORY_MB // 128))))
+)
+
+# boto3 clients are thread-safe; size the connection pool for the workers
+s3 = boto3.client("s3", config=Config(max_pool_connections=max(10, RECORD_CONCURRENCY)))
+
+# "csv" (default) or "parquet" (needs a pyarrow layer); Parquet files go to
+# their own prefix, matching athena/tables/transformed_parquet_ddl.sql
+OUTPUT_FORMAT = os.environ.get("OUTPUT_FORMAT", "csv")
+PARQUET_COMPRESSION = os.environ.get("PARQUET_COMPRESSION", "zstd")  # or "snappy"
+TRANSFORMED_PARQUET_PREFIX = os.environ.get(
+    "TRANSFORMED_PARQUET_PREFIX", "spotify/transformed_parquet/"
+)
+
+# Same column types as src/transform/parquet_output.py TRANSFORMED_COLUMNS;
+# duplicated because this Lambda ships as a single file.
+TRANSFORMED_PARQUET_COLUMNS = [
+    ("artist", "string"),
+    ("artist_id", "string"),
+    ("album_name", "string"),
+    ("album_id", "string"),
+    ("track_name", "string"),
+    ("track_id", "string"),
+    ("duration_ms", "bigint"),
+    ("explicit", "boolean"),
+    ("duration_min", "double"),
+    ("load_timestamp_utc", "string"),
+]
 
 
 def transform_rows(rows):
@@ -35,62 +82,256 @@ def transform_rows(rows):
         yield row
 
 
-def lambda_handler(event, context):
+PARQUET_ROW_GROUP_ROWS = 128_000
+S3_MIN_PART_SIZE = 5 * 1024 * 1024
+
+
+# ---------- STREAMING S3 OUTPUT ----------
+# Same writer as S3MultipartWriter in spotify_lambda_ingest.py (minus
+# gzip); duplicated because each Lambda ships as a single file.
+class S3MultipartWriter:
     """
-    Entry point for Lambda. Triggered by S3 PUT event on
-    mani-spotify-etl-data / spotify/processed/*.csv
+    Write-only file object that streams to S3: buffers at most one part,
+    uploads full parts as they fill, and falls back to one put_object for
+    output smaller than a part. Errors inside the with-block abort.
     """
-    print("Received event:", event)
 
-    # Support multiple records, but we usually care about the first one
-    for record in event.get("Records", []):
-        bucket = record["s3"]["bucket"]["name"]
-        key = urllib.parse.unquote_plus(record["s3"]["object"]["key"])
+    def __init__(self, bucket, key, content_type="text/csv", part_size=None):
+        self.bucket = bucket
+        self.key = key
+        self.content_type = content_type
+        self.part_size = max(part_size or UPLOAD_PART_MB * 1024 * 1024, S3_MIN_PART_SIZE)
+        self._buffer = bytearray()
+        self._upload_id = None
+        self._parts = []
+        self.closed = False
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        self._buffer += data
+        if len(self._buffer) >= self.part_size:
+            self._upload_part()
+        return len(data)
+
+    def _upload_part(self):
+        if self._upload_id is None:
+            self._upload_id = s3.create_multipart_upload(
+                Bucket=self.bucket, Key=self.key, ContentType=self.content_type
+            )["UploadId"]
+        part_number = len(self._parts) + 1
+        response = s3.upload_part(
+            Bucket=self.bucket,
+            Key=self.key,
+            UploadId=self._upload_id,
+            PartNumber=part_number,
+            Body=bytes(self._buffer),
+        )
+        self._parts.append({"ETag": response["ETag"], "PartNumber": part_number})
+        self._buffer.clear()
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        if self._upload_id is None:
+            s3.put_object(
+                Bucket=self.bucket,
+                Key=self.key,
+                Body=bytes(self._buffer),
+                ContentType=self.content_type,
+            )
+            return
+        if self._buffer:
+            self._upload_part()
+        s3.complete_multipart_upload(
+            Bucket=self.bucket,
+            Key=self.key,
+            UploadId=self._upload_id,
+            MultipartUpload={"Parts": self._parts},
+        )
+
+    def abort(self):
+        self.closed = True
+        self._buffer.clear()
+        if self._upload_id is not None:
+            s3.abort_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=self._upload_id)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def rows_to_parquet(rows, sink, compression=None):
+    """
+    Write transformed rows into a binary file object as Parquet, one row
+    group (with statistics) per PARQUET_ROW_GROUP_ROWS rows. CSV values
+    arrive as strings, so typed columns are parsed by Arrow: blanks
+    become nulls and "200000.0"-style integers are accepted.
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+
+    names = [name for name, _ in TRANSFORMED_PARQUET_COLUMNS]
+    schema = pa.schema(
+        [(name, {"string": pa.string(), "bigint": pa.int64(), "boolean": pa.bool_(),
+                 "double": pa.float64()}[hive_type])
+         for name, hive_type in TRANSFORMED_PARQUET_COLUMNS]
+    )
+
+    def to_table(batch):
+        arrays = []
+        for name, hive_type in TRANSFORMED_PARQUET_COLUMNS:
+            values = [row.get(name) for row in batch]
+            if hive_type == "double":
+                arrays.append(pa.array(values, type=pa.float64()))
+                continue
+            arr = pa.array([None if v in (None, "") else str(v) for v in values], type=pa.string())
+            if hive_type == "bigint":
+                arr = pc.cast(pc.cast(arr, pa.float64()), pa.int64())
+            elif hive_type == "boolean":
+                arr = pc.cast(arr, pa.bool_())
+            arrays.append(arr)
+        return pa.Table.from_arrays(arrays, names=names)
+
+    rows = iter(rows)
+    with pq.ParquetWriter(sink, schema, compression=compression or PARQUET_COMPRESSION,
+                          write_statistics=True) as writer:
+        for batch in iter(lambda: list(islice(rows, PARQUET_ROW_GROUP_ROWS)), []):
+            writer.write_table(to_table(batch))
+
 
-        print(f"Processing object: s3://{bucket}/{key}")
+def process_object(bucket, key):
+    """
+    Stream one processed CSV through transform_rows into the transformed
+    prefix. The S3 body is decoded incrementally, rows are transformed
+    lazily and the output goes out in multipart parts, so memory stays at
+    about one part no matter how large the file is.
+
+    Returns (out_key, row_count), or (None, 0) for a file without rows.
+    """
+    # 1) Open the CSV on S3 as a stream of decoded text (gunzipped on the fly)
+    obj = s3.get_object(Bucket=bucket, Key=key)
+    body = gzip.GzipFile(fileobj=obj["Body"]) if key.endswith(".gz") else obj["Body"]
+    # newline="" leaves line splitting to csv: U+2028 etc. stay inside fields
+    text = io.TextIOWrapper(body, encoding="utf-8", newline="")
+
+    # 2) Read CSV lazily
+    reader = csv.DictReader(text)
 
-        # Ignore anything that isn't our processed prefix (safety)
-        if not key.startswith(PROCESSED_PREFIX) or not key.endswith(".csv"):
-            print("Skipping key (not in processed prefix or not a CSV):", key)
-            continue
+    # 3) Transform rows lazily
+    transformed_rows = transform_rows(reader)
+    first = next(transformed_rows, None)
+    if first is None:
+        return None, 0
 
-        # 1) Download the CSV from S3
-        obj = s3.get_object(Bucket=bucket, Key=key)
-        body = obj["Body"].read().decode("utf-8")
+    base_name = os.path.basename(key).removesuffix(".gz")  # e.g., tracks_from_airflow.csv
+    name_without_ext, _ = os.path.splitext(base_name)
 
-        # 2) Read CSV into DictReader
-        input_buffer = io.StringIO(body)
-        reader = csv.DictReader(input_buffer)
+    row_count = 0
 
-        # 3) Transform rows
-        transformed_rows = list(transform_rows(reader))
+    def counted(rows):
+        nonlocal row_count
+        for row in rows:
+            row_count += 1
+            yield row
 
-        if not transformed_rows:
-            print("No rows found in input CSV, skipping.")
-            continue
+    rows = counted(chain([first], transformed_rows))
 
-        # 4) Prepare output CSV
-        output_buffer = io.StringIO()
+    if OUTPUT_FORMAT == "parquet":
+        out_key = f"{TRANSFORMED_PARQUET_PREFIX}{name_without_ext}_transformed.parquet"
+        with S3MultipartWriter(bucket, out_key, content_type="application/vnd.apache.parquet") as out:
+            rows_to_parquet(rows, out)
+        return out_key, row_count
 
-        # Include all original columns + new ones
-        fieldnames = list(transformed_rows[0].keys())
-        writer = csv.DictWriter(output_buffer, fieldnames=fieldnames)
+    # 4) Stream output CSV: all original columns + new ones
+    out_key = f"{TRANSFORMED_PREFIX}{name_without_ext}_transformed.csv"
+    with S3MultipartWriter(bucket, out_key) as out:
+        writer = csv.DictWriter(out, fieldnames=list(first.keys()))
         writer.writeheader()
-        writer.writerows(transformed_rows)
-
-        # 5) Decide output key in transformed folder
-        base_name = os.path.basename(key)  # e.g., tracks_from_airflow.csv
-        name_without_ext, _ = os.path.splitext(base_name)
-        out_key = f"{TRANSFORMED_PREFIX}{name_without_ext}_transformed.csv"
-
-        # 6) Upload back to S3
-        s3.put_object(
-            Bucket=bucket,
-            Key=out_key,
-            Body=output_buffer.getvalue().encode("utf-8"),
-            ContentType="text/csv",
-        )
+        writer.writerows(rows)
+
+    return out_key, row_count
+
+
+def process_record(record):
+    """
+    Handle one S3 event record. Never raises: returns a result dict with
+    status "ok", "skipped" or "error".
+    """
+    bucket = record["s3"]["bucket"]["name"]
+    key = urllib.parse.unquote_plus(record["s3"]["object"]["key"])
+    result = {"bucket": bucket, "key": key}
+
+    print(f"Processing object: s3://{bucket}/{key}")
+
+    # Ignore anything that isn't our processed prefix (safety)
+    if not key.startswith(PROCESSED_PREFIX) or not key.endswith(INPUT_SUFFIXES):
+        print("Skipping key (not in processed prefix or not a CSV):", key)
+        return {**result, "status": "skipped", "reason": "not a processed CSV"}
+
+    if key.startswith(COMPACTED_PREFIX):
+        print("Skipping compaction output:", key)
+        return {**result, "status": "skipped", "reason": "compaction output"}
+
+    try:
+        out_key, row_count = process_object(bucket, key)
+    except Exception as e:
+        print(f"❌ Failed to transform s3://{bucket}/{key}: {e!r}")
+        return {**result, "status": "error", "error": str(e)}
+
+    if out_key is None:
+        print("No rows found in input CSV, skipping.")
+        return {**result, "status": "skipped", "reason": "no rows"}
+
+    print(f"✅ Wrote {row_count} transformed rows to s3://{bucket}/{out_key}")
+    return {**result, "status": "ok", "out_key": out_key, "row_count": row_count}
+
+
+class RecordsFailed(RuntimeError):
+    """Some records failed; .results holds every record's result, in event order."""
+
+    def __init__(self, message, results):
+        super().__init__(message)
+        self.results = results
+
+
+def lambda_handler(event, context):
+    """
+    Entry point for Lambda. Triggered by S3 PUT event on
+    mani-spotify-etl-data / spotify/processed/*.csv (and *.csv.gz)
+
+    Records are processed concurrently (at most RECORD_CONCURRENCY at a
+    time) and one failing object does not stop the others. Once every
+    record has been handled, any failure is raised so the asynchronous
+    invocation is retried (and eventually lands in the DLQ); outputs are
+    keyed by input, so records that succeeded are simply rewritten. The
+    per-record results are logged as one JSON line and attached to the
+    RecordsFailed exception, so the successes are still reported.
+    Returns {"status": "ok", "results": [...]} in event order otherwise.
+    """
+    print("Received event:", event)
+
+    records = event.get("Records", [])
+    if len(records) > 1 and RECORD_CONCURRENCY > 1:
+        with ThreadPoolExecutor(max_workers=min(RECORD_CONCURRENCY, len(records))) as pool:
+            results = list(pool.map(process_record, records))
+    else:
+        results = [process_record(record) for record in records]
 
-        print(f"✅ Wrote transformed file to s3://{bucket}/{out_key}")
+    failed = [r for r in results if r["status"] == "error"]
+    if failed:
+        print(json.dumps({"status": "error", "results": results}))
+        summary = "; ".join(f"s3://{r['bucket']}/{r['key']}: {r['error']}" for r in failed)
+        raise RecordsFailed(f"{len(failed)} of {len(results)} records failed: {summary}", results)
 
-    return {"status": "ok"}
\ No newline at end of file
+    return {"status": "ok", "results": results}
@@ -309,7 +309,7 @@ create or replace task TASK_LOAD_SPOTIFY_FROM_S3
 	schedule='USING CRON 0 * * * * America/Los_Angeles'
 	as COPY INTO spotify_tracks_raw
 FROM @spotify_s3_stage
-PATTERN = '.*\.csv'
+PATTERN = '.*processed/[^/]+\.csv(\.gz)?'
 ON_ERROR = 'CONTINUE';
 create or replace task TASK_LOAD_SPOTIFY_TRACKS
 	warehouse=SPOTIFY_WH
@@ -317,6 +317,7 @@ create or replace task TASK_LOAD_SPOTIFY_TRACKS
 	as COPY INTO SPOTIFY_TRACKS
   FROM @SPOTIFY_S3_STAGE_PROCESSED
   FILE_FORMAT = (FORMAT_NAME = 'SPOTIFY_CSV_FORMAT')
+  PATTERN = '.*processed/[^/]+\.csv(\.gz)?'
   ON_ERROR   = 'CONTINUE';
 create or replace task TASK_SPOTIFY_RAW_TO_SILVER
 	warehouse=SPOTIFY_WH
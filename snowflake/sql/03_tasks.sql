@@ -12,7 +12,9 @@ AS
 COPY INTO SPOTIFY_TRACKS
   FROM @SPOTIFY_S3_STAGE
   FILE_FORMAT = (FORMAT_NAME = SPOTIFY_CSV_FORMAT)
-  PATTERN = '.*\.csv'
+  -- only files directly under processed/: compacted/ holds rows already
+  -- loaded from the files it replaced (src/load/compact.py)
+  PATTERN = '.*processed/[^/]+\.csv(\.gz)?'
   ON_ERROR = 'CONTINUE';
 
 -- 2) Task: refresh SPOTIFY_TRACKS_SILVER from SPOTIFY_TRACKS
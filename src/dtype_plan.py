@@ -0,0 +1,144 @@
+"""
+Compact pandas dtypes for the track pipeline (extract + transform).
+
+Low-cardinality strings become categoricals, integers become the smallest
+nullable integer that holds them, and float columns drop to float32 where
+that is precise enough. Every choice keeps to_csv() output unchanged:
+categoricals and nullable ints print like the originals, and a float
+column only becomes float32 when every value prints the same in both
+(see _compact_float); otherwise it stays float64.
+"""
+
+import sys
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+# column -> kind of compaction
+DTYPE_PLAN = {
+    "artist": "category",
+    "artist_id": "category",
+    "album": "category",
+    "album_name": "category",
+    "album_id": "category",
+    "length_category": "category",
+    "explicit": "boolean",
+    "duration_ms": "int",
+    "album_track_count": "int",
+    "album_popularity_rank": "int",
+    "duration_minutes": "float32",  # rounded to 2 decimals
+}
+
+# Applied by read_csv itself, so these strings are never held as objects
+READ_DTYPES = {column: "category" for column, kind in DTYPE_PLAN.items() if kind == "category"}
+
+_NULLABLE_INTS = ("Int8", "Int16", "Int32", "Int64")
+
+# float32 round-trips any decimal of up to 6 significant digits; numpy also
+# prints float32 in scientific notation from 1e6 up (float64 from 1e16)
+_FLOAT32_DIGITS = 6
+
+
+def _compact_int(s: pd.Series) -> pd.Series:
+    if s.isna().all():
+        return s.astype("Int8")
+    low, high = s.min(), s.max()
+    for dtype in _NULLABLE_INTS:
+        info = np.iinfo(dtype.lower())
+        if info.min <= low and high <= info.max:
+            return s.astype(dtype)
+    return s
+
+
+def _compact_float(s: pd.Series, decimals: int = 0) -> pd.Series:
+    """
+    float32 only if it writes the same CSV: every value must come back
+    from float32 unchanged once rounded to `decimals` places, and stay
+    below 10**(6 - decimals) so its float32 repr is not shortened or
+    switched to scientific notation (166666.87 -> 166666.88,
+    5000000.0 -> 5e+06).
+    """
+    f32 = s.astype("float32")
+    same = (f32.astype("float64").round(decimals) == s) | s.isna()
+    small = ~(s.abs() >= 10.0 ** (_FLOAT32_DIGITS - decimals))
+    return f32 if (same & small).all() else s
+
+
+def apply_dtype_plan(df: pd.DataFrame, plan: dict = DTYPE_PLAN) -> pd.DataFrame:
+    """Compact df's planned columns in place and return it."""
+    for column, kind in plan.items():
+        if column not in df.columns:
+            continue
+        s = df[column]
+
+        if kind == "category":
+            if not isinstance(s.dtype, pd.CategoricalDtype):
+                df[column] = s.astype("category")
+        elif kind == "boolean":
+            if s.dtype == object and pd.api.types.infer_dtype(s, skipna=True) == "boolean":
+                df[column] = s.astype("boolean" if s.isna().any() else "bool")
+        elif kind == "int":
+            if pd.api.types.is_integer_dtype(s):
+                df[column] = _compact_int(s)
+            elif pd.api.types.is_float_dtype(s):
+                # blanks made this float; keep it float so it prints the same
+                df[column] = _compact_float(s)
+        elif kind == "float32":
+            if pd.api.types.is_float_dtype(s):
+                df[column] = _compact_float(s, decimals=2)
+
+    return df
+
+
+def concat_compact(frames: list[pd.DataFrame]) -> pd.DataFrame:
+    """
+    pd.concat for frames that went through apply_dtype_plan separately:
+    categoricals with different categories are unioned rather than
+    falling back to object.
+    """
+    if len(frames) == 1:
+        return frames[0]
+
+    categoricals = {
+        column: union_categoricals([f[column] for f in frames])
+        for column, dtype in frames[0].dtypes.items()
+        if isinstance(dtype, pd.CategoricalDtype)
+        and all(isinstance(f[column].dtype, pd.CategoricalDtype) for f in frames)
+    }
+    df = pd.concat(
+        [f.drop(columns=list(categoricals)) for f in frames], ignore_index=True
+    )
+    for column, values in categoricals.items():
+        df[column] = values
+    return df[frames[0].columns]
+
+
+def memory_bytes(df: pd.DataFrame) -> int:
+    return int(df.memory_usage(deep=True).sum())
+
+
+def object_bytes(df: pd.DataFrame) -> int:
+    """
+    Deep memory df would take with its categoricals as plain object string
+    columns, i.e. as pd.read_csv returns it without READ_DTYPES. Computed
+    from the categories and codes, so the default frame is never built.
+    """
+    total = memory_bytes(df)
+    for column, dtype in df.dtypes.items():
+        if not isinstance(dtype, pd.CategoricalDtype):
+            continue
+        s = df[column]
+        # one pointer per row + one str object per row; code -1 (NaN) is a float
+        sizes = np.array([sys.getsizeof(v) for v in s.cat.categories] + [sys.getsizeof(np.nan)])
+        as_object = 8 * len(s) + int(sizes[s.cat.codes.to_numpy()].sum())
+        total += as_object - int(s.memory_usage(deep=True, index=False))
+    return total
+
+
+def memory_report(stage: str, before: int, after: int) -> str:
+    """One log line comparing deep memory use before/after the dtype plan."""
+    saved = 100 * (1 - after / before) if before else 0.0
+    line = f"[{stage}] memory: {before / 2**20:,.1f} MiB -> {after / 2**20:,.1f} MiB ({saved:.0f}% saved)"
+    print(line)
+    return line
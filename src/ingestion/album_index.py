@@ -0,0 +1,144 @@
+# src/ingestion/album_index.py
+
+"""
+Persisted index of albums already extracted, used for incremental runs.
+
+The index maps album_id -> artist/album metadata plus the album's
+tracklist. An incremental extract only lists each artist's albums and
+fetches tracks for album_ids missing from the index; the full snapshot
+can always be rebuilt from the index without touching the API.
+
+Location is either a local path or an s3://bucket/key URI. Files ending
+in .gz are gzip-compressed.
+"""
+
+import gzip
+import json
+import os
+from urllib.parse import urlsplit
+
+import boto3
+import pandas as pd
+from botocore.exceptions import ClientError
+
+# Column order shared with extract_local.TRACK_COLUMNS
+INDEX_COLUMNS = [
+    "artist",
+    "artist_id",
+    "album_name",
+    "album_id",
+    "track_name",
+    "track_id",
+    "duration_ms",
+    "explicit",
+]
+
+
+def _split_s3_uri(uri: str) -> tuple[str, str]:
+    parts = urlsplit(uri)
+    return parts.netloc, parts.path.lstrip("/")
+
+
+class AlbumIndex:
+    """
+    album_id -> {"artist", "artist_id", "album_name", "tracks": [[name, id, ms, explicit], ...]}
+    """
+
+    def __init__(self, albums: dict | None = None):
+        self.albums = albums or {}
+
+    # ---------- persistence ----------
+    @classmethod
+    def load(cls, location: str) -> "AlbumIndex":
+        """Load the index, or return an empty one if it does not exist yet."""
+        if location.startswith("s3://"):
+            bucket, key = _split_s3_uri(location)
+            try:
+                raw = boto3.client("s3").get_object(Bucket=bucket, Key=key)["Body"].read()
+            except ClientError as e:
+                if e.response["Error"]["Code"] in ("NoSuchKey", "404"):
+                    return cls()
+                raise
+        else:
+            if not os.path.exists(location):
+                return cls()
+            with open(location, "rb") as f:
+                raw = f.read()
+
+        if location.endswith(".gz"):
+            raw = gzip.decompress(raw)
+        return cls(json.loads(raw))
+
+    def save(self, location: str):
+        raw = json.dumps(self.albums, separators=(",", ":")).encode("utf-8")
+        if location.endswith(".gz"):
+            raw = gzip.compress(raw)
+
+        if location.startswith("s3://"):
+            bucket, key = _split_s3_uri(location)
+            boto3.client("s3").put_object(Bucket=bucket, Key=key, Body=raw)
+        else:
+            directory = os.path.dirname(location)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{location}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(raw)
+            os.replace(tmp_path, location)
+
+    # ---------- contents ----------
+    def album_ids(self) -> frozenset:
+        return frozenset(self.albums)
+
+    def add_rows(self, rows) -> int:
+        """Record extracted track rows (dicts in INDEX_COLUMNS shape). Returns albums added."""
+        added = 0
+        for row in rows:
+            album = self.albums.get(row["album_id"])
+            if album is None:
+                album = self.albums[row["album_id"]] = {
+                    "artist": row["artist"],
+                    "artist_id": row["artist_id"],
+                    "album_name": row["album_name"],
+                    "tracks": [],
+                }
+                added += 1
+            album["tracks"].append(
+                [row["track_name"], row["track_id"], row["duration_ms"], row["explicit"]]
+            )
+        return added
+
+    def add_albums(self, albums) -> int:
+        """
+        Record albums (dicts with artist, artist_id, album_name, album_id),
+        including ones with no tracks. Returns albums added.
+        """
+        added = 0
+        for album in albums:
+            if album["album_id"] not in self.albums:
+                self.albums[album["album_id"]] = {
+                    "artist": album["artist"],
+                    "artist_id": album["artist_id"],
+                    "album_name": album["album_name"],
+                    "tracks": [],
+                }
+                added += 1
+        return added
+
+    def iter_rows(self):
+        for album_id, album in self.albums.items():
+            for track_name, track_id, duration_ms, explicit in album["tracks"]:
+                yield {
+                    "artist": album["artist"],
+                    "artist_id": album["artist_id"],
+                    "album_name": album["album_name"],
+                    "album_id": album_id,
+                    "track_name": track_name,
+                    "track_id": track_id,
+                    "duration_ms": duration_ms,
+                    "explicit": explicit,
+                }
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """Full snapshot of every indexed track."""
+        return pd.DataFrame(list(self.iter_rows()), columns=INDEX_COLUMNS)
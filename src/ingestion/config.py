@@ -11,5 +11,17 @@ SPOTIFY_CLIENT_ID = os.getenv("SPOTIFY_CLIENT_ID", "CHANGE_ME_IN_ENV")
 SPOTIFY_CLIENT_SECRET = os.getenv("SPOTIFY_CLIENT_SECRET", "CHANGE_ME_IN_ENV")
 SPOTIFY_REDIRECT_URI = os.getenv("SPOTIFY_REDIRECT_URI", "http://127.0.0.1:9090/callback")
 
+SPOTIFY_EXTRACT_WORKERS = int(os.getenv("SPOTIFY_EXTRACT_WORKERS", "1"))
+SPOTIFY_MAX_RPS = float(os.getenv("SPOTIFY_MAX_RPS", "10"))
+SPOTIFY_MAX_RETRIES = int(os.getenv("SPOTIFY_MAX_RETRIES", "5"))
+
+# On-disk API response cache (empty path = disabled)
+SPOTIFY_CACHE_PATH = os.getenv("SPOTIFY_CACHE_PATH", "")
+SPOTIFY_CACHE_MAX_MB = int(os.getenv("SPOTIFY_CACHE_MAX_MB", "256"))
+
 S3_BUCKET_NAME = os.getenv("S3_BUCKET_NAME", "mani-spotify-etl-data")
-S3_PROCESSED_PREFIX = os.getenv("S3_PROCESSED_PREFIX", "spotify/processed")
\ No newline at end of file
+S3_PROCESSED_PREFIX = os.getenv("S3_PROCESSED_PREFIX", "spotify/processed")
+
+# Multipart upload tuning for ingestion.upload_to_s3
+S3_UPLOAD_CONCURRENCY = int(os.getenv("S3_UPLOAD_CONCURRENCY", "10"))
+S3_MULTIPART_CHUNK_MB = int(os.getenv("S3_MULTIPART_CHUNK_MB", "16"))
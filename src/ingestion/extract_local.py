@@ -1,55 +1,178 @@
 # src/ingestion/extract_local.py
 
+import json
+import os
+import sys
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
 import spotipy
 from spotipy.oauth2 import SpotifyClientCredentials
+from urllib3.util.retry import Retry
 import pandas as pd
 
-from config import SPOTIFY_CLIENT_ID, SPOTIFY_CLIENT_SECRET
+# Runnable as a script: put src/ on the path for config, dtype_plan and ingestion.*
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from config import (  # noqa: E402
+    SPOTIFY_CACHE_MAX_MB,
+    SPOTIFY_CACHE_PATH,
+    SPOTIFY_CLIENT_ID,
+    SPOTIFY_CLIENT_SECRET,
+    SPOTIFY_EXTRACT_WORKERS,
+    SPOTIFY_MAX_RETRIES,
+    SPOTIFY_MAX_RPS,
+)
+from dtype_plan import apply_dtype_plan, concat_compact, memory_bytes, memory_report  # noqa: E402
+from ingestion.album_index import AlbumIndex  # noqa: E402
+from ingestion.rate_limit import RateLimitedClient, RateLimiter  # noqa: E402
+from ingestion.response_cache import CachedSpotify, ResponseCache  # noqa: E402
+from ingestion.spotify_batch import fetch_albums, fetch_artists  # noqa: E402
+
+# One limiter for the whole process, shared by every worker thread
+rate_limiter = RateLimiter(rate=SPOTIFY_MAX_RPS, max_retries=SPOTIFY_MAX_RETRIES)
+
+# Opened lazily by get_spotify_client() when SPOTIFY_CACHE_PATH is set
+response_cache = None
+
+# 🔹 Five artists
+ARTIST_IDS = [
+    "1Xyo4u8uXC1ZmMpatF05PJ",  # The Weeknd
+    "06HL4z0CvFAxyc27GXpf02",  # Taylor Swift
+    "3TVXtAsR1Inumwj472S9r4",  # Drake
+    "6eUKZXaKkcviH0Ku9w2n3V",  # Ed Sheeran
+    "6qqNVTkY8uBg9cP3Jd7DAH",  # Billie Eilish
+]
+
+# Rows buffered per DataFrame block while building the extract result
+EXTRACT_CHUNK_ROWS = 10_000
+
+TRACK_COLUMNS = [
+    "artist",
+    "artist_id",
+    "album_name",
+    "album_id",
+    "track_name",
+    "track_id",
+    "duration_ms",
+    "explicit",
+]
+
+
+def _http_session() -> requests.Session:
+    """requests session retrying 5xx only; 429s are never retried by urllib3."""
+    retry = Retry(
+        total=3,
+        connect=None,
+        read=False,
+        allowed_methods=frozenset(["GET", "POST", "PUT", "DELETE"]),
+        status=3,
+        backoff_factor=0.3,
+        status_forcelist=(500, 502, 503, 504),
+        respect_retry_after_header=False,
+    )
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(max_retries=retry)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
 
 def get_spotify_client():
     """
     Spotify client using Client Credentials flow.
     This does NOT open a browser – perfect for Airflow/Docker.
+
+    The HTTP session only retries 5xx. urllib3 would otherwise still
+    retry a 429 that carries Retry-After (sleeping inside the calling
+    thread), so every 429 goes to the shared rate_limiter instead, which
+    backs off for all threads.
+
+    With SPOTIFY_CACHE_PATH set, GET responses are served from an on-disk
+    cache and only misses/revalidations hit the API (and the limiter).
     """
+    global response_cache
+
     auth_manager = SpotifyClientCredentials(
         client_id=SPOTIFY_CLIENT_ID,
         client_secret=SPOTIFY_CLIENT_SECRET,
     )
-    return spotipy.Spotify(auth_manager=auth_manager)
 
+    if SPOTIFY_CACHE_PATH:
+        if response_cache is None:
+            response_cache = ResponseCache(
+                SPOTIFY_CACHE_PATH, max_bytes=SPOTIFY_CACHE_MAX_MB * 1024 * 1024
+            )
+        return CachedSpotify(
+            auth_manager=auth_manager,
+            requests_session=_http_session(),
+            response_cache=response_cache,
+            rate_limiter=rate_limiter,
+        )
 
-def extract():
+    sp = spotipy.Spotify(
+        auth_manager=auth_manager,
+        requests_session=_http_session(),
+    )
+    return RateLimitedClient(sp, rate_limiter)
+
+
+def iter_pages(sp, page: dict, prefetch: bool = False):
     """
-    Extract tracks for multiple artists from Spotify and return a pandas DataFrame.
+    Yield a Spotify paging object and every page after it (follows `next`).
+
+    With prefetch=True the next page is requested in the background while
+    the caller is still working on the current one.
     """
+    if not prefetch:
+        while page:
+            yield page
+            page = sp.next(page) if page.get("next") else None
+        return
 
-    sp = get_spotify_client()
-    tracks_data = []
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        while page:
+            pending = pool.submit(sp.next, page) if page.get("next") else None
+            yield page
+            page = pending.result() if pending else None
 
-    # 🔹 Five artists
-    artist_ids = [
-        "1Xyo4u8uXC1ZmMpatF05PJ",  # The Weeknd
-        "06HL4z0CvFAxyc27GXpf02",  # Taylor Swift
-        "3TVXtAsR1Inumwj472S9r4",  # Drake
-        "6eUKZXaKkcviH0Ku9w2n3V",  # Ed Sheeran
-        "6qqNVTkY8uBg9cP3Jd7DAH",  # Billie Eilish
-    ]
 
-    for artist_id in artist_ids:
-        artist_info = sp.artist(artist_id)
-        artist_name = artist_info["name"]
+def iter_artist_tracks(sp, artist_id: str, artist_name: str,
+                       prefetch: bool = False, skip_album_ids=frozenset(),
+                       fetched_albums: list | None = None):
+    """
+    Yield track rows for one artist, page by page (albums -> tracks).
 
-        albums = sp.artist_albums(artist_id, limit=20)
+    Album tracklists come from the batched /albums endpoint; albums with
+    more than one page of tracks are followed to the end. Albums listed in
+    skip_album_ids are not fetched at all (incremental runs). Every album
+    that was fetched, including ones with no tracks, is appended to
+    fetched_albums when given.
+    """
+    first_page = sp.artist_albums(artist_id, limit=50)
 
-        for album in albums["items"]:
-            album_id = album["id"]
-            album_name = album["name"]
+    for albums in iter_pages(sp, first_page, prefetch):
+        album_ids = [
+            album["id"] for album in albums["items"]
+            if album["id"] not in skip_album_ids
+        ]
+        if not album_ids:
+            continue
 
-            tracks = sp.album_tracks(album_id)
+        for album_id, album in fetch_albums(sp, album_ids).items():
+            album_name = album["name"]
+            if fetched_albums is not None:
+                fetched_albums.append({
+                    "artist": artist_name,
+                    "artist_id": artist_id,
+                    "album_name": album_name,
+                    "album_id": album_id,
+                })
 
-            for track in tracks["items"]:
-                tracks_data.append(
-                    {
+            for tracks in iter_pages(sp, album["tracks"], prefetch):
+                for track in tracks["items"]:
+                    yield {
                         "artist": artist_name,
                         "artist_id": artist_id,
                         "album_name": album_name,
@@ -59,14 +182,187 @@ def extract():
                         "duration_ms": track["duration_ms"],
                         "explicit": track["explicit"],
                     }
-                )
 
-    df = pd.DataFrame(tracks_data)
+
+def _ordered_map(fn, items, max_workers: int):
+    """
+    Like ThreadPoolExecutor.map, but only keeps a small window of futures
+    in flight so finished-but-unconsumed results stay bounded.
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        pending = deque()
+        for item in items:
+            pending.append(pool.submit(fn, item))
+            if len(pending) >= max_workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def iter_tracks(artist_ids: list[str] | None = None,
+                max_workers: int | None = None,
+                prefetch: bool = False,
+                skip_album_ids=frozenset(),
+                fetched_albums: list | None = None):
+    """
+    Yield track rows for all artists, in artist_ids order.
+
+    With max_workers > 1 artists are fetched concurrently on a bounded
+    thread pool; each worker collects one artist's rows and they are
+    yielded in submission order, so output matches the sequential run.
+    """
+    if artist_ids is None:
+        artist_ids = ARTIST_IDS
+    if max_workers is None:
+        max_workers = SPOTIFY_EXTRACT_WORKERS
+
+    sp = get_spotify_client()
+
+    # One /artists?ids= call per 50 artists instead of one call each
+    artists = fetch_artists(sp, artist_ids)
+
+    missing = [a for a in artist_ids if a not in artists]
+    if missing:
+        # Spotify returns null for unknown or removed IDs
+        print(f"⚠ Skipping unknown artist IDs: {missing}")
+        artist_ids = [a for a in artist_ids if a in artists]
+
+    def _artist_rows(artist_id):
+        return iter_artist_tracks(
+            sp, artist_id, artists[artist_id]["name"], prefetch, skip_album_ids,
+            fetched_albums,
+        )
+
+    if max_workers > 1:
+        for rows in _ordered_map(lambda a: list(_artist_rows(a)), artist_ids, max_workers):
+            yield from rows
+    else:
+        for artist_id in artist_ids:
+            yield from _artist_rows(artist_id)
+
+
+def extract(artist_ids: list[str] | None = None,
+            max_workers: int | None = None,
+            prefetch: bool = False,
+            skip_album_ids=frozenset(),
+            fetched_albums: list | None = None) -> pd.DataFrame:
+    """
+    Extract tracks for multiple artists from Spotify and return a pandas DataFrame.
+
+    Rows are streamed from iter_tracks() and turned into DataFrame blocks of
+    EXTRACT_CHUNK_ROWS, so the full catalogue never sits in a list of dicts.
+    Each block is compacted with the dtype plan as soon as it is built.
+    """
+    frames = []
+    block = []
+    plain_bytes = 0
+
+    def add_block(rows):
+        nonlocal plain_bytes
+        frame = pd.DataFrame(rows, columns=TRACK_COLUMNS)
+        plain_bytes += memory_bytes(frame)
+        frames.append(apply_dtype_plan(frame))
+
+    for row in iter_tracks(artist_ids, max_workers, prefetch, skip_album_ids, fetched_albums):
+        block.append(row)
+        if len(block) == EXTRACT_CHUNK_ROWS:
+            add_block(block)
+            block = []
+
+    if block or not frames:
+        add_block(block)
+
+    df = concat_compact(frames)
+    memory_report("extract", plain_bytes, memory_bytes(df))
     print(df["artist"].value_counts())
+    print(f"Spotify API calls: {rate_limiter.stats()}")
+    if response_cache is not None:
+        print(f"Spotify response cache: {response_cache.stats()}")
     return df
 
 
+def _write_chunk(rows: list[dict], path: str, file_format: str):
+    df = pd.DataFrame(rows, columns=TRACK_COLUMNS)
+    if file_format == "parquet":
+        df.to_parquet(path, index=False)
+    else:
+        df.to_csv(path, index=False)
+
+
+def extract_to_files(output_dir: str,
+                     chunk_rows: int = 100_000,
+                     file_format: str = "csv",
+                     artist_ids: list[str] | None = None,
+                     max_workers: int | None = None,
+                     prefetch: bool = False,
+                     skip_album_ids=frozenset(),
+                     file_prefix: str = "tracks_raw") -> dict:
+    """
+    Stream extracted rows into rotating files of at most chunk_rows rows
+    (tracks_raw_part-00000.csv, ...), flushing each chunk as soon as it is
+    full. Memory stays at one chunk no matter how many artists are configured.
+
+    Returns the manifest (also written to <output_dir>/manifest.json):
+        {"format": ..., "total_rows": ..., "files": [{"path", "rows"}, ...]}
+    """
+    if file_format not in ("csv", "parquet"):
+        raise ValueError(f"Unsupported file_format: {file_format}")
+
+    os.makedirs(output_dir, exist_ok=True)
+    manifest = {"format": file_format, "total_rows": 0, "files": []}
+    block = []
+
+    def _flush():
+        path = os.path.join(
+            output_dir, f"{file_prefix}_part-{len(manifest['files']):05d}.{file_format}"
+        )
+        _write_chunk(block, path, file_format)
+        manifest["files"].append({"path": path, "rows": len(block)})
+        manifest["total_rows"] += len(block)
+        print(f"  wrote {len(block)} rows -> {path}")
+
+    for row in iter_tracks(artist_ids, max_workers, prefetch, skip_album_ids):
+        block.append(row)
+        if len(block) == chunk_rows:
+            _flush()
+            block = []
+
+    if block or not manifest["files"]:
+        _flush()
+
+    with open(os.path.join(output_dir, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+    return manifest
+
+
+def extract_incremental(index_location: str,
+                        artist_ids: list[str] | None = None,
+                        max_workers: int | None = None,
+                        snapshot: bool = False):
+    """
+    Extract only albums not yet in the album index at index_location
+    (local path or s3:// URI), then add them to the index.
+
+    Returns (delta_df, snapshot_df). snapshot_df is the full catalogue
+    rebuilt from the index when snapshot=True, otherwise None.
+    """
+    index = AlbumIndex.load(index_location)
+    known = index.album_ids()
+
+    fetched = []
+    delta = extract(artist_ids, max_workers, skip_album_ids=known, fetched_albums=fetched)
+    new_albums = index.add_rows(delta.to_dict("records"))
+    # albums with no tracks are recorded too, so they are not fetched again
+    new_albums += index.add_albums(fetched)
+    index.save(index_location)
+
+    print(f"Album index: {len(known)} known, {new_albums} new, {len(delta)} new tracks")
+
+    return delta, (index.to_dataframe() if snapshot else None)
+
+
 if __name__ == "__main__":
     df = extract()
     print(df.head())
-    df.to_csv("tracks_raw.csv", index=False)
\ No newline at end of file
+    df.to_csv("tracks_raw.csv", index=False)
@@ -0,0 +1,146 @@
+# src/ingestion/rate_limit.py
+
+"""
+Process-wide rate limiting for Spotify API calls.
+
+A single token bucket is shared by every worker thread. When Spotify
+answers 429 the bucket pauses for the Retry-After interval, halves its
+rate, and then climbs back towards the configured rate on each success
+(AIMD). Counters for throttled and retried requests are kept so a run
+can report how close it is to the API limit.
+"""
+
+import functools
+import threading
+import time
+
+
+def retry_after_seconds(exc: Exception, attempt: int) -> float | None:
+    """
+    Return how long to wait before retrying `exc`, or None if it is not a 429.
+
+    Works for spotipy's SpotifyException (http_status/headers) and for
+    requests' HTTPError (response.status_code/response.headers).
+    Falls back to exponential backoff if Retry-After is missing.
+    """
+    response = getattr(exc, "response", None)
+    status = getattr(exc, "http_status", None) or getattr(response, "status_code", None)
+    if status != 429:
+        return None
+
+    headers = getattr(exc, "headers", None) or getattr(response, "headers", None) or {}
+    try:
+        return max(float(headers.get("Retry-After")), 0.0)
+    except (TypeError, ValueError):
+        return float(2 ** attempt)
+
+
+class RateLimiter:
+    """
+    Thread-safe token bucket with Retry-After handling and adaptive backoff.
+    """
+
+    def __init__(self, rate: float, burst: int | None = None, max_retries: int = 5,
+                 clock=time.monotonic, sleep=time.sleep):
+        self.max_rate = float(rate)
+        self.rate = float(rate)
+        self.min_rate = max(self.max_rate / 16, 0.1)
+        self.burst = burst or max(1, int(rate))
+        self.max_retries = max_retries
+
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._tokens = float(self.burst)
+        self._updated = clock()
+        self._blocked_until = 0.0
+
+        self.requests = 0
+        self.throttled = 0
+        self.retried = 0
+
+    def _refill(self, now: float):
+        elapsed = max(0.0, now - self._updated)
+        self._tokens = min(self.burst, self._tokens + elapsed * self.rate)
+        self._updated = max(self._updated, now)
+
+    def acquire(self):
+        """Block until a request may be sent."""
+        while True:
+            with self._lock:
+                now = self._clock()
+                if now < self._blocked_until:
+                    wait = self._blocked_until - now
+                else:
+                    self._refill(now)
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        self.requests += 1
+                        return
+                    wait = (1 - self._tokens) / self.rate
+            # floor keeps float rounding from spinning on a sub-µs wait
+            self._sleep(max(wait, 0.001))
+
+    def on_throttled(self, retry_after: float):
+        """Pause every worker for `retry_after` seconds and halve the rate."""
+        with self._lock:
+            self.throttled += 1
+            self._blocked_until = max(self._blocked_until, self._clock() + retry_after)
+            self._tokens = 0.0
+            self._updated = self._blocked_until
+            self.rate = max(self.min_rate, self.rate / 2)
+
+    def on_success(self):
+        """Additive increase back towards the configured rate."""
+        if self.rate < self.max_rate:
+            with self._lock:
+                self.rate = min(self.max_rate, self.rate + self.max_rate / 10)
+
+    def call(self, fn, *args, **kwargs):
+        """Run fn under the limiter, retrying 429 responses up to max_retries."""
+        attempt = 0
+        while True:
+            self.acquire()
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as exc:
+                retry_after = retry_after_seconds(exc, attempt)
+                if retry_after is None or attempt >= self.max_retries:
+                    raise
+                self.on_throttled(retry_after)
+                with self._lock:
+                    self.retried += 1
+                attempt += 1
+                continue
+
+            self.on_success()
+            return result
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "throttled": self.throttled,
+            "retried": self.retried,
+            "current_rate": round(self.rate, 2),
+        }
+
+
+class RateLimitedClient:
+    """
+    Proxy that routes every method call on `client` through `limiter`.
+    """
+
+    def __init__(self, client, limiter: RateLimiter):
+        self._client = client
+        self._limiter = limiter
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if not callable(attr):
+            return attr
+
+        @functools.wraps(attr)
+        def limited(*args, **kwargs):
+            return self._limiter.call(attr, *args, **kwargs)
+
+        return limited
@@ -0,0 +1,262 @@
+# src/ingestion/response_cache.py
+
+"""
+Persistent on-disk cache for Spotify Web API GET responses.
+
+Responses are stored in a single SQLite file, keyed by URL + query
+params. Each endpoint has its own TTL (album tracklists barely change,
+an artist's album list changes more often). Stale entries that carried
+an ETag are revalidated with If-None-Match, so a 304 costs no payload.
+When the file grows past max_bytes the least recently used entries are
+evicted.
+
+Re-runs and Airflow retries of the extract task are then mostly served
+from disk instead of the API.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from urllib.parse import urlencode, urlsplit
+
+import spotipy
+from spotipy.exceptions import SpotifyException
+
+HOUR = 3600
+DAY = 24 * HOUR
+
+# TTL per endpoint template ({id} = one path segment holding an object ID)
+DEFAULT_TTLS = {
+    "albums": 7 * DAY,
+    "albums/{id}": 7 * DAY,
+    "albums/{id}/tracks": 7 * DAY,
+    "tracks": 7 * DAY,
+    "tracks/{id}": 7 * DAY,
+    "artists": DAY,
+    "artists/{id}": DAY,
+    "artists/{id}/albums": 6 * HOUR,
+}
+DEFAULT_TTL = HOUR
+
+
+def endpoint_template(url: str) -> str:
+    """
+    'https://api.spotify.com/v1/artists/abc/albums?limit=50' -> 'artists/{id}/albums'
+    """
+    path = urlsplit(url).path
+    segments = [s for s in path.split("/") if s]
+    if segments and segments[0] == "v1":
+        segments = segments[1:]
+    return "/".join("{id}" if i % 2 else seg for i, seg in enumerate(segments))
+
+
+def cache_key(url: str, params: dict | None) -> str:
+    params = {k: v for k, v in (params or {}).items() if v is not None}
+    if not params:
+        return url
+    return f"{url}{'&' if '?' in url else '?'}{urlencode(sorted(params.items()))}"
+
+
+@dataclass
+class CacheEntry:
+    key: str
+    body: dict
+    etag: str | None
+    fresh: bool
+
+
+class ResponseCache:
+    """
+    SQLite-backed response cache with per-endpoint TTLs and LRU eviction.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 256 * 1024 * 1024,
+                 ttls: dict | None = None, default_ttl: int = DEFAULT_TTL,
+                 clock=time.time):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        self.default_ttl = default_ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key         TEXT PRIMARY KEY,
+                endpoint    TEXT NOT NULL,
+                body        BLOB NOT NULL,
+                etag        TEXT,
+                stored_at   REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                size        INTEGER NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS responses_lru ON responses (accessed_at)"
+        )
+        self._conn.commit()
+
+        # Running total of stored bytes, so eviction never has to SUM the table
+        self._total_bytes = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()[0]
+
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self.evictions = 0
+
+    def ttl_for(self, url: str) -> int:
+        return self.ttls.get(endpoint_template(url), self.default_ttl)
+
+    def lookup(self, url: str, params: dict | None = None) -> CacheEntry | None:
+        """Return the cached entry (fresh or stale) for url+params, or None."""
+        key = cache_key(url, params)
+        now = self._clock()
+
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body, etag, stored_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            body, etag, stored_at = row
+            fresh = now - stored_at < self.ttl_for(url)
+            if fresh:
+                self.hits += 1
+                self._conn.execute(
+                    "UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key)
+                )
+                self._conn.commit()
+            else:
+                self.misses += 1
+
+        return CacheEntry(key, json.loads(zlib.decompress(body)), etag, fresh)
+
+    def store(self, url: str, params: dict | None, body: dict, etag: str | None = None):
+        key = cache_key(url, params)
+        now = self._clock()
+        blob = zlib.compress(json.dumps(body).encode("utf-8"))
+
+        with self._lock:
+            previous = self._conn.execute(
+                "SELECT size FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            self._conn.execute(
+                """
+                INSERT OR REPLACE INTO responses
+                    (key, endpoint, body, etag, stored_at, accessed_at, size)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                (key, endpoint_template(url), blob, etag, now, now, len(blob)),
+            )
+            self._total_bytes += len(blob) - (previous[0] if previous else 0)
+            self._evict()
+            self._conn.commit()
+
+    def mark_revalidated(self, entry: CacheEntry):
+        """A 304 came back: the stale entry is good for another TTL."""
+        now = self._clock()
+        with self._lock:
+            self.revalidated += 1
+            self._conn.execute(
+                "UPDATE responses SET stored_at = ?, accessed_at = ? WHERE key = ?",
+                (now, now, entry.key),
+            )
+            self._conn.commit()
+
+    def _evict(self, batch: int = 100):
+        """Drop least recently used entries until the running total fits."""
+        while self._total_bytes > self.max_bytes:
+            rows = self._conn.execute(
+                "SELECT key, size FROM responses ORDER BY accessed_at ASC LIMIT ?", (batch,)
+            ).fetchall()
+            if not rows:
+                self._total_bytes = 0
+                return
+            for key, size in rows:
+                if self._total_bytes <= self.max_bytes:
+                    return
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._total_bytes -= size
+                self.evictions += 1
+
+    def size_bytes(self) -> int:
+        with self._lock:
+            return self._total_bytes
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "revalidated": self.revalidated,
+            "evictions": self.evictions,
+        }
+
+    def close(self):
+        self._conn.close()
+
+
+class CachedSpotify(spotipy.Spotify):
+    """
+    spotipy client whose GET calls go through a ResponseCache.
+
+    Cache misses and revalidations are sent through `rate_limiter`
+    (when given), so hits never spend rate-limit tokens.
+    """
+
+    def __init__(self, *args, response_cache: ResponseCache, rate_limiter=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.response_cache = response_cache
+        self.rate_limiter = rate_limiter
+
+    def _get(self, url, args=None, payload=None, **kwargs):
+        if args:
+            kwargs.update(args)
+        if not url.startswith("http"):
+            url = self.prefix + url
+
+        entry = self.response_cache.lookup(url, kwargs)
+        if entry is not None and entry.fresh:
+            return entry.body
+
+        if self.rate_limiter is not None:
+            return self.rate_limiter.call(self._fetch, url, kwargs, entry)
+        return self._fetch(url, kwargs, entry)
+
+    def _fetch(self, url: str, params: dict, entry: CacheEntry | None):
+        headers = self._auth_headers()
+        if entry is not None and entry.etag:
+            headers["If-None-Match"] = entry.etag
+
+        response = self._session.get(
+            url,
+            headers=headers,
+            params={k: v for k, v in params.items() if v is not None},
+            proxies=self.proxies,
+            timeout=self.requests_timeout,
+        )
+
+        if response.status_code == 304 and entry is not None:
+            self.response_cache.mark_revalidated(entry)
+            return entry.body
+
+        if not response.ok:
+            raise SpotifyException(
+                response.status_code,
+                -1,
+                f"{response.url}:\n {response.text or None}",
+                headers=response.headers,
+            )
+
+        body = response.json()
+        self.response_cache.store(url, params, body, response.headers.get("ETag"))
+        return body
@@ -0,0 +1,56 @@
+# src/ingestion/spotify_batch.py
+
+"""
+Batched lookups against Spotify's multi-ID catalogue endpoints.
+
+Instead of one request per object, IDs are grouped into the largest
+batch each endpoint accepts:
+
+    /artists?ids=   up to 50 IDs
+    /albums?ids=    up to 20 IDs
+    /tracks?ids=    up to 50 IDs
+
+Every helper returns a dict of id -> object. IDs Spotify does not know
+come back as null in the payload and are left out of the dict.
+"""
+
+MAX_ARTISTS_PER_CALL = 50
+MAX_ALBUMS_PER_CALL = 20
+MAX_TRACKS_PER_CALL = 50
+
+
+def chunked(ids, size: int):
+    """Yield consecutive lists of at most `size` IDs."""
+    batch = []
+    for item in ids:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _fetch_many(fetch, ids, size: int, payload_key: str) -> dict:
+    # dict.fromkeys drops repeated IDs but keeps the caller's order
+    results = {}
+    for batch in chunked(dict.fromkeys(ids), size):
+        for obj in fetch(batch)[payload_key]:
+            if obj:
+                results[obj["id"]] = obj
+    return results
+
+
+def fetch_artists(sp, artist_ids) -> dict:
+    """Full artist objects via GET /artists?ids=."""
+    return _fetch_many(sp.artists, artist_ids, MAX_ARTISTS_PER_CALL, "artists")
+
+
+def fetch_albums(sp, album_ids) -> dict:
+    """Full album objects (including the first page of tracks) via GET /albums?ids=."""
+    return _fetch_many(sp.albums, album_ids, MAX_ALBUMS_PER_CALL, "albums")
+
+
+def fetch_tracks(sp, track_ids) -> dict:
+    """Full track objects via GET /tracks?ids=."""
+    return _fetch_many(sp.tracks, track_ids, MAX_TRACKS_PER_CALL, "tracks")
@@ -1,16 +1,90 @@
+import hashlib
 import os
+from concurrent.futures import ThreadPoolExecutor
+
 import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+from botocore.exceptions import ClientError
+
+from config import (
+    S3_BUCKET_NAME,
+    S3_MULTIPART_CHUNK_MB,
+    S3_PROCESSED_PREFIX,
+    S3_UPLOAD_CONCURRENCY,
+)
+
+# Object metadata key holding the hex sha256 of the uploaded bytes
+SHA256_METADATA_KEY = "sha256"
+
+# Re-use a single S3 client (thread-safe), with enough pooled connections
+# for every concurrent part upload
+s3_client = boto3.client(
+    "s3", config=Config(max_pool_connections=max(10, S3_UPLOAD_CONCURRENCY))
+)
+
+
+def file_sha256(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """Hex sha256 of a local file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def transfer_config(max_concurrency: int = S3_UPLOAD_CONCURRENCY) -> TransferConfig:
+    chunk = S3_MULTIPART_CHUNK_MB * 1024 * 1024
+    return TransferConfig(
+        multipart_threshold=chunk,
+        multipart_chunksize=chunk,
+        max_concurrency=max_concurrency,
+        use_threads=max_concurrency > 1,
+    )
+
+
+def remote_sha256(bucket: str, key: str, client=None) -> str | None:
+    """sha256 stored on s3://bucket/key by a previous upload (None if absent)."""
+    client = client or s3_client
+    try:
+        head = client.head_object(Bucket=bucket, Key=key)
+    except ClientError as e:
+        if e.response["Error"]["Code"] in ("404", "NoSuchKey", "NotFound"):
+            return None
+        raise
+    return head.get("Metadata", {}).get(SHA256_METADATA_KEY)
+
+
+def _upload(local_csv_path: str, bucket: str, key: str, skip_unchanged: bool,
+            client, config: TransferConfig) -> bool:
+    """Upload one file; returns False if an identical object was already there."""
+    sha256 = file_sha256(local_csv_path)
+    if skip_unchanged and remote_sha256(bucket, key, client) == sha256:
+        print(f"⏭ Unchanged, skipping upload of {local_csv_path} (s3://{bucket}/{key})")
+        return False
+
+    print(f"▶ Uploading {local_csv_path} -> s3://{bucket}/{key}")
+    client.upload_file(
+        local_csv_path,
+        bucket,
+        key,
+        ExtraArgs={"Metadata": {SHA256_METADATA_KEY: sha256}, "ContentType": "text/csv"},
+        Config=config,
+    )
+    print(f"✅ Uploaded to s3://{bucket}/{key}")
+    return True
 
-from config import S3_BUCKET_NAME, S3_PROCESSED_PREFIX
 
-# Re-use a single S3 client
-s3_client = boto3.client("s3")
+def _default_key(local_csv_path: str, prefix: str = S3_PROCESSED_PREFIX) -> str:
+    return f"{prefix.rstrip('/')}/{os.path.basename(local_csv_path)}"
 
 
 def upload_csv_to_s3(
     local_csv_path: str,
     bucket: str | None = None,
     key: str | None = None,
+    skip_unchanged: bool = True,
+    client=None,
 ) -> str:
     """
     Upload a local CSV file to S3.
@@ -18,17 +92,56 @@ def upload_csv_to_s3(
     If bucket/key are not provided, it will use:
       - S3_BUCKET_NAME from src.config
       - S3_PROCESSED_PREFIX + filename
+    Large files go up as parallel multipart parts (S3_UPLOAD_CONCURRENCY,
+    S3_MULTIPART_CHUNK_MB). The file's sha256 is stored in the object
+    metadata; with skip_unchanged, a HEAD request finds an identical
+    object and the upload (and the S3 event it would fire) is skipped.
     Returns the full s3://... uri.
     """
     if bucket is None:
         bucket = S3_BUCKET_NAME
 
     if key is None:
-        filename = os.path.basename(local_csv_path)
-        key = f"{S3_PROCESSED_PREFIX}/{filename}"
+        key = _default_key(local_csv_path)
 
-    print(f"▶ Uploading {local_csv_path} -> s3://{bucket}/{key}")
-    s3_client.upload_file(local_csv_path, bucket, key)
-    print(f"✅ Uploaded to s3://{bucket}/{key}")
+    _upload(local_csv_path, bucket, key, skip_unchanged,
+            client or s3_client, transfer_config())
+
+    return f"s3://{bucket}/{key}"
+
+
+def upload_many(
+    local_csv_paths: list[str],
+    bucket: str | None = None,
+    prefix: str | None = None,
+    workers: int = 4,
+    skip_unchanged: bool = True,
+    client=None,
+) -> list[str]:
+    """
+    Upload several CSVs to bucket/prefix/<filename> over one shared client.
+
+    Files go up `workers` at a time. S3_UPLOAD_CONCURRENCY is split
+    between them, so the total number of open connections stays the same
+    as for a single upload. Returns the s3:// uris in input order.
+    """
+    if bucket is None:
+        bucket = S3_BUCKET_NAME
+    if prefix is None:
+        prefix = S3_PROCESSED_PREFIX
+
+    client = client or s3_client
+    workers = max(1, min(workers, len(local_csv_paths)))
+    config = transfer_config(max(1, S3_UPLOAD_CONCURRENCY // workers))
+    keys = [_default_key(path, prefix) for path in local_csv_paths]
+
+    def upload_one(path_key):
+        path, key = path_key
+        return _upload(path, bucket, key, skip_unchanged, client, config)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        uploaded = list(pool.map(upload_one, zip(local_csv_paths, keys)))
 
-    return f"s3://{bucket}/{key}"
\ No newline at end of file
+    print(f"✅ {sum(uploaded)} uploaded, {len(uploaded) - sum(uploaded)} unchanged "
+          f"of {len(uploaded)} files")
+    return [f"s3://{bucket}/{key}" for key in keys]
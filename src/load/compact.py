@@ -0,0 +1,322 @@
+# src/load/compact.py
+
+"""
+Compaction of the small timestamped CSVs under spotify/processed/.
+
+Every ingest run writes its own <name>_<YYYYMMDD_HHMMSS>.csv[.gz], so the
+prefix fills up with small objects that Athena, Glue and Snowflake's COPY
+each have to list and open one by one. This job merges them into a few
+target-sized files:
+
+1. Files directly under the prefix are grouped by name and time window
+   (from the timestamp in the key). Files already at the target size and
+   windows that are still open are left alone.
+2. Within a window, files are read newest first and packed into outputs of
+   up to target_bytes of input. Each track_id is kept once per window
+   (its newest row).
+3. Each output is uploaded under <prefix>compacted/, then a manifest
+   (inputs with their ETags, row counts, output sha256) is written
+   under <manifest_prefix>pending/, then the inputs are deleted and the
+   manifest moves to <manifest_prefix>retired/.
+
+Athena reads compacted/ with the rest of the table. Snowflake's COPY
+already loaded the inputs' rows, so the load tasks (snowflake/sql/03_tasks.sql,
+snowflake/database.sql) only match files directly under the prefix and
+skip compacted/.
+
+S3 has no multi-object transaction, so readers can briefly see an output
+together with its inputs. The manifest makes the retire step resumable:
+an interrupted run leaves its manifest under pending/, and
+resume_pending() (run at the start of every compaction) finishes
+deleting its inputs. Only pending/ is listed, so the cost of that check
+does not grow with the number of past runs.
+
+Usage:
+    python src/load/compact.py --bucket mani-spotify-etl-data --prefix spotify/processed/
+"""
+
+import argparse
+import csv
+import gzip
+import io
+import json
+import os
+import re
+import sys
+import tempfile
+from datetime import datetime, timedelta, timezone
+
+import boto3
+
+# Runnable as a script: put src/ on the path for config and ingestion.*
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from config import S3_BUCKET_NAME, S3_PROCESSED_PREFIX  # noqa: E402
+from ingestion.upload_to_s3 import (  # noqa: E402
+    SHA256_METADATA_KEY,
+    file_sha256,
+    transfer_config,
+)
+
+TARGET_MB = 128
+WINDOW_HOURS = 24
+COMPACTED_DIR = "compacted/"
+MANIFEST_PREFIX = "spotify/compaction/manifests/"
+PENDING_DIR = "pending/"
+RETIRED_DIR = "retired/"
+
+# <name>_<YYYYMMDD_HHMMSS>.csv or .csv.gz, e.g. tracks_transformed_20250101_120000.csv
+TIMESTAMPED_KEY = re.compile(r"^(?P<name>.+)_(?P<ts>\d{8}_\d{6})\.csv(?:\.gz)?$")
+
+# delete_objects accepts at most 1000 keys per call
+_DELETE_BATCH = 1000
+
+
+# ---------- planning ----------
+def list_candidates(client, bucket: str, prefix: str) -> list[dict]:
+    """Timestamped CSVs directly under prefix: {key, name, ts, size, etag}."""
+    found = []
+    paginator = client.get_paginator("list_objects_v2")
+    for page in paginator.paginate(Bucket=bucket, Prefix=prefix, Delimiter="/"):
+        for obj in page.get("Contents", []):
+            match = TIMESTAMPED_KEY.match(obj["Key"][len(prefix):])
+            if not match:
+                continue
+            found.append({
+                "key": obj["Key"],
+                "name": match["name"],
+                "ts": datetime.strptime(match["ts"], "%Y%m%d_%H%M%S").replace(tzinfo=timezone.utc),
+                "size": obj["Size"],
+                "etag": obj["ETag"].strip('"'),
+            })
+    return found
+
+
+def window_start(ts: datetime, window_hours: int) -> datetime:
+    epoch = datetime(1970, 1, 1, tzinfo=timezone.utc)
+    hours = int((ts - epoch).total_seconds() // 3600)
+    return epoch + timedelta(hours=hours - hours % window_hours)
+
+
+def plan_compaction(files: list[dict], target_bytes: int, window_hours: int = WINDOW_HOURS,
+                    now: datetime | None = None) -> list[dict]:
+    """
+    Group files into {"name", "window_start", "batches"} per closed window.
+    Each batch is a newest-first list of files whose sizes sum to at most
+    target_bytes; single-file batches are dropped (nothing to merge).
+    """
+    now = now or datetime.now(timezone.utc)
+    windows = {}
+    for f in files:
+        if f["size"] >= target_bytes:
+            continue
+        start = window_start(f["ts"], window_hours)
+        if start + timedelta(hours=window_hours) > now:
+            continue  # still receiving files
+        windows.setdefault((f["name"], start), []).append(f)
+
+    plan = []
+    for (name, start), group in sorted(windows.items(), key=lambda item: item[0]):
+        batches, batch, size = [], [], 0
+        for f in sorted(group, key=lambda f: (f["ts"], f["key"]), reverse=True):
+            if batch and size + f["size"] > target_bytes:
+                batches.append(batch)
+                batch, size = [], 0
+            batch.append(f)
+            size += f["size"]
+        batches.append(batch)
+        batches = [b for b in batches if len(b) > 1]
+        if batches:
+            plan.append({"name": name, "window_start": start, "batches": batches})
+    return plan
+
+
+# ---------- merge ----------
+def _open_rows(client, bucket: str, key: str):
+    """Stream an S3 CSV (plain or .gz) as csv.reader rows."""
+    body = client.get_object(Bucket=bucket, Key=key)["Body"]
+    raw = gzip.GzipFile(fileobj=body) if key.endswith(".gz") else body
+    # newline="" leaves line splitting to csv: U+2028 etc. stay inside fields
+    return csv.reader(io.TextIOWrapper(raw, encoding="utf-8", newline=""))
+
+
+def merge_batch(client, bucket: str, batch: list[dict], out, seen: set) -> dict:
+    """
+    Write batch (newest first) to the text file out as one CSV, skipping
+    track_ids in seen (which is updated). The first file's header is the
+    output header; other files are mapped onto it by column name.
+    """
+    header = None
+    rows_in = rows_out = 0
+    writer = csv.writer(out)
+    for f in batch:
+        reader = _open_rows(client, bucket, f["key"])
+        file_header = next(reader, None)
+        f["rows"] = 0
+        if file_header is None:
+            continue
+        if header is None:
+            header = file_header
+            writer.writerow(header)
+        positions = [file_header.index(c) if c in file_header else None for c in header]
+        track_idx = file_header.index("track_id") if "track_id" in file_header else None
+
+        for row in reader:
+            if not row:
+                continue
+            f["rows"] += 1
+            track_id = row[track_idx] if track_idx is not None and track_idx < len(row) else ""
+            if track_id:
+                if track_id in seen:
+                    continue
+                seen.add(track_id)
+            writer.writerow([row[i] if i is not None and i < len(row) else "" for i in positions])
+            rows_out += 1
+        rows_in += f["rows"]
+
+    return {"rows_in": rows_in, "rows_out": rows_out}
+
+
+# ---------- manifests / retire ----------
+def _put_manifest(client, bucket: str, key: str, manifest: dict):
+    client.put_object(
+        Bucket=bucket,
+        Key=key,
+        Body=json.dumps(manifest, indent=2, default=str).encode("utf-8"),
+        ContentType="application/json",
+    )
+
+
+def retire_inputs(client, bucket: str, manifest_prefix: str, name: str, manifest: dict):
+    """
+    Delete a manifest's inputs, then move the manifest (name, e.g.
+    "x.json") from pending/ to retired/ under manifest_prefix.
+    """
+    keys = [f["key"] for f in manifest["inputs"]]
+    for i in range(0, len(keys), _DELETE_BATCH):
+        resp = client.delete_objects(
+            Bucket=bucket,
+            Delete={"Objects": [{"Key": k} for k in keys[i:i + _DELETE_BATCH]], "Quiet": True},
+        )
+        if resp.get("Errors"):
+            raise RuntimeError(f"Failed to delete compacted inputs: {resp['Errors']}")
+    manifest["status"] = "retired"
+    manifest["retired_at"] = datetime.now(timezone.utc).isoformat()
+    _put_manifest(client, bucket, f"{manifest_prefix}{RETIRED_DIR}{name}", manifest)
+    client.delete_object(Bucket=bucket, Key=f"{manifest_prefix}{PENDING_DIR}{name}")
+
+
+def resume_pending(client, bucket: str, manifest_prefix: str = MANIFEST_PREFIX) -> int:
+    """Finish retiring inputs of manifests left under pending/ by an interrupted run."""
+    resumed = 0
+    pending = f"{manifest_prefix}{PENDING_DIR}"
+    paginator = client.get_paginator("list_objects_v2")
+    for page in paginator.paginate(Bucket=bucket, Prefix=pending):
+        for obj in page.get("Contents", []):
+            manifest = json.loads(client.get_object(Bucket=bucket, Key=obj["Key"])["Body"].read())
+            print(f"▶ Resuming retire for {obj['Key']}")
+            retire_inputs(client, bucket, manifest_prefix, obj["Key"][len(pending):], manifest)
+            resumed += 1
+    return resumed
+
+
+# ---------- job ----------
+def compact_prefix(
+    bucket: str | None = None,
+    prefix: str | None = None,
+    target_bytes: int = TARGET_MB * 1024 * 1024,
+    window_hours: int = WINDOW_HOURS,
+    manifest_prefix: str = MANIFEST_PREFIX,
+    dry_run: bool = False,
+    now: datetime | None = None,
+    client=None,
+) -> list[dict]:
+    """
+    Compact the small timestamped CSVs under bucket/prefix. Returns the
+    manifests written (with dry_run, the planned ones; nothing is written).
+    """
+    bucket = bucket or S3_BUCKET_NAME
+    prefix = (prefix or S3_PROCESSED_PREFIX).rstrip("/") + "/"
+    client = client or boto3.client("s3")
+    run_id = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
+
+    if not dry_run:
+        resume_pending(client, bucket, manifest_prefix)
+
+    plan = plan_compaction(list_candidates(client, bucket, prefix), target_bytes, window_hours, now)
+    manifests = []
+
+    for window in plan:
+        seen = set()  # newest row per track_id across the whole window
+        stamp = window["window_start"].strftime("%Y%m%d_%H%M%S")
+        for part, batch in enumerate(window["batches"]):
+            out_key = f"{prefix}{COMPACTED_DIR}{window['name']}_{stamp}_{run_id}_{part:03d}.csv"
+            manifest_name = f"{window['name']}_{stamp}_{run_id}_{part:03d}.json"
+            manifest = {
+                "run_id": run_id,
+                "status": "planned",
+                "window_start": window["window_start"].isoformat(),
+                "window_hours": window_hours,
+                "output": {"bucket": bucket, "key": out_key},
+                "inputs": batch,
+            }
+            if dry_run:
+                manifests.append(manifest)
+                continue
+
+            with tempfile.NamedTemporaryFile("w", suffix=".csv", encoding="utf-8",
+                                             newline="", delete=False) as tmp:
+                counts = merge_batch(client, bucket, batch, tmp, seen)
+            try:
+                sha256 = file_sha256(tmp.name)
+                client.upload_file(
+                    tmp.name,
+                    bucket,
+                    out_key,
+                    ExtraArgs={"Metadata": {SHA256_METADATA_KEY: sha256}, "ContentType": "text/csv"},
+                    Config=transfer_config(),
+                )
+                manifest["output"].update(bytes=os.path.getsize(tmp.name), sha256=sha256)
+            finally:
+                os.remove(tmp.name)
+
+            manifest.update(counts, duplicates_dropped=counts["rows_in"] - counts["rows_out"],
+                            status="written")
+            _put_manifest(client, bucket, f"{manifest_prefix}{PENDING_DIR}{manifest_name}", manifest)
+            retire_inputs(client, bucket, manifest_prefix, manifest_name, manifest)
+            print(f"✅ {len(batch)} files -> s3://{bucket}/{out_key} "
+                  f"({counts['rows_out']} rows, {manifest['duplicates_dropped']} duplicates dropped)")
+            manifests.append(manifest)
+
+    return manifests
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Merge small timestamped CSVs under an S3 prefix.")
+    parser.add_argument("--bucket", default=S3_BUCKET_NAME)
+    parser.add_argument("--prefix", default=S3_PROCESSED_PREFIX)
+    parser.add_argument("--target-mb", type=int, default=TARGET_MB,
+                        help="input bytes per output file (default: %(default)s)")
+    parser.add_argument("--window-hours", type=int, default=WINDOW_HOURS,
+                        help="only files from the same window are merged (default: %(default)s)")
+    parser.add_argument("--manifest-prefix", default=MANIFEST_PREFIX)
+    parser.add_argument("--dry-run", action="store_true", help="print the plan only")
+    args = parser.parse_args(argv)
+
+    manifests = compact_prefix(
+        args.bucket,
+        args.prefix,
+        target_bytes=args.target_mb * 1024 * 1024,
+        window_hours=args.window_hours,
+        manifest_prefix=args.manifest_prefix,
+        dry_run=args.dry_run,
+    )
+    if args.dry_run:
+        for m in manifests:
+            print(f"{len(m['inputs'])} files -> s3://{args.bucket}/{m['output']['key']}")
+    print(f"Total: {sum(len(m['inputs']) for m in manifests)} files -> {len(manifests)} outputs")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,197 @@
+# src/transform/album_state.py
+
+"""
+Persisted album aggregates for incremental transforms.
+
+The store keeps album_name -> set of track_ids, split into shards by a
+stable hash of the album name, plus a small summary: the histogram of
+album track counts (count -> number of albums). album_track_count is the
+size of an album's set and album_popularity_rank is a dense rank over the
+distinct counts, which the histogram alone determines.
+
+A run reads the summary and only the shards holding albums in its batch,
+and writes back just those, so its cost depends on the new data and the
+albums it touches, not on the size of the history. A track_id is assumed
+to belong to one album (true for Spotify IDs); re-seen tracks are
+recognised within their album's set.
+
+Dense ranks are global: when a batch creates or retires a count value,
+albums whose own count did not change can still move up or down a rank.
+Listing those albums would mean reading every shard, so apply() reports
+them as a count -> rank map instead; every earlier row with that count
+takes the new rank.
+
+Location is a local directory or an s3://bucket/prefix/ URI holding
+summary.json and albums/<shard>.json.gz.
+"""
+
+import bisect
+import gzip
+import json
+import os
+import zlib
+from dataclasses import dataclass, field
+from urllib.parse import urlsplit
+
+import boto3
+from botocore.exceptions import ClientError
+
+DEFAULT_SHARDS = 256
+
+
+def _split_s3_uri(uri: str) -> tuple[str, str]:
+    parts = urlsplit(uri)
+    return parts.netloc, parts.path.lstrip("/")
+
+
+def _read(location: str, name: str) -> bytes | None:
+    if location.startswith("s3://"):
+        bucket, prefix = _split_s3_uri(location)
+        try:
+            return boto3.client("s3").get_object(
+                Bucket=bucket, Key=f"{prefix.rstrip('/')}/{name}"
+            )["Body"].read()
+        except ClientError as e:
+            if e.response["Error"]["Code"] in ("NoSuchKey", "404"):
+                return None
+            raise
+    path = os.path.join(location, name)
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def _write(location: str, name: str, raw: bytes):
+    if location.startswith("s3://"):
+        bucket, prefix = _split_s3_uri(location)
+        boto3.client("s3").put_object(Bucket=bucket, Key=f"{prefix.rstrip('/')}/{name}", Body=raw)
+        return
+    path = os.path.join(location, name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(raw)
+    os.replace(tmp_path, path)
+
+
+@dataclass
+class AlbumDelta:
+    """What one batch changed (see AlbumAggregateStore.apply)."""
+    new_tracks: list = field(default_factory=list)  # (track_id, album) pairs added
+    albums: dict = field(default_factory=dict)      # album -> (count, rank), count changed
+    ranks: dict = field(default_factory=dict)       # count -> rank, rank changed
+
+
+class AlbumAggregateStore:
+    """
+    Sharded album_name -> {track_id, ...} with a global count histogram.
+    Shards are read on first use and only touched shards are saved.
+    """
+
+    def __init__(self, location: str | None = None, shards: int = DEFAULT_SHARDS,
+                 histogram: dict | None = None):
+        self.location = location
+        self.shards = shards
+        self.histogram = {int(c): n for c, n in (histogram or {}).items() if n}
+        self.distinct = sorted(self.histogram)
+        self._loaded = {}   # shard id -> {album: set(track_ids)}
+        self._dirty = set()
+
+    # ---------- persistence ----------
+    @classmethod
+    def load(cls, location: str, shards: int = DEFAULT_SHARDS) -> "AlbumAggregateStore":
+        """Open the store at location (only its summary is read), or an empty one."""
+        raw = _read(location, "summary.json")
+        if raw is None:
+            return cls(location, shards)
+        summary = json.loads(raw)
+        return cls(location, summary["shards"], summary["histogram"])
+
+    def save(self):
+        """Write the touched shards, then the summary that refers to them."""
+        for shard in sorted(self._dirty):
+            data = {album: sorted(ids) for album, ids in self._loaded[shard].items()}
+            _write(self.location, self._shard_name(shard),
+                   gzip.compress(json.dumps(data, separators=(",", ":")).encode("utf-8")))
+        self._dirty.clear()
+        summary = {"shards": self.shards, "histogram": self.histogram}
+        _write(self.location, "summary.json", json.dumps(summary).encode("utf-8"))
+
+    def _shard_name(self, shard: int) -> str:
+        return f"albums/{shard:05d}.json.gz"
+
+    def _shard_of(self, album) -> int:
+        return zlib.crc32(str(album).encode("utf-8")) % self.shards
+
+    def _shard(self, album) -> dict:
+        shard = self._shard_of(album)
+        if shard not in self._loaded:
+            raw = _read(self.location, self._shard_name(shard)) if self.location else None
+            data = json.loads(gzip.decompress(raw)) if raw is not None else {}
+            self._loaded[shard] = {a: set(ids) for a, ids in data.items()}
+        return self._loaded[shard]
+
+    @property
+    def shards_loaded(self) -> int:
+        return len(self._loaded)
+
+    # ---------- lookups ----------
+    def tracks(self, album) -> set:
+        return self._shard(album).get(album, set())
+
+    def count(self, album) -> int:
+        return len(self.tracks(album))
+
+    def rank(self, count: int) -> int:
+        """Dense rank of an album with this many tracks (most tracks = 1)."""
+        return len(self.distinct) - bisect.bisect_left(self.distinct, count)
+
+    # ---------- updates ----------
+    def _move(self, old_count: int, new_count: int):
+        if old_count:
+            self.histogram[old_count] -= 1
+            if not self.histogram[old_count]:
+                del self.histogram[old_count]
+                self.distinct.pop(bisect.bisect_left(self.distinct, old_count))
+
+        if new_count not in self.histogram:
+            self.histogram[new_count] = 0
+            bisect.insort(self.distinct, new_count)
+        self.histogram[new_count] += 1
+
+    def apply(self, pairs) -> AlbumDelta:
+        """
+        Record (track_id, album_name) pairs; tracks already in their album
+        are ignored. Returns the tracks added, (count, rank) for albums
+        whose count changed, and the new rank of every count value whose
+        rank shifted.
+        """
+        old_distinct = list(self.distinct)
+        delta = AlbumDelta()
+
+        old_counts = {}
+        for track_id, album in pairs:
+            shard = self._shard(album)
+            ids = shard.setdefault(album, set())
+            if track_id in ids:
+                continue
+            old_counts.setdefault(album, len(ids))
+            ids.add(track_id)
+            self._dirty.add(self._shard_of(album))
+            delta.new_tracks.append((track_id, album))
+
+        for album, old_count in old_counts.items():
+            self._move(old_count, self.count(album))
+
+        for album in old_counts:
+            count = self.count(album)
+            delta.albums[album] = (count, self.rank(count))
+
+        if old_distinct != self.distinct:
+            for count in self.distinct:
+                old_rank = len(old_distinct) - bisect.bisect_left(old_distinct, count)
+                if count in old_distinct and self.rank(count) != old_rank:
+                    delta.ranks[count] = self.rank(count)
+
+        return delta
@@ -0,0 +1,148 @@
+"""
+Pluggable execution backends for the transform stage.
+
+Each backend runs the same steps as transform.transform_df — drop null
+and duplicate track_ids (first wins), rename, duration_minutes,
+length_category, album_track_count and dense album_popularity_rank —
+and returns a pandas DataFrame with the 10-column Snowflake schema.
+
+    pandas   reference implementation (single-threaded)
+    polars   multithreaded Rust engine (pip install polars)
+    pyarrow  multithreaded Arrow compute kernels (pip install pyarrow)
+
+polars and pyarrow are optional and only imported when selected.
+"""
+
+import pandas as pd
+
+from transform.transform import (
+    FINAL_COLUMNS,
+    LENGTH_LONG,
+    LENGTH_MEDIUM,
+    LENGTH_SHORT,
+    transform_df,
+)
+
+BACKENDS = ("pandas", "polars", "pyarrow")
+RENAMES = {"album": "album_name", "track": "track_name"}
+
+# Strings pd.read_csv treats as missing; passed to the other readers so
+# they drop/null exactly the same rows
+PANDAS_NA_VALUES = [
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan",
+    "1.#IND", "1.#QNAN", "<NA>", "N/A", "NA", "NULL", "NaN", "None",
+    "n/a", "nan", "null",
+]
+
+
+def run_pandas(input_path: str) -> pd.DataFrame:
+    return transform_df(pd.read_csv(input_path))
+
+
+def run_polars(input_path: str) -> pd.DataFrame:
+    import numpy as np
+    import polars as pl
+
+    # full-file schema inference, like pandas
+    df = pl.read_csv(input_path, infer_schema_length=None, null_values=PANDAS_NA_VALUES)
+    df = df.rename({k: v for k, v in RENAMES.items() if k in df.columns})
+
+    # polars folds constant divisions into multiplications, which is off by
+    # one ulp for some values; run this one expression through numpy instead
+    minutes = pl.col("duration_ms").map_batches(
+        lambda s: pl.Series(np.round(s.to_numpy() / 1000 / 60, 2), nan_to_null=True),
+        return_dtype=pl.Float64,
+    )
+
+    df = (
+        df.filter(pl.col("track_id").is_not_null())
+        .unique(subset=["track_id"], keep="first", maintain_order=True)
+        .with_columns(minutes.alias("duration_minutes"))
+        .with_columns(
+            pl.when(pl.col("duration_minutes") < 3).then(pl.lit(LENGTH_SHORT))
+            .when(pl.col("duration_minutes") <= 5).then(pl.lit(LENGTH_MEDIUM))
+            .otherwise(pl.lit(LENGTH_LONG))
+            .alias("length_category"),
+            pl.len().over("album_name").cast(pl.Int64).alias("album_track_count"),
+        )
+        .with_columns(
+            pl.col("album_track_count")
+            .rank("dense", descending=True)
+            .cast(pl.Int64)
+            .alias("album_popularity_rank")
+        )
+    )
+
+    return df.select(FINAL_COLUMNS).to_pandas()
+
+
+def run_pyarrow(input_path: str) -> pd.DataFrame:
+    import numpy as np
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    from pyarrow import csv
+
+    table = csv.read_csv(
+        input_path,
+        convert_options=csv.ConvertOptions(
+            null_values=PANDAS_NA_VALUES, strings_can_be_null=True
+        ),
+    )
+    table = table.rename_columns([RENAMES.get(c, c) for c in table.column_names])
+
+    # drop null track_ids, then keep the first row per track_id
+    table = table.filter(pc.is_valid(table["track_id"]))
+    table = table.append_column("_row", pa.array(np.arange(table.num_rows)))
+    first_rows = table.group_by("track_id", use_threads=True).aggregate([("_row", "min")])
+    first_rows = pc.take(first_rows["_row_min"], pc.sort_indices(first_rows["_row_min"]))
+    table = table.take(first_rows).drop_columns(["_row"])
+
+    # np.round(x, 2) is rint(x * 100) / 100; mirror it so ties round the same
+    minutes = pc.divide(
+        pc.divide(pc.cast(table["duration_ms"], pa.float64()), 1000), 60
+    )
+    minutes = pc.divide(
+        pc.round(pc.multiply(minutes, 100), ndigits=0, round_mode="half_to_even"), 100
+    )
+    category = pc.if_else(
+        pc.less(minutes, 3),
+        LENGTH_SHORT,
+        pc.if_else(pc.less_equal(minutes, 5), LENGTH_MEDIUM, LENGTH_LONG),
+    )
+    category = pc.if_else(pc.is_null(minutes), LENGTH_LONG, category)
+
+    albums = table.group_by("album_name", use_threads=True).aggregate(
+        [("track_id", "count")]
+    )
+    album_ranks = pc.rank(
+        albums["track_id_count"], sort_keys="descending", tiebreaker="dense"
+    )
+    positions = pc.index_in(table["album_name"], value_set=albums["album_name"])
+
+    table = (
+        table.append_column("duration_minutes", minutes)
+        .append_column("length_category", category)
+        .append_column(
+            "album_track_count",
+            pc.cast(pc.take(albums["track_id_count"], positions), pa.int64()),
+        )
+        .append_column(
+            "album_popularity_rank",
+            pc.cast(pc.take(album_ranks, positions), pa.int64()),
+        )
+    )
+
+    return table.select(FINAL_COLUMNS).to_pandas()
+
+
+_RUNNERS = {
+    "pandas": run_pandas,
+    "polars": run_polars,
+    "pyarrow": run_pyarrow,
+}
+
+
+def run_backend(input_path: str, backend: str = "pandas") -> pd.DataFrame:
+    if backend not in _RUNNERS:
+        raise ValueError(f"Unknown transform backend '{backend}', choose from {BACKENDS}")
+    return _RUNNERS[backend](input_path)
@@ -0,0 +1,83 @@
+# src/transform/csv_ranges.py
+
+"""
+Split an uncompressed CSV into byte ranges that start and end on row
+boundaries, so several processes can each parse their own slice of one
+file without reading the rest of it.
+
+A newline ends a row only outside a quoted field. With RFC 4180 quoting
+(a literal quote is written as ""), that is exactly where an even number
+of quote characters precede it, so byte_ranges() streams the file once
+counting quotes and moves each cut to the first such newline. Counting is
+a single bytes.count per block; no row is parsed in the parent.
+"""
+
+import io
+import os
+
+_BLOCK = 8 * 1024 * 1024
+
+
+def byte_ranges(path: str, parts: int,
+                block_size: int = _BLOCK) -> tuple[bytes, list[tuple[int, int]]]:
+    """
+    Return (header line, [(start, end), ...]): up to `parts` contiguous
+    ranges covering every byte after the header, each ending on a row end.
+    Empty ranges are dropped.
+    """
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        header = f.readline()
+        data_start = f.tell()
+        targets = [data_start + (size - data_start) * i // parts for i in range(1, parts)]
+        cuts = [data_start]
+
+        offset, quotes, t = data_start, 0, 0
+        while t < len(targets):
+            block = f.read(block_size)
+            if not block:
+                break
+            pos = 0
+            while t < len(targets):
+                newline = block.find(b"\n", max(targets[t] - offset, pos))
+                if newline < 0:
+                    break  # keep looking in the next block
+                quotes += block.count(b'"', pos, newline + 1)
+                pos = newline + 1
+                if quotes % 2 == 0:
+                    cuts.append(offset + pos)
+                    t += 1
+            quotes += block.count(b'"', pos)
+            offset += len(block)
+
+    cuts.append(size)
+    return header, [(a, b) for a, b in zip(cuts, cuts[1:]) if b > a]
+
+
+class _ByteRange(io.RawIOBase):
+    """Read-only raw stream over bytes [start, end) of a file."""
+
+    def __init__(self, path: str, start: int, end: int):
+        self._f = open(path, "rb")
+        self._f.seek(start)
+        self._left = end - start
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        n = self._f.readinto(memoryview(buffer)[:min(len(buffer), self._left)])
+        self._left -= n
+        return n
+
+    def close(self):
+        self._f.close()
+        super().close()
+
+
+def open_range(path: str, start: int, end: int, text: bool = False):
+    """Buffered binary (or, with text, UTF-8 csv-ready text) stream over a byte range."""
+    raw = io.BufferedReader(_ByteRange(path, start, end))
+    if text:
+        return io.TextIOWrapper(raw, encoding="utf-8", newline="")
+    return raw
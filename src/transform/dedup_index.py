@@ -0,0 +1,171 @@
+# src/transform/dedup_index.py
+
+"""
+Persistent cross-run dedup index of published track_ids.
+
+Two on-disk modes, picked by file suffix:
+
+- ".npy": exact. A sorted fixed-width bytes array (Spotify IDs are 22
+  characters, so "S22"), opened with np.load(mmap_mode="r") and queried
+  with a vectorized searchsorted. Size is ~22 bytes per published track.
+- ".bloom": approximate. A Bloom filter sized for `capacity` ids at a
+  false-positive rate `fp_rate`, stored as a fixed header followed by the
+  bit array and opened as a np.memmap. Size is ~1.2 bytes per id at 1%.
+  A false positive makes the transform drop a genuinely new track, and
+  it never lets a duplicate through.
+
+Loading maps the file instead of reading it, so opening a large index
+costs nothing up front. Only the pages a lookup touches are read.
+"""
+
+import hashlib
+import math
+import os
+import struct
+
+import numpy as np
+
+ID_WIDTH = 22
+
+BLOOM_MAGIC = b"TIDBLOOM"
+# magic, version, n_bits, n_hashes, capacity, n_added
+_BLOOM_HEADER = struct.Struct("<8sIQIQQ")
+
+
+def _as_bytes_array(track_ids) -> np.ndarray:
+    ids = np.asarray(list(track_ids), dtype=object)
+    width = max([ID_WIDTH] + [len(t) for t in ids])
+    return ids.astype(f"S{width}")
+
+
+def _atomic_write(path: str, chunks):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        for chunk in chunks:
+            f.write(chunk)
+    os.replace(tmp_path, path)
+
+
+class ExactTrackIndex:
+    """Sorted, unique S22 track_ids; membership by binary search."""
+
+    def __init__(self, ids: np.ndarray | None = None):
+        self.ids = ids if ids is not None else np.empty(0, dtype=f"S{ID_WIDTH}")
+
+    @classmethod
+    def load(cls, path: str) -> "ExactTrackIndex":
+        if not os.path.exists(path):
+            return cls()
+        return cls(np.load(path, mmap_mode="r"))
+
+    def save(self, path: str):
+        tmp_path = f"{path}.tmp.npy"
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        np.save(tmp_path, np.ascontiguousarray(self.ids))
+        os.replace(tmp_path, path)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def contains(self, track_ids) -> np.ndarray:
+        """Boolean mask: which of track_ids are already in the index."""
+        query = _as_bytes_array(track_ids)
+        if not len(self.ids) or not len(query):
+            return np.zeros(len(query), dtype=bool)
+        positions = np.searchsorted(self.ids, query)
+        found = self.ids[np.minimum(positions, len(self.ids) - 1)]
+        return (positions < len(self.ids)) & (found == query)
+
+    def add(self, track_ids):
+        new = _as_bytes_array(track_ids)
+        if len(new):
+            self.ids = np.union1d(self.ids, new)
+
+
+class BloomTrackIndex:
+    """Bloom filter over track_ids with double hashing (blake2b halves)."""
+
+    def __init__(self, capacity: int = 10_000_000, fp_rate: float = 0.01,
+                 bits: np.ndarray | None = None, n_hashes: int | None = None,
+                 n_added: int = 0):
+        if not 0 < fp_rate < 1:
+            raise ValueError("fp_rate must be between 0 and 1")
+        self.capacity = capacity
+        self.fp_rate = fp_rate
+        if bits is None:
+            n_bits = max(8, math.ceil(-capacity * math.log(fp_rate) / math.log(2) ** 2))
+            bits = np.zeros((n_bits + 7) // 8, dtype=np.uint8)
+            n_hashes = max(1, round(n_bits / capacity * math.log(2)))
+        self.bits = bits
+        self.n_bits = len(bits) * 8
+        self.n_hashes = n_hashes
+        self.n_added = n_added
+
+    @classmethod
+    def load(cls, path: str, capacity: int = 10_000_000,
+             fp_rate: float = 0.01) -> "BloomTrackIndex":
+        """Map an existing filter, or create an empty one with these parameters."""
+        if not os.path.exists(path):
+            return cls(capacity, fp_rate)
+        with open(path, "rb") as f:
+            header = f.read(_BLOOM_HEADER.size)
+        magic, _version, n_bits, n_hashes, capacity, n_added = _BLOOM_HEADER.unpack(header)
+        if magic != BLOOM_MAGIC:
+            raise ValueError(f"{path} is not a track_id Bloom filter")
+        bits = np.memmap(path, dtype=np.uint8, mode="r",
+                         offset=_BLOOM_HEADER.size, shape=(n_bits // 8,))
+        return cls(capacity, fp_rate, bits=bits, n_hashes=n_hashes, n_added=n_added)
+
+    def save(self, path: str):
+        header = _BLOOM_HEADER.pack(
+            BLOOM_MAGIC, 1, self.n_bits, self.n_hashes, self.capacity, self.n_added
+        )
+        _atomic_write(path, [header, np.ascontiguousarray(self.bits).tobytes()])
+
+    def __len__(self) -> int:
+        return self.n_added
+
+    def expected_fp_rate(self) -> float:
+        """False-positive rate at the current fill (grows past capacity)."""
+        return (1 - math.exp(-self.n_hashes * self.n_added / self.n_bits)) ** self.n_hashes
+
+    def _positions(self, track_ids) -> np.ndarray:
+        """(len(track_ids), n_hashes) bit positions."""
+        digests = b"".join(
+            hashlib.blake2b(str(t).encode("utf-8"), digest_size=16).digest() for t in track_ids
+        )
+        halves = np.frombuffer(digests, dtype="<u8").reshape(-1, 2)
+        h1, h2 = halves[:, :1], halves[:, 1:] | np.uint64(1)
+        i = np.arange(self.n_hashes, dtype=np.uint64)
+        return (h1 + i * h2) % np.uint64(self.n_bits)  # wraps mod 2**64, fine for hashing
+
+    def contains(self, track_ids) -> np.ndarray:
+        track_ids = list(track_ids)
+        if not track_ids:
+            return np.zeros(0, dtype=bool)
+        pos = self._positions(track_ids)
+        hit = (self.bits[pos >> np.uint64(3)] >> (pos & np.uint64(7)).astype(np.uint8)) & 1
+        return hit.all(axis=1)
+
+    def add(self, track_ids):
+        track_ids = list(track_ids)
+        if not track_ids:
+            return
+        if not self.bits.flags.writeable:
+            self.bits = np.array(self.bits)  # copy-on-write from the read-only map
+        pos = self._positions(track_ids).ravel()
+        np.bitwise_or.at(self.bits, pos >> np.uint64(3),
+                         (np.uint8(1) << (pos & np.uint64(7)).astype(np.uint8)))
+        self.n_added += len(track_ids)
+
+
+def load_dedup_index(path: str, capacity: int = 10_000_000, fp_rate: float = 0.01):
+    """Open the index at path: ".bloom" for a Bloom filter, anything else exact (.npy)."""
+    if path.endswith(".bloom"):
+        return BloomTrackIndex.load(path, capacity, fp_rate)
+    return ExactTrackIndex.load(path)
@@ -0,0 +1,152 @@
+# src/transform/parquet_output.py
+
+"""
+Parquet output for the pipeline's tables, plus matching Athena DDL.
+
+Files are written with zstd (default) or snappy compression and per
+row-group min/max statistics. Athena then reads only the columns a query
+references and skips row groups whose statistics rule them out.
+
+Column types mirror the CSV tables in athena/tables/ (Hive type names),
+so the Parquet tables can be queried with the same SQL. Regenerate the
+DDL after changing a column list:
+
+    python src/transform/parquet_output.py
+"""
+
+import os
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+PARQUET_COMPRESSIONS = ("zstd", "snappy")
+
+# Rows per row group: each group carries its own min/max statistics
+ROW_GROUP_ROWS = 128_000
+
+HIVE_TO_ARROW = {
+    "string": pa.string(),
+    "bigint": pa.int64(),
+    "boolean": pa.bool_(),
+    "double": pa.float64(),
+}
+
+# spotify_lambda_ingest output: track_to_row() plus the transform features,
+# in the order the Lambda writes them (it has no artist_id column)
+PROCESSED_COLUMNS = [
+    ("artist", "string"),
+    ("album_name", "string"),
+    ("track_name", "string"),
+    ("track_id", "string"),
+    ("duration_ms", "bigint"),
+    ("explicit", "boolean"),
+    ("album_release_date", "string"),
+    ("track_popularity", "bigint"),
+    ("album_id", "string"),
+    ("duration_minutes", "double"),
+    ("length_category", "string"),
+    ("album_track_count", "bigint"),
+    ("album_popularity_rank", "bigint"),
+]
+
+# spotify_lambda_transform_ingest output (athena/tables/transformed_ddl.sql)
+TRANSFORMED_COLUMNS = [
+    ("artist", "string"),
+    ("artist_id", "string"),
+    ("album_name", "string"),
+    ("album_id", "string"),
+    ("track_name", "string"),
+    ("track_id", "string"),
+    ("duration_ms", "bigint"),
+    ("explicit", "boolean"),
+    ("duration_min", "double"),
+    ("load_timestamp_utc", "string"),
+]
+
+# transform.transform output (the 10 Snowflake columns, FINAL_COLUMNS)
+TRACKS_COLUMNS = [
+    ("artist", "string"),
+    ("album_name", "string"),
+    ("track_name", "string"),
+    ("track_id", "string"),
+    ("duration_ms", "bigint"),
+    ("explicit", "boolean"),
+    ("duration_minutes", "double"),
+    ("length_category", "string"),
+    ("album_track_count", "bigint"),
+    ("album_popularity_rank", "bigint"),
+]
+
+# table name -> (columns, default location) for the generated DDL
+PARQUET_TABLES = {
+    "processed_parquet": (PROCESSED_COLUMNS, "s3://mani-spotify-etl-data/spotify/processed_parquet/"),
+    "transformed_parquet": (TRANSFORMED_COLUMNS, "s3://mani-spotify-etl-data/spotify/transformed_parquet/"),
+    "tracks_parquet": (TRACKS_COLUMNS, "s3://mani-spotify-etl-data/spotify/tracks_parquet/"),
+}
+
+
+def arrow_schema(columns: list[tuple[str, str]]) -> pa.Schema:
+    return pa.schema([(name, HIVE_TO_ARROW[hive_type]) for name, hive_type in columns])
+
+
+def dataframe_to_table(df, columns: list[tuple[str, str]]) -> pa.Table:
+    """
+    Arrow table for df in the given column order and types. float32
+    columns (see dtype_plan) are widened through their shortest decimal
+    repr, so 3.33 is stored as the double 3.33, not 3.3299999237.
+    """
+    arrays = []
+    for name, hive_type in columns:
+        s = df[name]
+        if s.dtype == "float32":
+            s = s.astype(str).astype("float64")
+        arrays.append(pa.array(s, from_pandas=True).cast(HIVE_TO_ARROW[hive_type]))
+    return pa.Table.from_arrays(arrays, schema=arrow_schema(columns))
+
+
+def write_parquet(table: pa.Table, where, compression: str = "zstd",
+                  row_group_rows: int = ROW_GROUP_ROWS):
+    """Write table to a path or binary file object with row-group statistics."""
+    if compression not in PARQUET_COMPRESSIONS:
+        raise ValueError(f"Unsupported Parquet compression: {compression}")
+    pq.write_table(
+        table,
+        where,
+        compression=compression,
+        row_group_size=row_group_rows,
+        write_statistics=True,
+    )
+
+
+def athena_ddl(table_name: str, columns: list[tuple[str, str]], location: str,
+               compression: str = "zstd") -> str:
+    """CREATE EXTERNAL TABLE for Parquet files under location (Glue Data Catalog)."""
+    column_lines = ", \n".join(f"  `{name}` {hive_type}" for name, hive_type in columns)
+    return (
+        f"CREATE EXTERNAL TABLE `{table_name}`(\n"
+        f"{column_lines})\n"
+        "STORED AS PARQUET\n"
+        "LOCATION\n"
+        f"  '{location}'\n"
+        "TBLPROPERTIES (\n"
+        "  'classification'='parquet', \n"
+        f"  'parquet.compression'='{compression.upper()}')\n"
+    )
+
+
+def write_athena_ddl(output_dir: str, compression: str = "zstd") -> list[str]:
+    """Write <table>_ddl.sql for every table in PARQUET_TABLES; returns the paths."""
+    os.makedirs(output_dir, exist_ok=True)
+    paths = []
+    for table_name, (columns, location) in PARQUET_TABLES.items():
+        path = os.path.join(output_dir, f"{table_name}_ddl.sql")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(athena_ddl(table_name, columns, location, compression))
+        paths.append(path)
+    return paths
+
+
+if __name__ == "__main__":
+    repo_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    for written in write_athena_ddl(os.path.join(repo_root, "athena", "tables")):
+        print(f"Wrote {written}")
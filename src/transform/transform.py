@@ -1,14 +1,77 @@
+import csv
+import os
+import shutil
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
 import pandas as pd
 
-def transform(input_path: str = "tracks_raw.csv",
-              output_path: str = "tracks_transformed.csv") -> pd.DataFrame:
+# Runnable as a script: put src/ on the path for dtype_plan and transform.*
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from dtype_plan import READ_DTYPES, apply_dtype_plan, memory_bytes, memory_report, object_bytes  # noqa: E402
+
+LENGTH_SHORT = "Short (<3 min)"
+LENGTH_MEDIUM = "Medium (3-5 min)"
+LENGTH_LONG = "Long (>5 min)"
+
+# 🎯 VERY IMPORTANT — final schema for Snowflake (10 columns)
+FINAL_COLUMNS = [
+    "artist",
+    "album_name",
+    "track_name",
+    "track_id",
+    "duration_ms",
+    "explicit",
+    "duration_minutes",
+    "length_category",
+    "album_track_count",
+    "album_popularity_rank"
+]
+
+
+def length_category(minutes: np.ndarray) -> np.ndarray:
     """
-    Transform raw Spotify track data into analytics-ready format.
-    Produces exactly the 10 columns that Snowflake expects.
+    Vectorized length bucket: <3 Short, 3-5 Medium, otherwise Long.
+    NaN falls through to Long, same as the old per-row function.
     """
+    return np.select(
+        [minutes < 3, minutes <= 5],
+        [LENGTH_SHORT, LENGTH_MEDIUM],
+        default=LENGTH_LONG,
+    ).astype(object)
 
-    # 1. Load raw data
-    df = pd.read_csv(input_path)
+
+def album_aggregates(album_names: pd.Series) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Per-row album_track_count and album_popularity_rank from one grouping pass.
+
+    Rows are already unique by track_id, so the per-album track count is a
+    bincount over the factorized album codes. The dense rank (most tracks =
+    1) comes from the sorted distinct counts via searchsorted.
+    """
+    codes, albums = pd.factorize(album_names)
+    counts = np.bincount(codes[codes >= 0], minlength=len(albums))
+
+    distinct = np.unique(counts)
+    ranks = len(distinct) - np.searchsorted(distinct, counts)
+
+    if (codes >= 0).all():
+        return counts[codes], ranks[codes]
+
+    # rows without album_name get NaN, like Series.map() did
+    return (
+        pd.Series(counts).reindex(codes).to_numpy(),
+        pd.Series(ranks).reindex(codes).to_numpy(),
+    )
+
+
+def transform_df(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Cleaning + feature engineering on an in-memory raw DataFrame.
+    """
 
     # 2. Cleaning
     df = df.dropna(subset=["track_id"])            # remove records without ID
@@ -21,54 +84,368 @@ def transform(input_path: str = "tracks_raw.csv",
     })
 
     # 4a. Duration in minutes
-    df["duration_minutes"] = (df["duration_ms"] / 1000 / 60).round(2)
+    df["duration_minutes"] = (df["duration_ms"].astype("float64") / 1000 / 60).round(2)
 
     # 4b. Length category
-    def categorize_length(m):
-        if m < 3:
-            return "Short (<3 min)"
-        elif 3 <= m <= 5:
-            return "Medium (3-5 min)"
-        else:
-            return "Long (>5 min)"
+    df["length_category"] = length_category(df["duration_minutes"].to_numpy())
 
-    df["length_category"] = df["duration_minutes"].apply(categorize_length)
+    # 4c + 4d. Album-level track count and popularity rank
+    track_counts, ranks = album_aggregates(df["album_name"])
+    df["album_track_count"] = track_counts
+    df["album_popularity_rank"] = pd.Series(ranks, index=df.index).astype(int)
 
-    # 4c. Album-level track count
-    album_track_counts = df.groupby("album_name")["track_id"].nunique()
-    df["album_track_count"] = df["album_name"].map(album_track_counts)
+    return df[FINAL_COLUMNS]
 
-    # 4d. Album popularity rank
-    album_rank = (
-        album_track_counts
-        .sort_values(ascending=False)
-        .rank(method="dense", ascending=False)
-    )
-    df["album_popularity_rank"] = df["album_name"].map(album_rank).astype(int)
-
-    # 🎯 VERY IMPORTANT — final schema for Snowflake (10 columns)
-    final_columns = [
-        "artist",
-        "album_name",
-        "track_name",
-        "track_id",
-        "duration_ms",
-        "explicit",
-        "duration_minutes",
-        "length_category",
-        "album_track_count",
-        "album_popularity_rank"
-    ]
-    df = df[final_columns]
+
+def transform(input_path: str = "tracks_raw.csv",
+              output_path: str = "tracks_transformed.csv",
+              backend: str = "pandas",
+              dedup_index: str | None = None,
+              output_format: str = "csv",
+              compression: str = "zstd") -> pd.DataFrame:
+    """
+    Transform raw Spotify track data into analytics-ready format.
+    Produces exactly the 10 columns that Snowflake expects.
+
+    backend selects the execution engine: "pandas" (default), or the
+    multithreaded "polars" / "pyarrow" engines (see transform.backends).
+
+    Input and output frames are compacted with dtype_plan (categoricals,
+    small nullable ints, float32); the CSV written is unchanged.
+
+    dedup_index (a .npy or .bloom path, see transform.dedup_index) drops
+    tracks already published by earlier runs and records the ones written
+    now. Album aggregates still describe the whole batch, so a full
+    snapshot keeps full album counts while publishing only new rows.
+
+    output_format="parquet" writes output_path as Parquet (compression
+    "zstd" or "snappy", with row-group statistics) instead of CSV; see
+    transform.parquet_output for the schema and the matching Athena DDL.
+    """
+    if output_format not in ("csv", "parquet"):
+        raise ValueError(f"Unsupported output_format: {output_format}")
+
+    if backend == "pandas":
+        # 1. Load raw data (string columns parsed straight to categoricals)
+        df = pd.read_csv(input_path, dtype=READ_DTYPES)
+        # "before" is the frame a default read_csv would have built
+        read_bytes = object_bytes(df)
+        df = apply_dtype_plan(df)
+        memory_report("transform input", read_bytes, memory_bytes(df))
+
+        df = transform_df(df)
+    else:
+        from transform.backends import run_backend
+        df = run_backend(input_path, backend)
+
+    result_bytes = object_bytes(df)
+    df = apply_dtype_plan(df)
+    memory_report("transform output", result_bytes, memory_bytes(df))
+
+    if dedup_index:
+        from transform.dedup_index import load_dedup_index
+        index = load_dedup_index(dedup_index)
+        published = index.contains(df["track_id"])
+        print(f"Dedup index: dropping {int(published.sum())} already published tracks")
+        df = df[~published]
 
     # 5. Save
-    df.to_csv(output_path, index=False)
+    if output_format == "parquet":
+        from transform.parquet_output import TRACKS_COLUMNS, dataframe_to_table, write_parquet
+        write_parquet(dataframe_to_table(df, TRACKS_COLUMNS), output_path, compression)
+    else:
+        df.to_csv(output_path, index=False)
+
+    if dedup_index:
+        index.add(df["track_id"])
+        index.save(dedup_index)
 
     return df
 
 
+def _unified_dtypes(chunk_dtypes: dict) -> dict:
+    """
+    Pick the dtype a single full-file read_csv would have inferred for each
+    column, given the dtypes seen per chunk, so chunked output formats
+    values exactly like the in-memory path (e.g. 200000 vs 200000.0).
+    """
+    plan = {}
+    for column, seen in chunk_dtypes.items():
+        if len(seen) == 1:
+            plan[column] = next(iter(seen))
+        elif all(np.issubdtype(d, np.number) for d in seen):
+            plan[column] = np.dtype("float64")
+        else:
+            plan[column] = np.dtype("object")
+    return plan
+
+
+def _first_occurrences(chunk: pd.DataFrame, seen_track_ids: set) -> pd.DataFrame:
+    """Rows whose track_id is non-null and not seen in this or earlier chunks."""
+    chunk = chunk.dropna(subset=["track_id"])
+    chunk = chunk.drop_duplicates(subset=["track_id"])
+    chunk = chunk[~chunk["track_id"].isin(seen_track_ids)]
+    seen_track_ids.update(chunk["track_id"])
+    return chunk
+
+
+def transform_chunked(input_path: str = "tracks_raw.csv",
+                      output_path: str = "tracks_transformed.csv",
+                      chunksize: int = 100_000) -> dict:
+    """
+    Out-of-core version of transform() for inputs larger than memory.
+
+    Pass 1 streams the file once to build the track_id dedup set, the
+    per-album track counts and the dense album ranks, and to learn each
+    column's dtype. Pass 2 streams it again and writes enriched rows chunk
+    by chunk. Output is identical to transform().
+
+    Album state is O(albums); the exact dedup set is O(distinct track_ids),
+    which is the irreducible cost of exact deduplication.
+    """
+    renames = {"album": "album_name", "track": "track_name"}
+
+    # ---- Pass 1: dedup + album counts + dtype plan ----
+    seen_track_ids = set()
+    album_counts = {}
+    chunk_dtypes = {}
+    rows_in = 0
+
+    for chunk in pd.read_csv(input_path, chunksize=chunksize):
+        rows_in += len(chunk)
+        for column, dtype in chunk.dtypes.items():
+            chunk_dtypes.setdefault(column, set()).add(dtype)
+
+        chunk = _first_occurrences(chunk.rename(columns=renames), seen_track_ids)
+        if chunk["album_name"].isna().any():
+            raise ValueError("Cannot rank albums: rows with a track_id have no album_name")
+        for album, count in chunk["album_name"].value_counts(sort=False).items():
+            album_counts[album] = album_counts.get(album, 0) + count
+
+    albums = pd.Index(list(album_counts))
+    counts = np.fromiter(album_counts.values(), dtype=np.int64, count=len(album_counts))
+    distinct = np.unique(counts)
+    ranks = len(distinct) - np.searchsorted(distinct, counts)
+    del album_counts
+
+    # ---- Pass 2: enrich + write chunk by chunk ----
+    seen_track_ids = set()
+    rows_out = 0
+    reader = pd.read_csv(input_path, chunksize=chunksize, dtype=_unified_dtypes(chunk_dtypes))
+
+    for i, chunk in enumerate(reader):
+        chunk = _first_occurrences(chunk.rename(columns=renames), seen_track_ids)
+
+        chunk["duration_minutes"] = (chunk["duration_ms"] / 1000 / 60).round(2)
+        chunk["length_category"] = length_category(chunk["duration_minutes"].to_numpy())
+
+        positions = albums.get_indexer(chunk["album_name"])
+        chunk["album_track_count"] = counts[positions]
+        chunk["album_popularity_rank"] = ranks[positions].astype(int)
+
+        chunk[FINAL_COLUMNS].to_csv(
+            output_path, index=False, mode="w" if i == 0 else "a", header=(i == 0)
+        )
+        rows_out += len(chunk)
+
+    return {"rows_in": rows_in, "rows_out": rows_out, "albums": len(albums)}
+
+
+def _range_chunks(input_path: str, start: int, end: int, names: list,
+                  chunksize: int, dtype: dict | None = None):
+    from transform.csv_ranges import open_range
+    return pd.read_csv(open_range(input_path, start, end), header=None, names=names,
+                       chunksize=chunksize, dtype=dtype)
+
+
+def _scan_range(input_path: str, start: int, end: int, names: list, chunksize: int):
+    """
+    Pass 1 worker: dtypes seen per chunk, and the range's first occurrence
+    of each track_id as (row position in range, track_id, album_name).
+    """
+    renames = {"album": "album_name", "track": "track_name"}
+    chunk_dtypes = {}
+    parts = []
+
+    for chunk in _range_chunks(input_path, start, end, names, chunksize):
+        for column, dtype in chunk.dtypes.items():
+            chunk_dtypes.setdefault(column, set()).add(dtype)
+        chunk = chunk.rename(columns=renames).dropna(subset=["track_id"])
+        chunk = chunk.drop_duplicates(subset=["track_id"])
+        parts.append(chunk[["track_id", "album_name"]].assign(position=chunk.index))
+
+    if not parts:
+        return chunk_dtypes, pd.DataFrame(columns=["track_id", "album_name", "position"])
+    return chunk_dtypes, pd.concat(parts).drop_duplicates(subset=["track_id"])
+
+
+def _write_range(input_path: str, start: int, end: int, names: list, chunksize: int,
+                 dtypes: dict, keep: np.ndarray, albums: pd.Index,
+                 counts: np.ndarray, ranks: np.ndarray, part_path: str) -> int:
+    """Pass 2 worker: enrich the kept rows of one range into a headerless CSV part."""
+    renames = {"album": "album_name", "track": "track_name"}
+    rows_out = 0
+    with open(part_path, "w", encoding="utf-8", newline="") as out:
+        for chunk in _range_chunks(input_path, start, end, names, chunksize, dtypes):
+            # keep is sorted and chunks cover consecutive positions
+            lo, hi = np.searchsorted(keep, [chunk.index[0], chunk.index[0] + len(chunk)])
+            chunk = chunk.iloc[keep[lo:hi] - chunk.index[0]].rename(columns=renames)
+
+            chunk["duration_minutes"] = (chunk["duration_ms"] / 1000 / 60).round(2)
+            chunk["length_category"] = length_category(chunk["duration_minutes"].to_numpy())
+
+            positions = albums.get_indexer(chunk["album_name"])
+            chunk["album_track_count"] = counts[positions]
+            chunk["album_popularity_rank"] = ranks[positions].astype(int)
+
+            chunk[FINAL_COLUMNS].to_csv(out, index=False, header=False)
+            rows_out += len(chunk)
+    return rows_out
+
+
+def transform_parallel(input_path: str = "tracks_raw.csv",
+                       output_path: str = "tracks_transformed.csv",
+                       workers: int = os.cpu_count() or 1,
+                       chunksize: int = 100_000) -> dict:
+    """
+    Process-pool version of transform_chunked() for large uncompressed
+    CSVs. Output is identical to transform().
+
+    The file is cut into one byte range per worker on row boundaries (see
+    transform.csv_ranges), and every worker parses only its own range:
+
+    1. Each worker returns its range's dtypes and the first occurrence of
+       each track_id with its album.
+    2. The parent keeps the first occurrence across ranges (in file order),
+       counts tracks per album and builds the one dense rank table.
+    3. Each worker re-reads its range, keeps the rows picked in step 2,
+       adds the features and album aggregates and writes a CSV part; the
+       parent writes the header and appends the parts in order.
+
+    Parent memory is O(distinct track_ids), as in transform_chunked.
+    """
+    from transform.csv_ranges import byte_ranges
+    header, ranges = byte_ranges(input_path, workers)
+    names = next(csv.reader([header.decode("utf-8")]))
+    out_dir = os.path.dirname(os.path.abspath(output_path))
+
+    with ProcessPoolExecutor(max_workers=max(1, len(ranges))) as pool:
+        # ---- Pass 1: per-range dtypes + first occurrences ----
+        scans = list(pool.map(
+            _scan_range, *zip(*[(input_path, a, b, names, chunksize) for a, b in ranges])
+        ))
+
+        chunk_dtypes = {}
+        for seen, _ in scans:
+            for column, dtypes in seen.items():
+                chunk_dtypes.setdefault(column, set()).update(dtypes)
+
+        firsts = pd.concat(
+            [f.assign(part=i) for i, (_, f) in enumerate(scans)], ignore_index=True
+        ).drop_duplicates(subset=["track_id"])
+        del scans
+        if firsts["album_name"].isna().any():
+            raise ValueError("Cannot rank albums: rows with a track_id have no album_name")
+
+        album_counts = firsts["album_name"].value_counts(sort=False)
+        albums = album_counts.index
+        counts = album_counts.to_numpy()
+        distinct = np.unique(counts)
+        ranks = len(distinct) - np.searchsorted(distinct, counts)
+        keep = {part: np.sort(group["position"].to_numpy(dtype=np.int64))
+                for part, group in firsts.groupby("part")}
+        del firsts
+
+        # ---- Pass 2: enrich + write one part per range ----
+        dtypes = _unified_dtypes(chunk_dtypes)
+        with tempfile.TemporaryDirectory(dir=out_dir) as tmp:
+            part_paths = [os.path.join(tmp, f"part-{i:05d}.csv") for i in range(len(ranges))]
+            rows_out = sum(pool.map(_write_range, *zip(*[
+                (input_path, a, b, names, chunksize, dtypes,
+                 keep.get(i, np.empty(0, dtype=np.int64)), albums, counts, ranks, part_paths[i])
+                for i, (a, b) in enumerate(ranges)
+            ])))
+
+            with open(output_path, "w", encoding="utf-8", newline="") as out:
+                pd.DataFrame(columns=FINAL_COLUMNS).to_csv(out, index=False)
+                for part_path in part_paths:
+                    with open(part_path, encoding="utf-8", newline="") as part:
+                        shutil.copyfileobj(part, out)
+
+    return {"rows_out": rows_out, "albums": len(albums), "ranges": len(ranges)}
+
+
+UPDATE_COLUMNS = ["album_name", "album_track_count", "album_popularity_rank"]
+RANK_UPDATE_COLUMNS = ["album_track_count", "album_popularity_rank"]
+
+
+def transform_incremental(input_path: str,
+                          output_path: str,
+                          state_location: str,
+                          updates_path: str | None = None,
+                          rank_updates_path: str | None = None) -> dict:
+    """
+    Transform only a new batch of raw tracks against the persisted album
+    aggregates in state_location (see transform.album_state).
+
+    output_path receives the batch's new tracks (track_ids not already
+    recorded for their album) in the usual 10-column schema. Earlier
+    outputs are brought up to date with two small files:
+
+    - rank_updates_path: (album_track_count, album_popularity_rank) for
+      every count value whose dense rank shifted; apply it first, to all
+      earlier rows with that album_track_count.
+    - updates_path: (album_name, album_track_count, album_popularity_rank)
+      for every earlier album whose count changed; apply it second, by
+      album_name.
+
+    Together they give the same values transform() would compute over all
+    batches combined.
+    """
+    from transform.album_state import AlbumAggregateStore
+    store = AlbumAggregateStore.load(state_location)
+
+    df = pd.read_csv(input_path)
+    rows_in = len(df)
+    df = df.dropna(subset=["track_id"])
+    df = df.drop_duplicates(subset=["track_id"])
+    df = df.rename(columns={"album": "album_name", "track": "track_name"})
+    if df["album_name"].isna().any():
+        raise ValueError("Cannot rank albums: rows with a track_id have no album_name")
+
+    delta = store.apply(zip(df["track_id"], df["album_name"]))
+    df = df[df["track_id"].isin([tid for tid, _ in delta.new_tracks])]
+
+    df["duration_minutes"] = (df["duration_ms"] / 1000 / 60).round(2)
+    df["length_category"] = length_category(df["duration_minutes"].to_numpy())
+    df["album_track_count"] = df["album_name"].map({a: c for a, (c, _) in delta.albums.items()}).astype(int)
+    df["album_popularity_rank"] = df["album_name"].map({a: r for a, (_, r) in delta.albums.items()}).astype(int)
+    df = df[FINAL_COLUMNS]
+    df.to_csv(output_path, index=False)
+
+    # albums first seen in this batch have no earlier rows to update
+    added = df["album_name"].value_counts()
+    updates = [(album, count, rank) for album, (count, rank) in delta.albums.items()
+               if count > added[album]]
+    if updates_path:
+        pd.DataFrame(updates, columns=UPDATE_COLUMNS).to_csv(updates_path, index=False)
+    if rank_updates_path:
+        pd.DataFrame(sorted(delta.ranks.items()),
+                     columns=RANK_UPDATE_COLUMNS).to_csv(rank_updates_path, index=False)
+
+    store.save()
+
+    return {
+        "rows_in": rows_in,
+        "rows_out": len(df),
+        "albums_updated": len(updates),
+        "ranks_changed": len(delta.ranks),
+        "shards_loaded": store.shards_loaded,
+    }
+
+
 if __name__ == "__main__":
     transformed_df = transform()
     print("\nTransformed data preview:")
     print(transformed_df.head())
-    print("\nSaved to 'tracks_transformed.csv'")
\ No newline at end of file
+    print("\nSaved to 'tracks_transformed.csv'")
@@ -1,42 +1,276 @@
 """
-Simple local transformation script.
+Simple local transformation script: adds duration_minutes to raw track CSVs.
+
+Handles one file or a whole batch of historical dumps. Inputs can be
+files, globs or directories (searched recursively). .gz and .zst files
+are decompressed on read and written back in the same compression unless
+--compression says otherwise. Files are processed in parallel across
+processes; a single uncompressed file is split into row-aligned byte
+ranges that the processes transform side by side.
 
 Usage:
     python transform_spotify_tracks.py input.csv output.csv
+    python transform_spotify_tracks.py 'dumps/2023-*.csv.gz' dumps/2024/ -o transformed/ --workers 4
 """
 
-import sys
+import argparse
 import csv
+import glob
+import gzip
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import islice
 from pathlib import Path
 
+# Runnable as a script: put src/ on the path for transform.*
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from transform.csv_ranges import byte_ranges, open_range  # noqa: E402
+
+CSV_SUFFIXES = (".csv", ".csv.gz", ".csv.zst")
+COMPRESSION_SUFFIXES = {"none": "", "gzip": ".gz", "zstd": ".zst"}
 
-def transform(input_path: Path, output_path: Path):
-    with input_path.open("r", encoding="utf-8") as f_in, \
-         output_path.open("w", encoding="utf-8", newline="") as f_out:
 
-        reader = csv.DictReader(f_in)
-        fieldnames = list(reader.fieldnames) + ["duration_minutes"]
-        writer = csv.DictWriter(f_out, fieldnames=fieldnames)
-        writer.writeheader()
+# ---------- compressed I/O ----------
+def open_text(path: Path, mode: str = "r"):
+    """Open a CSV for text I/O, (de)compressing by suffix (.gz / .zst)."""
+    name = str(path)
+    if name.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8", newline="")
+    if name.endswith(".zst"):
+        try:
+            import zstandard
+        except ImportError as e:
+            raise ImportError("Reading or writing .zst files requires the zstandard package") from e
+        return zstandard.open(path, mode + "t", encoding="utf-8", newline="")
+    return open(path, mode, encoding="utf-8", newline="")
 
-        for row in reader:
+
+# ---------- row transform ----------
+def _transform_batch(rows: list, duration_idx: int | None, width: int) -> list:
+    """
+    Append duration_minutes to csv.reader list rows. duration_idx is the
+    duration_ms column (None if absent: every row gets 0.0). Blank lines
+    are dropped, short rows are padded and long rows are cut to the header
+    width, so duration_minutes always lands in its own column; unparseable
+    durations give "".
+    """
+    out = []
+    for row in rows:
+        if not row:
+            continue
+        if len(row) < width:
+            row.extend([""] * (width - len(row)))
+        elif len(row) > width:
+            del row[width:]
+        if duration_idx is None:
+            row.append(0.0)
+        else:
             try:
-                duration_ms = float(row.get("duration_ms", 0))
-                row["duration_minutes"] = round(duration_ms / 60000.0, 2)
-            except Exception:
-                row["duration_minutes"] = ""
+                row.append(round(float(row[duration_idx]) / 60000.0, 2))
+            except ValueError:
+                row.append("")
+        out.append(row)
+    return out
+
+
+def _transform_rows(f_in, f_out, duration_idx: int | None, width: int, batch_rows: int) -> int:
+    reader = csv.reader(f_in)
+    writer = csv.writer(f_out)
+    rows = 0
+    for batch in iter(lambda: list(islice(reader, batch_rows)), []):
+        batch = _transform_batch(batch, duration_idx, width)
+        writer.writerows(batch)
+        rows += len(batch)
+    return rows
+
+
+def _transform_range(input_path: str, start: int, end: int, part_path: str,
+                     duration_idx: int | None, width: int, batch_rows: int) -> int:
+    """Worker: transform one byte range of an uncompressed CSV into a headerless part."""
+    with open_range(input_path, start, end, text=True) as f_in, \
+            open(part_path, "w", encoding="utf-8", newline="") as f_out:
+        return _transform_rows(f_in, f_out, duration_idx, width, batch_rows)
+
+
+def transform(input_path: Path, output_path: Path, batch_rows: int = 50_000,
+              workers: int = 1) -> dict:
+    """
+    Add duration_minutes to every row, writing batch_rows rows at a time.
+
+    Rows stay csv.reader lists end to end (no per-row dicts). With
+    workers > 1, an uncompressed input is cut into one row-aligned byte
+    range per worker (see transform.csv_ranges); each process parses and
+    transforms its own range into a part file, and the parts are appended
+    in order, so the output is the same as with one worker. Compressed
+    inputs cannot be seeked into and always use one process.
+
+    Returns {"input", "output", "rows", "seconds"}. Raises ValueError if
+    output_path is input_path, which opening the output would truncate.
+    """
+    if Path(output_path).resolve() == Path(input_path).resolve():
+        raise ValueError(f"Output would overwrite its input: {input_path}")
+    start = time.perf_counter()
+    rows = 0
+
+    with open_text(input_path, "r") as f_in, open_text(output_path, "w") as f_out:
+        header = next(csv.reader(f_in), None)
+        if header is not None:
+            duration_idx = header.index("duration_ms") if "duration_ms" in header else None
+            csv.writer(f_out).writerow(header + ["duration_minutes"])
+            width = len(header)
+
+            if workers > 1 and str(input_path).endswith(".csv"):
+                rows = _transform_parallel(str(input_path), output_path, f_out,
+                                           duration_idx, width, batch_rows, workers)
+            else:
+                rows = _transform_rows(f_in, f_out, duration_idx, width, batch_rows)
+
+    return {
+        "input": str(input_path),
+        "output": str(output_path),
+        "rows": rows,
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def _transform_parallel(input_path: str, output_path: Path, f_out, duration_idx: int | None,
+                        width: int, batch_rows: int, workers: int) -> int:
+    _, ranges = byte_ranges(input_path, workers)
+    out_dir = os.path.dirname(os.path.abspath(output_path))
+
+    with tempfile.TemporaryDirectory(dir=out_dir) as tmp, \
+            ProcessPoolExecutor(max_workers=max(1, len(ranges))) as pool:
+        part_paths = [os.path.join(tmp, f"part-{i:05d}.csv") for i in range(len(ranges))]
+        futures = [
+            pool.submit(_transform_range, input_path, a, b, part, duration_idx, width, batch_rows)
+            for (a, b), part in zip(ranges, part_paths)
+        ]
+        rows = sum(f.result() for f in futures)
+
+        for part_path in part_paths:
+            with open(part_path, encoding="utf-8", newline="") as part:
+                shutil.copyfileobj(part, f_out)
+    return rows
+
+
+# ---------- batch CLI ----------
+def _is_csv(path: Path) -> bool:
+    return path.is_file() and path.name.endswith(CSV_SUFFIXES)
+
+
+def expand_inputs(patterns: list[str]) -> list[tuple[Path, Path]]:
+    """
+    Resolve files, globs and directories to (input path, relative output
+    path) pairs. Directory inputs keep their subdirectory layout.
+    """
+    found = {}
+    for pattern in patterns:
+        path = Path(pattern)
+        if path.is_dir():
+            for p in sorted(path.rglob("*")):
+                if _is_csv(p):
+                    found.setdefault(p, p.relative_to(path))
+        elif glob.has_magic(pattern):
+            for match in sorted(glob.glob(pattern, recursive=True)):
+                p = Path(match)
+                if _is_csv(p):
+                    found.setdefault(p, Path(p.name))
+        elif path.is_file():
+            found.setdefault(path, Path(path.name))
+        else:
+            raise FileNotFoundError(f"No such file, directory or glob match: {pattern}")
+    return list(found.items())
+
+
+def output_name(relative: Path, compression: str | None) -> Path:
+    """Same name as the input, re-suffixed if compression is forced."""
+    if compression is None:
+        return relative
+    name = relative.name
+    for suffix in (".gz", ".zst"):
+        name = name.removesuffix(suffix)
+    return relative.with_name(name + COMPRESSION_SUFFIXES[compression])
+
+
+def _report(stats: dict):
+    rate = stats["rows"] / stats["seconds"] if stats["seconds"] else 0.0
+    print(f"{stats['input']} -> {stats['output']}: "
+          f"{stats['rows']:,} rows in {stats['seconds']:.2f}s ({rate:,.0f} rows/sec)")
+
+
+def transform_many(jobs: list[tuple[Path, Path]], workers: int = 1) -> dict:
+    """
+    Transform (input, output) pairs, one file per worker process. Each
+    worker reads and writes its own file, so nothing but the small stats
+    dict crosses the process boundary. A single job is split into byte
+    ranges across the workers instead (see transform()).
+    """
+    start = time.perf_counter()
+    results = []
+
+    if workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(transform, src, dst) for src, dst in jobs]
+            for future in as_completed(futures):
+                results.append(future.result())
+                _report(results[-1])
+    else:
+        for src, dst in jobs:
+            results.append(transform(src, dst, workers=workers))
+            _report(results[-1])
+
+    seconds = time.perf_counter() - start
+    rows = sum(r["rows"] for r in results)
+    rate = rows / seconds if seconds else 0.0
+    print(f"Total: {len(results)} files, {rows:,} rows in {seconds:.2f}s ({rate:,.0f} rows/sec)")
+    return {"files": len(results), "rows": rows, "seconds": seconds}
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Add duration_minutes to raw Spotify track CSVs.")
+    parser.add_argument("inputs", nargs="+",
+                        help="input files, globs or directories (.csv, .csv.gz, .csv.zst)")
+    parser.add_argument("-o", "--output",
+                        help="output directory (or file, for a single input)")
+    parser.add_argument("-w", "--workers", type=int, default=1,
+                        help="processes: one file each, or byte ranges of a single file "
+                             "(default: 1)")
+    parser.add_argument("--compression", choices=sorted(COMPRESSION_SUFFIXES),
+                        help="force output compression (default: same as input)")
+    args = parser.parse_args(argv)
 
-            writer.writerow(row)
+    inputs = args.inputs
+    output = args.output
+    # legacy form: transform_spotify_tracks.py input.csv output.csv (output may exist)
+    if (output is None and len(inputs) == 2 and inputs[1].endswith(CSV_SUFFIXES)
+            and not glob.has_magic(inputs[1])):
+        inputs, output = inputs[:1], inputs[1]
+    if output is None:
+        parser.error("an output (-o) is required")
 
-    print(f"Transformed file written to: {output_path}")
+    pairs = expand_inputs(inputs)
+    if not pairs:
+        parser.error("no input CSV files found")
 
+    out = Path(output)
+    if len(pairs) == 1 and not out.is_dir() and out.name.endswith(CSV_SUFFIXES):
+        jobs = [(pairs[0][0], out)]
+    else:
+        jobs = [(src, out / output_name(rel, args.compression)) for src, rel in pairs]
+    for src, dst in jobs:
+        if dst.resolve() == src.resolve():
+            parser.error(f"output would overwrite its input: {src}")
+    for _, dst in jobs:
+        dst.parent.mkdir(parents=True, exist_ok=True)
 
-if _name_ == "_main_":
-    if len(sys.argv) != 3:
-        print("Usage: python transform_spotify_tracks.py input.csv output.csv")
-        sys.exit(1)
+    transform_many(jobs, workers=args.workers)
+    return 0
 
-    input_file = Path(sys.argv[1])
-    output_file = Path(sys.argv[2])
 
-    transform(input_file, output_file)
\ No newline at end of file
+if __name__ == "__main__":
+    sys.exit(main())
@@ -9,6 +9,7 @@ The goal is to support unit tests, not to fully simulate Spotify,
 AWS, or Snowflake.
 """
 
+import numpy as np
 import pytest
 import pandas as pd
 from datetime import datetime
@@ -94,6 +95,31 @@ def transformed_tracks_df():
     )
 
 
+@pytest.fixture
+def make_raw_tracks():
+    """
+    Factory for larger synthetic raw extracts: ~10% duplicate track_ids,
+    skewed album sizes and ~1% missing durations.
+    """
+    def _make(n: int, n_albums: int = 50, seed: int = 0) -> pd.DataFrame:
+        rng = np.random.default_rng(seed)
+        track_ids = rng.integers(0, int(n * 0.9) + 1, n)
+        duration_ms = rng.integers(60_000, 420_000, n).astype(float)
+        duration_ms[rng.random(n) < 0.01] = np.nan
+        return pd.DataFrame(
+            {
+                "artist": rng.choice(["Artist A", "Artist B", "Artist C"], n),
+                "album_name": [f"Album {i}" for i in rng.zipf(1.5, n) % n_albums],
+                "track_name": [f"Song {i}" for i in range(n)],
+                "track_id": [f"t{i}" for i in track_ids],
+                "duration_ms": duration_ms,
+                "explicit": rng.random(n) < 0.3,
+            }
+        )
+
+    return _make
+
+
 # -------------------------------------------------------------------
 # S3 event fixture
 # -------------------------------------------------------------------
@@ -0,0 +1,116 @@
+"""
+Unit tests for incremental extraction (src/ingestion/album_index.py and
+extract_local.extract_incremental).
+
+Focus:
+- index round-trips locally and on S3 (moto)
+- a second run only fetches tracks for new albums
+- the snapshot is rebuilt from the index
+"""
+
+from unittest.mock import Mock, patch
+
+import boto3
+from moto import mock_aws
+
+from src.ingestion.album_index import AlbumIndex
+from src.ingestion.extract_local import extract_incremental
+
+
+def _row(album_id, track_id):
+    return {
+        "artist": "Artist",
+        "artist_id": "artist_1",
+        "album_name": f"Album {album_id}",
+        "album_id": album_id,
+        "track_name": f"Song {track_id}",
+        "track_id": track_id,
+        "duration_ms": 180000,
+        "explicit": False,
+    }
+
+
+def test_album_index_round_trip_local(tmp_path):
+    index = AlbumIndex()
+    assert index.add_rows([_row("alb1", "t1"), _row("alb1", "t2")]) == 1
+
+    path = str(tmp_path / "index" / "albums.json.gz")
+    index.save(path)
+    loaded = AlbumIndex.load(path)
+
+    assert loaded.album_ids() == {"alb1"}
+    assert list(loaded.iter_rows()) == [_row("alb1", "t1"), _row("alb1", "t2")]
+
+
+@mock_aws
+def test_album_index_round_trip_s3():
+    boto3.client("s3", region_name="us-east-1").create_bucket(Bucket="test-bucket")
+    uri = "s3://test-bucket/spotify/state/album_index.json"
+
+    assert AlbumIndex.load(uri).album_ids() == frozenset()
+
+    index = AlbumIndex()
+    index.add_rows([_row("alb1", "t1")])
+    index.save(uri)
+
+    assert AlbumIndex.load(uri).album_ids() == {"alb1"}
+
+
+def _client(album_ids):
+    client = Mock()
+    client.artists.return_value = {"artists": [{"id": "artist_1", "name": "Artist"}]}
+    client.artist_albums.return_value = {
+        "items": [{"id": a, "name": f"Album {a}"} for a in album_ids]
+    }
+    client.albums.side_effect = lambda ids: {
+        "albums": [
+            {
+                "id": a,
+                "name": f"Album {a}",
+                "tracks": {"items": [{"id": f"{a}_t", "name": f"Song {a}_t",
+                                      "duration_ms": 180000, "explicit": False}]},
+            }
+            for a in ids
+        ]
+    }
+    return client
+
+
+@patch("src.ingestion.extract_local.get_spotify_client")
+def test_extract_incremental_fetches_only_new_albums(mock_get_client, tmp_path):
+    path = str(tmp_path / "album_index.json")
+
+    mock_get_client.return_value = _client(["alb1", "alb2"])
+    delta, _ = extract_incremental(path, artist_ids=["artist_1"])
+    assert len(delta) == 2
+
+    client = _client(["alb1", "alb2", "alb3"])
+    mock_get_client.return_value = client
+    delta, snapshot = extract_incremental(path, artist_ids=["artist_1"], snapshot=True)
+
+    client.albums.assert_called_once_with(["alb3"])
+    assert list(delta["album_id"]) == ["alb3"]
+    assert sorted(snapshot["album_id"]) == ["alb1", "alb2", "alb3"]
+
+
+@patch("src.ingestion.extract_local.get_spotify_client")
+def test_extract_incremental_records_albums_without_tracks(mock_get_client, tmp_path):
+    path = str(tmp_path / "album_index.json")
+    client = _client(["alb1", "empty"])
+    albums = client.albums.side_effect
+    client.albums.side_effect = lambda ids: {
+        "albums": [
+            {**a, "tracks": {"items": []}} if a["id"] == "empty" else a
+            for a in albums(ids)["albums"]
+        ]
+    }
+    mock_get_client.return_value = client
+    extract_incremental(path, artist_ids=["artist_1"])
+
+    client = _client(["alb1", "empty"])
+    mock_get_client.return_value = client
+    delta, _ = extract_incremental(path, artist_ids=["artist_1"])
+
+    assert AlbumIndex.load(path).album_ids() == {"alb1", "empty"}
+    client.albums.assert_not_called()
+    assert delta.empty
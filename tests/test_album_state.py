@@ -0,0 +1,119 @@
+"""
+Unit tests for incremental album aggregates (src/transform/album_state.py
+and transform.transform_incremental).
+
+Focus:
+- counts and dense ranks stay equal to a full recompute as batches arrive
+- rank shifts of untouched albums are reported per count value
+- only the shards of albums in a batch are read and written
+- batch outputs plus updates reproduce the full transform() output
+"""
+
+import random
+
+import pandas as pd
+
+from src.transform.album_state import AlbumAggregateStore
+from src.transform.transform import transform, transform_incremental
+
+
+def _full_ranks(album_tracks: dict) -> dict:
+    distinct = sorted({len(ids) for ids in album_tracks.values()}, reverse=True)
+    return {album: distinct.index(len(ids)) + 1 for album, ids in album_tracks.items()}
+
+
+def test_store_matches_full_recompute_after_each_batch():
+    rng = random.Random(0)
+    store = AlbumAggregateStore(shards=4)
+    album_tracks = {}
+    previous = {}
+
+    for _ in range(20):
+        # a track_id always belongs to the same album
+        pairs = [(f"t{i}", f"a{i % 30}") for i in (rng.randrange(2_000) for _ in range(100))]
+        delta = store.apply(pairs)
+        for track_id, album in pairs:
+            album_tracks.setdefault(album, set()).add(track_id)
+
+        expected = _full_ranks(album_tracks)
+        assert {a: store.rank(store.count(a)) for a in album_tracks} == expected
+        current = {a: (store.count(a), expected[a]) for a in album_tracks}
+        assert delta.albums == {a: v for a, v in current.items() if previous.get(a, (None,))[0] != v[0]}
+        # the count -> rank map covers every other album whose rank moved
+        for album, (count, rank) in previous.items():
+            if album not in delta.albums and rank != expected[album]:
+                assert delta.ranks[count] == expected[album]
+        previous = current
+
+
+def test_store_reports_rank_shift_of_untouched_albums():
+    store = AlbumAggregateStore()
+    store.apply([("t1", "big"), ("t2", "big"), ("t3", "small")])
+
+    # "new" takes count 3, pushing both existing counts down a rank
+    delta = store.apply([("t4", "new"), ("t5", "new"), ("t6", "new"), ("t4", "new")])
+
+    assert delta.albums == {"new": (3, 1)}
+    assert delta.ranks == {2: 2, 1: 3}
+    assert delta.new_tracks == [("t4", "new"), ("t5", "new"), ("t6", "new")]
+
+
+def test_store_loads_and_saves_only_touched_shards(tmp_path):
+    location = str(tmp_path / "state")
+    store = AlbumAggregateStore.load(location, shards=16)
+    store.apply([(f"t{i}", f"a{i % 40}") for i in range(200)])
+    store.save()
+    written = sorted(p.name for p in (tmp_path / "state" / "albums").iterdir())
+
+    loaded = AlbumAggregateStore.load(location)
+    assert loaded.shards_loaded == 0
+    assert loaded.rank(5) == 1 and loaded.histogram == {5: 40}
+
+    before = {name: (tmp_path / "state" / "albums" / name).stat().st_mtime_ns for name in written}
+    delta = loaded.apply([("t0", "a0"), ("t999", "a0")])
+    loaded.save()
+
+    assert loaded.shards_loaded == 1
+    assert delta.albums == {"a0": (6, 1)} and delta.ranks == {5: 2}
+    assert loaded.tracks("a0") == {f"t{i}" for i in range(0, 200, 40)} | {"t999"}
+    changed = [n for n in written
+               if (tmp_path / "state" / "albums" / n).stat().st_mtime_ns != before[n]]
+    assert len(changed) == 1
+    assert AlbumAggregateStore.load(str(tmp_path / "missing")).histogram == {}
+
+
+def test_transform_incremental_batches_match_full_transform(tmp_path, make_raw_tracks):
+    raw = make_raw_tracks(6_000, seed=3)
+    # Spotify track_ids belong to one album
+    raw["album_name"] = raw.groupby("track_id")["album_name"].transform("first")
+    raw.loc[100, "track_id"] = None
+    state = str(tmp_path / "state")
+
+    outputs = []
+    for i, batch in enumerate([raw[:2_000], raw[2_000:2_500], raw[2_500:]]):
+        batch_path = tmp_path / f"batch_{i}.csv"
+        batch.to_csv(batch_path, index=False)
+        out_path = tmp_path / f"out_{i}.csv"
+        updates_path, ranks_path = tmp_path / f"updates_{i}.csv", tmp_path / f"ranks_{i}.csv"
+
+        stats = transform_incremental(str(batch_path), str(out_path), state,
+                                      str(updates_path), str(ranks_path))
+
+        # fold this batch's rank map, then its album updates, into the earlier outputs
+        ranks = pd.read_csv(ranks_path).set_index("album_track_count")["album_popularity_rank"]
+        updates = pd.read_csv(updates_path).set_index("album_name")
+        assert (stats["albums_updated"], stats["ranks_changed"]) == (len(updates), len(ranks))
+        for out in outputs:
+            hit = out["album_track_count"].isin(ranks.index)
+            out.loc[hit, "album_popularity_rank"] = out.loc[hit, "album_track_count"].map(ranks)
+            hit = out["album_name"].isin(updates.index)
+            for column in ("album_track_count", "album_popularity_rank"):
+                out.loc[hit, column] = out.loc[hit, "album_name"].map(updates[column])
+        outputs.append(pd.read_csv(out_path))
+
+    raw_path = tmp_path / "raw.csv"
+    raw.to_csv(raw_path, index=False)
+    expected = transform(str(raw_path), str(tmp_path / "expected.csv"))
+
+    combined = pd.concat(outputs, ignore_index=True)
+    assert combined.to_csv(index=False) == expected.to_csv(index=False)
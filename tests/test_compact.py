@@ -0,0 +1,150 @@
+"""
+Unit tests for small-file compaction: src/load/compact.py
+
+Focus:
+- files are packed per closed time window up to the target size
+- track_ids are deduped across the window, newest row wins
+- a manifest is written and the inputs retired; interrupted retires resume
+  from pending/ without reading retired manifests
+"""
+
+import csv
+import gzip
+import io
+import json
+from datetime import datetime, timezone
+
+import boto3
+import pytest
+from moto import mock_aws
+
+from src.load.compact import compact_prefix, plan_compaction, resume_pending
+
+NOW = datetime(2025, 1, 3, tzinfo=timezone.utc)
+PREFIX = "spotify/processed/"
+
+
+@pytest.fixture
+def s3():
+    with mock_aws():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket="test-bucket")
+        yield client
+
+
+def _put_csv(client, name, rows, header=("artist", "track_id", "duration_ms")):
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(header)
+    writer.writerows(rows)
+    body = buf.getvalue().encode("utf-8")
+    if name.endswith(".gz"):
+        body = gzip.compress(body)
+    client.put_object(Bucket="test-bucket", Key=PREFIX + name, Body=body)
+
+
+def _keys(client, prefix):
+    resp = client.list_objects_v2(Bucket="test-bucket", Prefix=prefix)
+    return sorted(o["Key"] for o in resp.get("Contents", []))
+
+
+def _file(key, ts, size):
+    return {"key": key, "name": "tracks_transformed",
+            "ts": datetime.fromisoformat(ts).replace(tzinfo=timezone.utc), "size": size}
+
+
+def test_plan_packs_closed_windows_up_to_target():
+    files = [
+        _file("a", "2025-01-01T01:00:00", 40),
+        _file("b", "2025-01-01T02:00:00", 40),
+        _file("c", "2025-01-01T03:00:00", 40),
+        _file("big", "2025-01-01T04:00:00", 500),  # already large
+        _file("d", "2025-01-02T01:00:00", 10),     # alone in its window
+        _file("open", "2025-01-03T01:00:00", 10),  # window not closed yet
+        _file("open2", "2025-01-03T02:00:00", 10),
+    ]
+
+    plan = plan_compaction(files, target_bytes=100, window_hours=24, now=datetime(
+        2025, 1, 3, 12, tzinfo=timezone.utc))
+
+    assert len(plan) == 1
+    assert [[f["key"] for f in b] for b in plan[0]["batches"]] == [["c", "b"]]
+
+
+def test_compact_prefix_merges_dedupes_and_retires_inputs(s3):
+    _put_csv(s3, "tracks_transformed_20250101_010000.csv", [["A", "t1", "100"], ["A", "t2", "200"]])
+    _put_csv(s3, "tracks_transformed_20250101_020000.csv.gz", [["A", "t2", "250"], ["B", "t3", "300"]])
+    _put_csv(s3, "tracks_transformed_20250101_030000.csv", [["t3", "350", "B"], ["t4", "400", ""]],
+             header=("track_id", "duration_ms", "artist"))
+    _put_csv(s3, "tracks_from_airflow.csv", [["A", "t1", "100"]])  # not timestamped
+
+    manifests = compact_prefix("test-bucket", PREFIX, target_bytes=1024, now=NOW, client=s3)
+
+    assert len(manifests) == 1
+    manifest = manifests[0]
+    out_key = manifest["output"]["key"]
+    assert out_key.startswith(PREFIX + "compacted/tracks_transformed_20250101_000000_")
+    assert _keys(s3, PREFIX) == sorted([out_key, PREFIX + "tracks_from_airflow.csv"])
+
+    body = s3.get_object(Bucket="test-bucket", Key=out_key)["Body"].read().decode("utf-8")
+    rows = {r["track_id"]: r for r in csv.DictReader(io.StringIO(body))}
+    assert {t: r["duration_ms"] for t, r in rows.items()} == {
+        "t1": "100", "t2": "250", "t3": "350", "t4": "400",
+    }
+    assert rows["t3"]["artist"] == "B"
+
+    stored = json.loads(s3.get_object(
+        Bucket="test-bucket", Key=_keys(s3, "spotify/compaction/manifests/retired/")[0]
+    )["Body"].read())
+    assert _keys(s3, "spotify/compaction/manifests/pending/") == []
+    assert stored["status"] == "retired"
+    assert (stored["rows_in"], stored["rows_out"], stored["duplicates_dropped"]) == (6, 4, 2)
+    assert len(stored["inputs"]) == 3
+    head = s3.head_object(Bucket="test-bucket", Key=out_key)
+    assert head["Metadata"]["sha256"] == stored["output"]["sha256"]
+
+
+def test_compact_prefix_keeps_unicode_line_separators_in_fields(s3):
+    _put_csv(s3, "tracks_transformed_20250101_010000.csv", [["Line\u2028Sep", "t1", "100"]])
+    _put_csv(s3, "tracks_transformed_20250101_020000.csv.gz", [["Next\x85Line\x0c", "t2", "200"]])
+
+    manifest = compact_prefix("test-bucket", PREFIX, target_bytes=1024, now=NOW, client=s3)[0]
+
+    body = s3.get_object(Bucket="test-bucket", Key=manifest["output"]["key"])["Body"].read()
+    rows = list(csv.DictReader(io.StringIO(body.decode("utf-8"), newline="")))
+    assert [(r["artist"], r["track_id"]) for r in rows] == [
+        ("Next\x85Line\x0c", "t2"), ("Line\u2028Sep", "t1")]
+    assert (manifest["rows_in"], manifest["rows_out"]) == (2, 2)
+
+
+def test_dry_run_writes_nothing(s3):
+    _put_csv(s3, "tracks_transformed_20250101_010000.csv", [["A", "t1", "100"]])
+    _put_csv(s3, "tracks_transformed_20250101_020000.csv", [["A", "t2", "200"]])
+
+    manifests = compact_prefix("test-bucket", PREFIX, now=NOW, dry_run=True, client=s3)
+
+    assert len(manifests) == 1 and manifests[0]["status"] == "planned"
+    assert len(_keys(s3, PREFIX)) == 2
+    assert _keys(s3, "spotify/compaction/") == []
+
+
+def test_resume_pending_retires_inputs_of_interrupted_run(s3, monkeypatch):
+    _put_csv(s3, "tracks_transformed_20250101_010000.csv", [["A", "t1", "100"]])
+    manifest = {"status": "written",
+                "inputs": [{"key": PREFIX + "tracks_transformed_20250101_010000.csv"}]}
+    s3.put_object(Bucket="test-bucket", Key="spotify/compaction/manifests/pending/m.json",
+                  Body=json.dumps(manifest).encode("utf-8"))
+
+    assert resume_pending(s3, "test-bucket") == 1
+    assert _keys(s3, PREFIX) == []
+    assert _keys(s3, "spotify/compaction/manifests/") == ["spotify/compaction/manifests/retired/m.json"]
+    stored = json.loads(s3.get_object(
+        Bucket="test-bucket", Key="spotify/compaction/manifests/retired/m.json")["Body"].read())
+    assert stored["status"] == "retired"
+
+    # retired manifests are never listed or read again
+    reads = []
+    get_object = s3.get_object
+    monkeypatch.setattr(s3, "get_object", lambda **kw: reads.append(kw["Key"]) or get_object(**kw))
+    assert resume_pending(s3, "test-bucket") == 0
+    assert reads == []
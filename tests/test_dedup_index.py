@@ -0,0 +1,80 @@
+"""
+Unit tests for the cross-run track_id dedup index: src/transform/dedup_index.py
+
+Focus:
+- exact mode round-trips through a memory-mapped .npy
+- Bloom mode has no false negatives and roughly the configured FP rate
+- transform() publishes each track only once across runs
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.transform.dedup_index import BloomTrackIndex, ExactTrackIndex, load_dedup_index
+from src.transform.transform import transform
+
+
+def test_exact_index_round_trip_is_memory_mapped(tmp_path):
+    path = str(tmp_path / "idx" / "track_ids.npy")
+    index = load_dedup_index(path)
+    index.add(["4uLU6hMCjMI75M1A2tKUQC", "b", "a", "b"])
+    index.save(path)
+
+    loaded = load_dedup_index(path)
+
+    assert isinstance(loaded, ExactTrackIndex)
+    assert isinstance(loaded.ids, np.memmap)
+    assert len(loaded) == 3
+    assert list(loaded.contains(["a", "c", "4uLU6hMCjMI75M1A2tKUQC", "zzz"])) == [
+        True, False, True, False,
+    ]
+
+    loaded.add(["c", "a-much-longer-id-than-twenty-two-chars"])
+    assert list(loaded.contains(["c", "a-much-longer-id-than-twenty-two-chars", "a"])) == [
+        True, True, True,
+    ]
+
+
+def test_bloom_index_has_no_false_negatives_and_bounded_fp_rate(tmp_path):
+    path = str(tmp_path / "track_ids.bloom")
+    index = load_dedup_index(path, capacity=20_000, fp_rate=0.01)
+    index.add(f"t{i}" for i in range(20_000))
+    index.save(path)
+
+    loaded = load_dedup_index(path)
+
+    assert isinstance(loaded, BloomTrackIndex)
+    assert isinstance(loaded.bits, np.memmap)
+    assert loaded.contains(f"t{i}" for i in range(20_000)).all()
+    fp = loaded.contains(f"new{i}" for i in range(20_000)).mean()
+    assert fp < 0.02
+    assert loaded.expected_fp_rate() == pytest.approx(0.01, rel=0.2)
+
+
+def test_bloom_index_rejects_foreign_file(tmp_path):
+    path = tmp_path / "bad.bloom"
+    path.write_bytes(b"x" * 64)
+
+    with pytest.raises(ValueError, match="Bloom"):
+        BloomTrackIndex.load(str(path))
+
+
+@pytest.mark.parametrize("index_name", ["published.npy", "published.bloom"])
+def test_transform_publishes_each_track_once(tmp_path, make_raw_tracks, index_name):
+    index_path = str(tmp_path / index_name)
+    raw = make_raw_tracks(3_000, seed=4)
+    first_path, second_path = tmp_path / "first.csv", tmp_path / "second.csv"
+    raw[:2_000].to_csv(first_path, index=False)
+    raw.to_csv(second_path, index=False)  # a later, fuller snapshot
+
+    first = transform(str(first_path), str(tmp_path / "out1.csv"), dedup_index=index_path)
+    second = transform(str(second_path), str(tmp_path / "out2.csv"), dedup_index=index_path)
+    full = transform(str(second_path), str(tmp_path / "full.csv"))
+
+    assert not set(first["track_id"]) & set(second["track_id"])
+    assert set(first["track_id"]) | set(second["track_id"]) == set(full["track_id"])
+    # album aggregates still come from the whole snapshot
+    expected = full.set_index("track_id").loc[second["track_id"], "album_track_count"]
+    assert list(second["album_track_count"]) == list(expected)
+    assert pd.read_csv(tmp_path / "out2.csv")["track_id"].tolist() == second["track_id"].tolist()
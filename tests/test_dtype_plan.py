@@ -0,0 +1,75 @@
+"""
+Unit tests for the shared dtype plan: src/dtype_plan.py
+"""
+
+import numpy as np
+import pandas as pd
+
+from src.dtype_plan import READ_DTYPES, apply_dtype_plan, concat_compact, memory_bytes, object_bytes
+
+
+def test_plan_shrinks_memory_without_changing_csv(make_raw_tracks):
+    raw = make_raw_tracks(5_000)
+    raw["explicit"] = raw["explicit"].astype(object)
+    raw.loc[3, "explicit"] = None
+    raw["duration_minutes"] = (raw["duration_ms"] / 1000 / 60).round(2)
+    raw["album_track_count"] = np.arange(len(raw))
+    expected_csv = raw.to_csv(index=False)
+    before = memory_bytes(raw)
+
+    df = apply_dtype_plan(raw.copy())
+
+    assert df.to_csv(index=False) == expected_csv
+    assert memory_bytes(df) < before / 2
+    assert isinstance(df["artist"].dtype, pd.CategoricalDtype)
+    assert str(df["explicit"].dtype) == "boolean"
+    assert str(df["album_track_count"].dtype) == "Int16"
+    assert df["duration_minutes"].dtype == np.float32
+    # float with blanks stays float (so it still prints as 200000.0)
+    assert df["duration_ms"].dtype == np.float32
+
+
+def test_plan_keeps_floats_that_do_not_fit_float32():
+    df = apply_dtype_plan(pd.DataFrame({"duration_ms": [0.1, np.nan]}))
+
+    assert df["duration_ms"].dtype == np.float64
+
+
+def test_plan_keeps_floats_float32_would_print_differently():
+    raw = pd.DataFrame({
+        "duration_minutes": [3.5, 166666.87, 5000000.0],
+        "duration_ms": [10000020.0, 300000000.0, np.nan],
+    })
+    expected_csv = raw.to_csv(index=False)
+
+    df = apply_dtype_plan(raw.copy())
+
+    assert df.to_csv(index=False) == expected_csv
+    assert "166666.87" in expected_csv and "5000000.0" in expected_csv
+    assert df["duration_minutes"].dtype == np.float64
+    assert df["duration_ms"].dtype == np.float64
+
+
+def test_concat_compact_unions_categories():
+    frames = [
+        apply_dtype_plan(pd.DataFrame({"artist": ["A", "B"], "track_id": ["t1", "t2"]})),
+        apply_dtype_plan(pd.DataFrame({"artist": ["C", "A"], "track_id": ["t3", "t4"]})),
+    ]
+
+    df = concat_compact(frames)
+
+    assert isinstance(df["artist"].dtype, pd.CategoricalDtype)
+    assert list(df["artist"]) == ["A", "B", "C", "A"]
+    assert list(df.columns) == ["artist", "track_id"]
+
+
+def test_object_bytes_matches_a_default_read(make_raw_tracks, tmp_path):
+    raw = make_raw_tracks(3_000)
+    raw.loc[7, "artist"] = None
+    path = tmp_path / "raw.csv"
+    raw.to_csv(path, index=False)
+
+    categorical = pd.read_csv(path, dtype=READ_DTYPES)
+
+    assert object_bytes(categorical) == memory_bytes(pd.read_csv(path))
+    assert memory_bytes(categorical) < object_bytes(categorical)
@@ -13,7 +13,7 @@ import pandas as pd
 import pytest
 from unittest.mock import Mock, patch
 
-from src.ingestion.extract_local import extract
+from src.ingestion.extract_local import extract, extract_to_files
 
 
 @pytest.fixture
@@ -21,9 +21,8 @@ def mock_spotify_client():
     """Minimal mocked Spotify client"""
     client = Mock()
 
-    client.artist.return_value = {
-        "id": "artist_1",
-        "name": "Sample Artist"
+    client.artists.return_value = {
+        "artists": [{"id": "artist_1", "name": "Sample Artist"}]
     }
 
     client.artist_albums.return_value = {
@@ -33,28 +32,38 @@ def mock_spotify_client():
         ]
     }
 
-    client.album_tracks.side_effect = [
-        {
-            "items": [
-                {
-                    "id": "track_1",
-                    "name": "Song One",
-                    "duration_ms": 180000,
-                    "explicit": False,
-                }
-            ]
-        },
-        {
-            "items": [
-                {
-                    "id": "track_2",
-                    "name": "Song Two",
-                    "duration_ms": 240000,
-                    "explicit": True,
-                }
-            ]
-        },
-    ]
+    client.albums.return_value = {
+        "albums": [
+            {
+                "id": "album_1",
+                "name": "Album One",
+                "tracks": {
+                    "items": [
+                        {
+                            "id": "track_1",
+                            "name": "Song One",
+                            "duration_ms": 180000,
+                            "explicit": False,
+                        }
+                    ]
+                },
+            },
+            {
+                "id": "album_2",
+                "name": "Album Two",
+                "tracks": {
+                    "items": [
+                        {
+                            "id": "track_2",
+                            "name": "Song Two",
+                            "duration_ms": 240000,
+                            "explicit": True,
+                        }
+                    ]
+                },
+            },
+        ]
+    }
 
     return client
 
@@ -63,7 +72,7 @@ def mock_spotify_client():
 def test_extract_returns_dataframe(mock_get_client, mock_spotify_client):
     mock_get_client.return_value = mock_spotify_client
 
-    df = extract()
+    df = extract(artist_ids=["artist_1"])
 
     assert isinstance(df, pd.DataFrame)
     assert not df.empty
@@ -73,7 +82,7 @@ def test_extract_returns_dataframe(mock_get_client, mock_spotify_client):
 def test_extract_contains_expected_columns(mock_get_client, mock_spotify_client):
     mock_get_client.return_value = mock_spotify_client
 
-    df = extract()
+    df = extract(artist_ids=["artist_1"])
 
     expected_columns = {
         "artist",
@@ -91,23 +100,171 @@ def test_extract_contains_expected_columns(mock_get_client, mock_spotify_client)
 def test_extract_handles_multiple_albums(mock_get_client, mock_spotify_client):
     mock_get_client.return_value = mock_spotify_client
 
-    df = extract()
+    df = extract(artist_ids=["artist_1"])
 
     # Two albums, one track each
     assert len(df) == 2
 
 
+@patch("src.ingestion.extract_local.get_spotify_client")
+def test_extract_blocks_use_compact_dtypes(mock_get_client, mock_spotify_client, monkeypatch):
+    import src.ingestion.extract_local as mod
+
+    monkeypatch.setattr(mod, "EXTRACT_CHUNK_ROWS", 1)  # one block per track
+    mock_get_client.return_value = mock_spotify_client
+
+    df = extract(artist_ids=["artist_1"])
+
+    assert isinstance(df["album_name"].dtype, pd.CategoricalDtype)
+    assert list(df["album_name"]) == ["Album One", "Album Two"]
+    assert str(df["duration_ms"].dtype) == "Int32"
+    assert df["explicit"].dtype == bool
+
+
 @patch("src.ingestion.extract_local.get_spotify_client")
 def test_extract_handles_empty_album_gracefully(mock_get_client):
     client = Mock()
-    client.artist.return_value = {"id": "a1", "name": "Artist"}
+    client.artists.return_value = {"artists": [{"id": "artist_1", "name": "Artist"}]}
     client.artist_albums.return_value = {
         "items": [{"id": "album_1", "name": "Empty Album"}]
     }
-    client.album_tracks.return_value = {"items": []}
+    client.albums.return_value = {
+        "albums": [{"id": "album_1", "name": "Empty Album", "tracks": {"items": []}}]
+    }
 
     mock_get_client.return_value = client
 
-    df = extract()
+    df = extract(artist_ids=["artist_1"])
 
     assert isinstance(df, pd.DataFrame)
+
+
+@patch("src.ingestion.extract_local.get_spotify_client")
+def test_extract_skips_unknown_artist_ids(mock_get_client, mock_spotify_client):
+    # Spotify returns null for IDs it does not know
+    mock_spotify_client.artists.return_value = {
+        "artists": [None, {"id": "artist_1", "name": "Sample Artist"}]
+    }
+    mock_get_client.return_value = mock_spotify_client
+
+    df = extract(artist_ids=["removed_artist", "artist_1"])
+
+    assert set(df["artist"]) == {"Sample Artist"}
+    assert len(df) == 2
+
+
+@patch("src.ingestion.extract_local.get_spotify_client")
+def test_extract_concurrent_matches_sequential(mock_get_client):
+    client = Mock()
+    client.artists.side_effect = lambda ids: {
+        "artists": [{"id": a, "name": f"Name {a}"} for a in ids]
+    }
+    client.artist_albums.side_effect = lambda artist_id, limit: {
+        "items": [{"id": f"{artist_id}_alb", "name": f"Album {artist_id}"}]
+    }
+    client.albums.side_effect = lambda ids: {
+        "albums": [
+            {
+                "id": album_id,
+                "name": f"Album {album_id}",
+                "tracks": {
+                    "items": [
+                        {"id": f"{album_id}_t{i}", "name": f"Song {i}",
+                         "duration_ms": 180000, "explicit": False}
+                        for i in range(3)
+                    ]
+                },
+            }
+            for album_id in ids
+        ]
+    }
+    mock_get_client.return_value = client
+
+    artist_ids = [f"a{i}" for i in range(10)]
+    sequential = extract(artist_ids=artist_ids, max_workers=1)
+    concurrent = extract(artist_ids=artist_ids, max_workers=4)
+
+    pd.testing.assert_frame_equal(sequential, concurrent)
+    assert list(concurrent["artist_id"].unique()) == artist_ids
+
+
+@patch("src.ingestion.extract_local.get_spotify_client")
+@pytest.mark.parametrize("prefetch", [False, True])
+def test_extract_follows_next_pages(mock_get_client, prefetch):
+    client = Mock()
+    client.artists.return_value = {"artists": [{"id": "artist_1", "name": "Artist"}]}
+
+    album_page_2 = {"items": [{"id": "album_2", "name": "Album Two"}], "next": None}
+    client.artist_albums.return_value = {
+        "items": [{"id": "album_1", "name": "Album One"}],
+        "next": "albums?offset=50",
+    }
+
+    def _track(i):
+        return {"id": f"track_{i}", "name": f"Song {i}", "duration_ms": 180000, "explicit": False}
+
+    tracks_page_2 = {"items": [_track(2)], "next": None}
+    client.albums.side_effect = lambda ids: {
+        "albums": [
+            {
+                "id": album_id,
+                "name": album_id,
+                "tracks": (
+                    {"items": [_track(1)], "next": "tracks?offset=50"}
+                    if album_id == "album_1"
+                    else {"items": [_track(3)], "next": None}
+                ),
+            }
+            for album_id in ids
+        ]
+    }
+    client.next.side_effect = lambda page: (
+        album_page_2 if page["next"].startswith("albums") else tracks_page_2
+    )
+    mock_get_client.return_value = client
+
+    df = extract(artist_ids=["artist_1"], prefetch=prefetch)
+
+    assert list(df["track_id"]) == ["track_1", "track_2", "track_3"]
+
+
+@patch("src.ingestion.extract_local.get_spotify_client")
+def test_extract_to_files_writes_chunked_files_and_manifest(mock_get_client, tmp_path):
+    client = Mock()
+    client.artists.return_value = {"artists": [{"id": "artist_1", "name": "Artist"}]}
+    client.artist_albums.return_value = {"items": [{"id": "album_1", "name": "Album"}]}
+    client.albums.return_value = {
+        "albums": [
+            {
+                "id": "album_1",
+                "name": "Album",
+                "tracks": {
+                    "items": [
+                        {"id": f"track_{i}", "name": f"Song {i}", "duration_ms": 180000, "explicit": False}
+                        for i in range(5)
+                    ]
+                },
+            }
+        ]
+    }
+    mock_get_client.return_value = client
+
+    manifest = extract_to_files(str(tmp_path), chunk_rows=2, artist_ids=["artist_1"])
+
+    assert [f["rows"] for f in manifest["files"]] == [2, 2, 1]
+    assert manifest["total_rows"] == 5
+    assert (tmp_path / "manifest.json").exists()
+
+    combined = pd.concat(pd.read_csv(f["path"]) for f in manifest["files"])
+    assert list(combined["track_id"]) == [f"track_{i}" for i in range(5)]
+
+
+def test_spotify_client_leaves_429_to_rate_limiter():
+    from src.ingestion.extract_local import get_spotify_client
+
+    client = get_spotify_client()
+    retry = client._session.get_adapter("https://api.spotify.com").max_retries
+
+    # urllib3 must not sleep on a 429 itself, even with Retry-After present
+    assert not retry.is_retry("GET", 429, has_retry_after=True)
+    assert retry.is_retry("GET", 503)
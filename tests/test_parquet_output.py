@@ -0,0 +1,35 @@
+"""
+Unit tests for Parquet output helpers: src/transform/parquet_output.py
+"""
+
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from src.transform.parquet_output import PARQUET_TABLES, athena_ddl  # noqa: E402
+
+ATHENA_TABLES = Path(__file__).resolve().parent.parent / "athena" / "tables"
+
+
+@pytest.mark.parametrize("table_name", sorted(PARQUET_TABLES))
+def test_checked_in_athena_ddl_is_up_to_date(table_name):
+    columns, location = PARQUET_TABLES[table_name]
+
+    expected = athena_ddl(table_name, columns, location)
+
+    assert (ATHENA_TABLES / f"{table_name}_ddl.sql").read_text() == expected
+    assert "STORED AS PARQUET" in expected
+
+
+def test_lambda_column_lists_match_ddl_columns():
+    import sys
+
+    sys.path.insert(0, "./lambda")
+    import spotify_lambda_ingest
+    import spotify_lambda_transform_ingest
+
+    assert spotify_lambda_ingest.PROCESSED_PARQUET_COLUMNS == PARQUET_TABLES["processed_parquet"][0]
+    assert (spotify_lambda_transform_ingest.TRANSFORMED_PARQUET_COLUMNS
+            == PARQUET_TABLES["transformed_parquet"][0])
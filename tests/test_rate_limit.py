@@ -0,0 +1,84 @@
+"""
+Unit tests for the shared Spotify rate limiter (src/ingestion/rate_limit.py).
+
+A fake clock/sleep pair keeps the tests instant and deterministic.
+"""
+
+from unittest.mock import Mock
+
+import pytest
+
+from src.ingestion.rate_limit import RateLimitedClient, RateLimiter, retry_after_seconds
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.slept = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+class Throttled(Exception):
+    """Looks like spotipy's SpotifyException for a 429."""
+
+    def __init__(self, retry_after="2"):
+        super().__init__("rate limited")
+        self.http_status = 429
+        self.headers = {"Retry-After": retry_after}
+
+
+def test_retry_after_seconds_reads_header_and_ignores_other_errors():
+    assert retry_after_seconds(Throttled("7"), attempt=0) == 7.0
+    assert retry_after_seconds(Throttled(None), attempt=3) == 8.0
+    assert retry_after_seconds(ValueError("boom"), attempt=0) is None
+
+
+def test_acquire_spaces_requests_at_configured_rate():
+    clock = FakeClock()
+    limiter = RateLimiter(rate=2, clock=clock, sleep=clock.sleep)
+
+    for _ in range(4):
+        limiter.acquire()
+
+    # burst of 2, then one token every 0.5s
+    assert clock.now == pytest.approx(1.0)
+    assert limiter.requests == 4
+
+
+def test_call_honors_retry_after_and_counts_retries():
+    clock = FakeClock()
+    limiter = RateLimiter(rate=10, clock=clock, sleep=clock.sleep)
+    fn = Mock(side_effect=[Throttled("3"), "ok"])
+
+    assert limiter.call(fn) == "ok"
+    assert clock.now >= 3.0
+    assert limiter.stats()["throttled"] == 1
+    assert limiter.stats()["retried"] == 1
+    assert limiter.rate < limiter.max_rate
+
+
+def test_call_gives_up_after_max_retries():
+    clock = FakeClock()
+    limiter = RateLimiter(rate=10, max_retries=2, clock=clock, sleep=clock.sleep)
+    fn = Mock(side_effect=Throttled("1"))
+
+    with pytest.raises(Throttled):
+        limiter.call(fn)
+    assert fn.call_count == 3
+
+
+def test_rate_limited_client_proxies_calls_through_limiter():
+    limiter = RateLimiter(rate=100)
+    client = Mock()
+    client.artists.return_value = {"artists": []}
+
+    wrapped = RateLimitedClient(client, limiter)
+
+    assert wrapped.artists(["a"]) == {"artists": []}
+    assert limiter.requests == 1
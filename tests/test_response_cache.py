@@ -0,0 +1,115 @@
+"""
+Unit tests for the on-disk Spotify response cache (src/ingestion/response_cache.py).
+
+Focus:
+- per-endpoint TTLs (fresh vs stale)
+- LRU eviction under a size cap
+- ETag revalidation through CachedSpotify (304 -> cached body)
+"""
+
+from unittest.mock import Mock
+
+import pytest
+import requests
+
+from src.ingestion.response_cache import (
+    CachedSpotify,
+    ResponseCache,
+    endpoint_template,
+)
+
+API = "https://api.spotify.com/v1/"
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def cache(tmp_path, clock):
+    c = ResponseCache(str(tmp_path / "spotify_cache.sqlite"), clock=clock)
+    yield c
+    c.close()
+
+
+def test_endpoint_template_replaces_object_ids():
+    assert endpoint_template(API + "artists/abc123/albums?limit=50") == "artists/{id}/albums"
+    assert endpoint_template(API + "albums/?ids=a,b") == "albums"
+
+
+def test_lookup_respects_per_endpoint_ttl(cache, clock):
+    cache.store(API + "albums/?ids=a", None, {"albums": []})
+    cache.store(API + "artists/x/albums", {"limit": 50}, {"items": []})
+
+    clock.now += 7 * 3600  # past the 6h artist-albums TTL, within 7d for albums
+
+    assert cache.lookup(API + "albums/?ids=a").fresh
+    assert not cache.lookup(API + "artists/x/albums", {"limit": 50}).fresh
+    assert cache.lookup(API + "tracks/?ids=zzz") is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 2
+
+
+def test_store_evicts_least_recently_used(tmp_path, clock):
+    cache = ResponseCache(str(tmp_path / "c.sqlite"), max_bytes=10_000, clock=clock)
+
+    payload = {"items": ["x" * 50 + str(i) for i in range(200)]}
+    for i in range(20):
+        clock.now += 1
+        cache.store(API + f"albums/{i}", None, payload)
+
+    assert cache.size_bytes() <= 10_000
+    assert cache.stats()["evictions"] > 0
+    assert cache.lookup(API + "albums/0") is None
+    assert cache.lookup(API + "albums/19") is not None
+    cache.close()
+
+
+def test_size_total_is_tracked_across_replaces_and_reopen(tmp_path, clock):
+    path = str(tmp_path / "c.sqlite")
+    cache = ResponseCache(path, clock=clock)
+    cache.store(API + "albums/1", None, {"items": list(range(100))})
+    cache.store(API + "albums/1", None, {"items": [1]})  # replaced, not added
+    cache.store(API + "albums/2", None, {"items": [2]})
+
+    expected = cache._conn.execute("SELECT SUM(size) FROM responses").fetchone()[0]
+    assert cache.size_bytes() == expected
+    cache.close()
+
+    assert ResponseCache(path, clock=clock).size_bytes() == expected
+
+
+def _response(status, body=None, etag=None):
+    resp = Mock()
+    resp.status_code = status
+    resp.ok = status < 400
+    resp.json.return_value = body
+    resp.headers = {"ETag": etag} if etag else {}
+    return resp
+
+
+def test_cached_spotify_serves_hits_and_revalidates_with_etag(cache, clock):
+    session = Mock(spec=requests.Session)
+    session.get.return_value = _response(200, {"id": "alb1", "name": "Album"}, etag='"v1"')
+
+    sp = CachedSpotify(auth="token", requests_session=session, response_cache=cache)
+
+    assert sp.album("alb1")["name"] == "Album"
+    assert sp.album("alb1")["name"] == "Album"
+    assert session.get.call_count == 1
+
+    clock.now += 8 * 24 * 3600  # stale -> conditional GET
+    session.get.return_value = _response(304)
+
+    assert sp.album("alb1")["name"] == "Album"
+    assert session.get.call_args.kwargs["headers"]["If-None-Match"] == '"v1"'
+    assert cache.stats()["revalidated"] == 1
@@ -0,0 +1,57 @@
+"""
+Unit tests for batched Spotify catalogue lookups (src/ingestion/spotify_batch.py).
+
+Focus:
+- IDs are grouped up to each endpoint's limit
+- duplicates are requested once
+- unknown IDs (null in the payload) are dropped
+"""
+
+from unittest.mock import Mock
+
+from src.ingestion.spotify_batch import (
+    chunked,
+    fetch_albums,
+    fetch_artists,
+    fetch_tracks,
+)
+
+
+def test_chunked_splits_into_fixed_size_batches():
+    batches = list(chunked(range(45), 20))
+    assert [len(b) for b in batches] == [20, 20, 5]
+
+
+def test_fetch_albums_batches_twenty_ids_per_call():
+    sp = Mock()
+    sp.albums.side_effect = lambda ids: {
+        "albums": [{"id": i, "name": f"Album {i}"} for i in ids]
+    }
+
+    album_ids = [f"alb{i}" for i in range(45)]
+    albums = fetch_albums(sp, album_ids)
+
+    assert sp.albums.call_count == 3
+    assert list(albums) == album_ids
+
+
+def test_fetch_artists_and_tracks_use_fifty_id_batches():
+    sp = Mock()
+    sp.artists.side_effect = lambda ids: {"artists": [{"id": i} for i in ids]}
+    sp.tracks.side_effect = lambda ids: {"tracks": [{"id": i} for i in ids]}
+
+    fetch_artists(sp, [f"a{i}" for i in range(60)])
+    fetch_tracks(sp, [f"t{i}" for i in range(100)])
+
+    assert sp.artists.call_count == 2
+    assert sp.tracks.call_count == 2
+
+
+def test_fetch_skips_duplicates_and_unknown_ids():
+    sp = Mock()
+    sp.tracks.return_value = {"tracks": [{"id": "t1"}, None]}
+
+    tracks = fetch_tracks(sp, ["t1", "missing", "t1"])
+
+    sp.tracks.assert_called_once_with(["t1", "missing"])
+    assert list(tracks) == ["t1"]
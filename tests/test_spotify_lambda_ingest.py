@@ -32,6 +32,14 @@ from spotify_lambda_ingest import (  # noqa: E402
 # Fixtures
 # -------------------------
 
+@pytest.fixture(autouse=True)
+def clear_token_cache():
+    import spotify_lambda_ingest as mod
+    mod.reset_token_cache()
+    yield
+    mod.reset_token_cache()
+
+
 @pytest.fixture
 def token_payload():
     return {"access_token": "test_token", "token_type": "Bearer", "expires_in": 3600}
@@ -67,7 +75,7 @@ def top_tracks_payload():
 # Tests
 # -------------------------
 
-@patch("spotify_lambda_ingest.requests.post")
+@patch("spotify_lambda_ingest.http_session.post")
 def test_get_spotify_token_success(mock_post, token_payload):
     mock_resp = Mock()
     mock_resp.ok = True
@@ -79,7 +87,29 @@ def test_get_spotify_token_success(mock_post, token_payload):
     mock_post.assert_called_once()
 
 
-@patch("spotify_lambda_ingest.requests.post")
+@patch("spotify_lambda_ingest.http_session.post")
+def test_get_spotify_token_is_cached_until_expiry(mock_post, token_payload, monkeypatch):
+    import spotify_lambda_ingest as mod
+
+    mock_resp = Mock()
+    mock_resp.ok = True
+    mock_resp.json.return_value = token_payload
+    mock_post.return_value = mock_resp
+
+    now = [1000.0]
+    monkeypatch.setattr(mod.time, "time", lambda: now[0])
+
+    assert get_spotify_token() == "test_token"
+    assert get_spotify_token() == "test_token"
+    assert mock_post.call_count == 1
+
+    # past expires_in (3600s) minus the refresh margin -> refetch
+    now[0] += 3600
+    get_spotify_token()
+    assert mock_post.call_count == 2
+
+
+@patch("spotify_lambda_ingest.http_session.post")
 def test_get_spotify_token_missing_access_token_raises(mock_post):
     mock_resp = Mock()
     mock_resp.ok = True
@@ -92,9 +122,9 @@ def test_get_spotify_token_missing_access_token_raises(mock_post):
 
 @patch("spotify_lambda_ingest.get_artist_top_tracks")
 def test_fetch_rows_multiple_artists(mock_get_tracks, monkeypatch):
-    # simulate 2 artists, one track each
-    mock_get_tracks.side_effect = [
-        [
+    # simulate 2 artists, one track each (keyed by artist: calls run concurrently)
+    tracks_by_artist = {
+        "artist_a": [
             {
                 "id": "track_1",
                 "name": "Song A",
@@ -105,7 +135,7 @@ def test_fetch_rows_multiple_artists(mock_get_tracks, monkeypatch):
                 "album": {"name": "Album A", "id": "alb1", "release_date": "2020-01-01"},
             }
         ],
-        [
+        "artist_b": [
             {
                 "id": "track_2",
                 "name": "Song B",
@@ -116,7 +146,8 @@ def test_fetch_rows_multiple_artists(mock_get_tracks, monkeypatch):
                 "album": {"name": "Album B", "id": "alb2", "release_date": "2021-01-01"},
             }
         ],
-    ]
+    }
+    mock_get_tracks.side_effect = lambda artist_id, token, limiter=None: tracks_by_artist[artist_id]
 
     import spotify_lambda_ingest as mod
     original = mod.ARTIST_IDS
@@ -132,6 +163,35 @@ def test_fetch_rows_multiple_artists(mock_get_tracks, monkeypatch):
     assert rows[1]["track_id"] == "track_2"
 
 
+@patch("spotify_lambda_ingest.get_artist_top_tracks")
+def test_fetch_rows_keeps_going_when_one_artist_fails(mock_get_tracks, top_tracks_payload, monkeypatch):
+    import spotify_lambda_ingest as mod
+    monkeypatch.setattr(mod, "ARTIST_IDS", ["ok_artist", "bad_artist"])
+
+    def _tracks(artist_id, token, limiter=None):
+        if artist_id == "bad_artist":
+            raise RuntimeError("404 artist not found")
+        return top_tracks_payload["tracks"]
+
+    mock_get_tracks.side_effect = _tracks
+
+    failures = []
+    rows = fetch_rows("test_token", failures=failures, concurrency=4)
+
+    assert [r["track_id"] for r in rows] == ["track_1", "track_2"]
+    assert failures == [{"artist_id": "bad_artist", "error": "404 artist not found"}]
+
+
+@patch("spotify_lambda_ingest.get_artist_top_tracks")
+def test_fetch_rows_raises_when_every_artist_fails(mock_get_tracks, monkeypatch):
+    import spotify_lambda_ingest as mod
+    monkeypatch.setattr(mod, "ARTIST_IDS", ["a1", "a2"])
+    mock_get_tracks.side_effect = RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        fetch_rows("test_token")
+
+
 def test_transform_rows_adds_duration_and_length_category():
     raw_rows = [
         {
@@ -167,6 +227,55 @@ def test_transform_rows_adds_duration_and_length_category():
     assert out[1]["length_category"].startswith("Long")
 
 
+def test_transform_rows_incremental_matches_full_transform():
+    import spotify_lambda_ingest as mod
+
+    def row(tid, album, ms=200000):
+        return {"track_id": tid, "album_name": album, "duration_ms": ms}
+
+    batch_1 = [row("t1", "A"), row("t2", "A"), row("t3", "B"), row("t3", "B")]
+    batch_2 = [row("t2", "A"), row("t4", "B"), row("t5", "B"), row("t6", None, "bad")]
+
+    store = mod.AlbumAggregateStore()
+    first, _, _ = mod.transform_rows_incremental(batch_1, store)
+    second, album_updates, rank_updates = mod.transform_rows_incremental(batch_2, store)
+
+    assert [r["track_id"] for r in second] == ["t4", "t5", "t6"]
+    assert rank_updates == [{"album_track_count": 2, "album_popularity_rank": 2}]
+    # rank map by count first, then album updates by album
+    ranks = {u["album_track_count"]: u["album_popularity_rank"] for u in rank_updates}
+    albums = {u["album_name"]: u for u in album_updates}
+    for r in first:
+        if r["album_track_count"] in ranks:
+            r["album_popularity_rank"] = ranks[r["album_track_count"]]
+        if r["album_name"] in albums:
+            r.update(albums[r["album_name"]])
+
+    assert first + second == transform_rows(batch_1 + batch_2)
+
+
+def test_iter_transform_rows_streams_dense_ranks():
+    import spotify_lambda_ingest as mod
+
+    rows = iter(
+        [{"track_id": f"t{i}", "album_name": album, "duration_ms": 200000}
+         for i, album in enumerate(["A", "A", "A", "B", "B", "C", "D", "D"])]
+        + [{"track_id": "t0", "album_name": "A"}, {"track_id": None}, {"track_id": "t9"}]
+    )
+    stats = {}
+
+    out = mod.iter_transform_rows(rows, stats)
+    first = next(out)
+
+    assert stats == {"rows_out": 9}
+    ranks = [(r.get("album_name"), r["album_track_count"], r["album_popularity_rank"])
+             for r in [first, *out]]
+    assert ranks == [
+        ("A", 3, 1), ("A", 3, 1), ("A", 3, 1), ("B", 2, 2), ("B", 2, 2),
+        ("C", 1, 3), ("D", 2, 2), ("D", 2, 2), (None, None, None),
+    ]
+
+
 @patch("spotify_lambda_ingest.s3_client.put_object")
 def test_upload_to_s3_calls_put_object(mock_put):
     mock_put.return_value = {"ResponseMetadata": {"HTTPStatusCode": 200}}
@@ -196,15 +305,61 @@ def test_upload_to_s3_calls_put_object(mock_put):
     mock_put.assert_called_once()
 
 
+@patch("spotify_lambda_ingest.s3_client.put_object")
+def test_upload_to_s3_writes_parquet(mock_put, monkeypatch):
+    pq = pytest.importorskip("pyarrow.parquet")
+    import io
+    import spotify_lambda_ingest as mod
+
+    monkeypatch.setattr(mod, "OUTPUT_FORMAT", "parquet")
+    monkeypatch.setattr(mod, "PARQUET_ROW_GROUP_ROWS", 2)
+    rows = list(mod.iter_transform_rows(
+        mod.track_to_row({"id": f"t{i}", "album": {"name": "A", "id": "a1"},
+                          "duration_ms": 200000 + i, "explicit": False})
+        for i in range(5)
+    ))
+    written_columns = list(rows[0])
+
+    key = upload_to_s3(rows)
+
+    assert key.startswith("spotify/processed_parquet/") and key.endswith(".parquet")
+    parquet = pq.ParquetFile(io.BytesIO(mock_put.call_args.kwargs["Body"]))
+    assert parquet.metadata.num_rows == 5
+    assert parquet.metadata.num_row_groups == 3
+    stats = parquet.metadata.row_group(2).column(4).statistics  # duration_ms
+    assert (stats.min, stats.max) == (200004, 200004)
+    table = parquet.read()
+    # the schema is exactly the columns the Lambda produces
+    assert table.column_names == written_columns
+    assert table.column("album_track_count").to_pylist() == [5] * 5
+    assert table.column("album_id").to_pylist() == ["a1"] * 5
+
+
+@patch("spotify_lambda_ingest.s3_client.put_object")
+def test_upload_to_s3_keeps_parquet_album_updates_out_of_processed(mock_put, monkeypatch):
+    pytest.importorskip("pyarrow.parquet")
+    import spotify_lambda_ingest as mod
+
+    monkeypatch.setattr(mod, "OUTPUT_FORMAT", "parquet")
+    updates = [{"album_name": "A", "album_track_count": 2, "album_popularity_rank": 1}]
+
+    key = upload_to_s3(updates, name="album_updates")
+    rank_key = upload_to_s3([{"album_track_count": 2, "album_popularity_rank": 1}],
+                            name="rank_updates")
+
+    for k in (key, rank_key):
+        assert k.startswith("spotify/album_updates_parquet/")
+        assert not k.startswith(mod.PARQUET_PREFIX)
+
+
 @patch("spotify_lambda_ingest.upload_to_s3")
-@patch("spotify_lambda_ingest.transform_rows")
 @patch("spotify_lambda_ingest.fetch_rows")
 @patch("spotify_lambda_ingest.get_spotify_token")
-def test_lambda_handler_success(mock_token, mock_fetch, mock_transform, mock_upload):
+def test_lambda_handler_success(mock_token, mock_fetch, mock_upload):
     mock_token.return_value = "test_token"
     mock_fetch.return_value = [{"track_id": "track_1"}]
-    mock_transform.return_value = [{"track_id": "track_1"}]
-    mock_upload.return_value = "spotify/processed/file.csv"
+    # transformed rows arrive lazily; the uploader drives the iterator
+    mock_upload.side_effect = lambda rows: list(rows) and "spotify/processed/file.csv"
 
     resp = lambda_handler({}, None)
 
@@ -212,6 +367,7 @@ def test_lambda_handler_success(mock_token, mock_fetch, mock_transform, mock_upl
     body = json.loads(resp["body"])
     assert body["row_count"] == 1
     assert "s3_key" in body
+    assert body["http"]["http_requests"] == 0
 
 
 @patch("spotify_lambda_ingest.get_spotify_token")
@@ -223,3 +379,24 @@ def test_lambda_handler_returns_500_on_error(mock_token):
     assert resp["statusCode"] == 500
     body = json.loads(resp["body"])
     assert "error" in body
+
+
+@patch("spotify_lambda_ingest.http_session.get")
+def test_get_artist_top_tracks_retries_after_429(mock_get, top_tracks_payload, monkeypatch):
+    import spotify_lambda_ingest as mod
+
+    throttled = Mock(status_code=429, headers={"Retry-After": "0"})
+    throttled.raise_for_status.side_effect = mod.requests.HTTPError(response=throttled)
+    ok = Mock(status_code=200)
+    ok.json.return_value = top_tracks_payload
+    mock_get.side_effect = [throttled, ok]
+
+    limiter = mod.RateLimiter(rate=100, sleep=lambda s: None)
+    monkeypatch.setattr(mod, "rate_limiter", limiter)
+
+    from spotify_lambda_ingest import get_artist_top_tracks
+    tracks = get_artist_top_tracks("artist_a", "test_token")
+
+    assert len(tracks) == 2
+    assert limiter.stats()["throttled"] == 1
+    assert limiter.stats()["retried"] == 1
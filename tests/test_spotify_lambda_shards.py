@@ -0,0 +1,181 @@
+"""
+Unit tests for sharded fan-out/fan-in in lambda/spotify_lambda_ingest.py
+
+The coordinator runs fully in-process: workers are invoked through
+local_invoker and S3 is provided by moto.
+"""
+
+import csv
+import gzip
+import io
+import json
+import sys
+import zlib
+
+import boto3
+import pytest
+from moto import mock_aws
+
+sys.path.insert(0, "./lambda")
+
+import spotify_lambda_ingest as mod  # noqa: E402
+
+
+def _track(artist_id, n, album):
+    return {
+        "id": f"{artist_id}_t{n}",
+        "name": f"Song {n}",
+        "duration_ms": 200000,
+        "explicit": False,
+        "popularity": 50,
+        "artists": [{"name": artist_id}],
+        "album": {"name": album, "id": album, "release_date": "2020-01-01"},
+    }
+
+
+@pytest.fixture
+def s3(monkeypatch):
+    with mock_aws():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket=mod.S3_BUCKET_NAME)
+        monkeypatch.setattr(mod, "s3_client", client)
+        yield client
+
+
+@pytest.fixture
+def fake_spotify(monkeypatch):
+    # every artist has 2 tracks on a shared album + 1 on its own album
+    def _top_tracks(artist_id, token, limiter=None):
+        return [
+            _track(artist_id, 1, "Shared Album"),
+            _track(artist_id, 2, "Shared Album"),
+            _track(artist_id, 3, f"{artist_id} Solo"),
+        ]
+
+    monkeypatch.setattr(mod, "get_spotify_token", lambda: "test_token")
+    monkeypatch.setattr(mod, "get_artist_top_tracks", _top_tracks)
+
+
+@pytest.mark.parametrize("strategy", ["hash", "size"])
+def test_shard_artist_ids_is_deterministic_and_complete(strategy):
+    artist_ids = [f"artist_{i}" for i in range(23)]
+
+    shards = mod.shard_artist_ids(artist_ids, 4, strategy)
+
+    assert shards == mod.shard_artist_ids(artist_ids, 4, strategy)
+    assert sorted(a for shard in shards for a in shard) == sorted(artist_ids)
+
+
+def test_coordinator_fans_out_and_merges_global_aggregates(s3, fake_spotify, monkeypatch):
+    monkeypatch.setattr(mod, "ARTIST_IDS", [f"artist_{i}" for i in range(6)])
+    payloads, responses = [], []
+
+    def invoker(payload):
+        payloads.append(payload)
+        responses.append(mod.local_invoker(payload))
+        return responses[-1]
+
+    result = mod.run_coordinator(
+        run_id="run1", shard_count=3, strategy="size", invoker=invoker
+    )
+
+    assert result["failed_shards"] == []
+    # the shards share one Spotify budget
+    assert sum(p["max_rps"] for p in payloads) == pytest.approx(mod.SPOTIFY_MAX_RPS)
+    # each in-process worker gets its own limiter; the shared one is untouched
+    worker_rates = [json.loads(r["body"])["rate_limit"]["current_rate"] for r in responses]
+    assert worker_rates == [round(mod.SPOTIFY_MAX_RPS / 3, 2)] * 3
+    assert mod.rate_limiter.max_rate == pytest.approx(mod.SPOTIFY_MAX_RPS)
+    assert result["shards_merged"] == 3
+    assert result["row_count"] == 18
+
+    manifest = s3.list_objects_v2(Bucket=mod.S3_BUCKET_NAME, Prefix="spotify/shards/run1/manifest/")
+    assert manifest["KeyCount"] == 3
+
+    body = s3.get_object(Bucket=mod.S3_BUCKET_NAME, Key=result["s3_key"])["Body"].read()
+    rows = list(csv.DictReader(io.StringIO(body.decode("utf-8"))))
+    shared = {r["album_track_count"] for r in rows if r["album_name"] == "Shared Album"}
+    ranks = {r["album_popularity_rank"] for r in rows if r["album_name"] == "Shared Album"}
+
+    # counted across all shards, not per shard
+    assert shared == {"12"}
+    assert ranks == {"1"}
+
+
+def test_single_run_with_album_state_uploads_updates(s3, monkeypatch):
+    monkeypatch.setattr(mod, "ALBUM_STATE_PREFIX", "spotify/state/")
+
+    first = mod.transform_and_upload(
+        [{"track_id": "t1", "album_name": "A", "duration_ms": 200000}]
+    )
+    second = mod.transform_and_upload(
+        [
+            {"track_id": "t1", "album_name": "A", "duration_ms": 200000},
+            {"track_id": "t2", "album_name": "A", "duration_ms": 200000},
+        ]
+    )
+
+    assert first["row_count"] == 1 and "updates_key" not in first
+    assert second["row_count"] == 1 and second["albums_updated"] == 1
+    assert second["ranks_updated"] == 0 and "rank_updates_key" not in second
+
+    # updates stay out of S3_PREFIX (tracks tables, transform trigger)
+    assert second["updates_key"].startswith(mod.ALBUM_UPDATES_PREFIX)
+    assert not second["updates_key"].startswith(mod.S3_PREFIX)
+    body = s3.get_object(Bucket=mod.S3_BUCKET_NAME, Key=second["updates_key"])["Body"].read()
+    updates = list(csv.DictReader(io.StringIO(body.decode("utf-8"))))
+    assert updates == [{"album_name": "A", "album_track_count": "2", "album_popularity_rank": "1"}]
+
+    summary = s3.get_object(Bucket=mod.S3_BUCKET_NAME,
+                            Key="spotify/state/summary.json")["Body"].read()
+    assert json.loads(summary)["histogram"] == {"2": 1}
+    shard = zlib.crc32(b"A") % mod.ALBUM_STATE_SHARDS
+    state = s3.get_object(Bucket=mod.S3_BUCKET_NAME,
+                          Key=f"spotify/state/albums/{shard:05d}.json.gz")["Body"].read()
+    assert json.loads(gzip.decompress(state)) == {"A": ["t1", "t2"]}
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_multipart_writer_streams_parts_with_bounded_buffer(s3, compress):
+    import gzip
+    import random
+
+    rng = random.Random(0)
+    lines = [f"{i},{rng.getrandbits(128):032x},{rng.random()}\n" for i in range(400_000)]
+    writer = mod.S3MultipartWriter(mod.S3_BUCKET_NAME, "out/big.csv", compress=compress,
+                                   part_size=mod.S3_MIN_PART_SIZE)
+
+    with writer as out:
+        for line in lines:
+            out.write(line)
+
+    body = s3.get_object(Bucket=mod.S3_BUCKET_NAME, Key="out/big.csv")["Body"].read()
+    if compress:
+        body = gzip.decompress(body)
+    assert body.decode("utf-8") == "".join(lines)
+    assert len(writer._parts) >= 2
+    # one part (plus the last write) is all that was ever buffered
+    assert writer.peak_buffer < mod.S3_MIN_PART_SIZE + 64 * 1024
+
+
+def test_multipart_writer_aborts_on_error(s3):
+    with pytest.raises(RuntimeError):
+        with mod.S3MultipartWriter(mod.S3_BUCKET_NAME, "out/broken.csv") as out:
+            out.write(b"x" * (mod.S3_MIN_PART_SIZE + 1))
+            raise RuntimeError("producer failed")
+
+    assert s3.list_multipart_uploads(Bucket=mod.S3_BUCKET_NAME).get("Uploads", []) == []
+    assert "Contents" not in s3.list_objects_v2(Bucket=mod.S3_BUCKET_NAME, Prefix="out/")
+
+
+def test_upload_to_s3_gzip_round_trip(s3, monkeypatch):
+    import gzip
+
+    monkeypatch.setattr(mod, "UPLOAD_GZIP", True)
+    rows = [{"track_id": "t1", "album_name": "A"}, {"track_id": "t2", "album_name": "B"}]
+
+    key = mod.upload_to_s3(rows)
+
+    assert key.endswith(".csv.gz")
+    body = s3.get_object(Bucket=mod.S3_BUCKET_NAME, Key=key)["Body"].read()
+    assert gzip.decompress(body).decode("utf-8") == "track_id,album_name\r\nt1,A\r\nt2,B\r\n"
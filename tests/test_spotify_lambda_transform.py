@@ -5,16 +5,17 @@ This Lambda is triggered by S3 PUT events on spotify/processed/*.csv.
 It enriches rows with:
 - duration_min (from duration_ms)
 - load_timestamp_utc (ISO timestamp)
-and writes an output CSV to spotify/transformed/*_transformed.csv
+and streams an output CSV (multipart upload) to spotify/transformed/*_transformed.csv
 
 Tests are intentionally small and focused (portfolio-friendly).
 """
 
 import csv
 import io
+import json
 import urllib.parse
 from datetime import datetime
-from unittest.mock import Mock, patch
+from unittest.mock import patch
 
 import pytest
 
@@ -79,7 +80,7 @@ def _make_event(bucket: str, key: str):
 @patch("spotify_lambda_transform_ingest.s3.put_object")
 @patch("spotify_lambda_transform_ingest.s3.get_object")
 def test_lambda_handler_processes_csv(mock_get, mock_put, sample_csv_content):
-    mock_get.return_value = {"Body": Mock(read=lambda: sample_csv_content.encode("utf-8"))}
+    mock_get.return_value = {"Body": io.BytesIO(sample_csv_content.encode("utf-8"))}
     mock_put.return_value = {}
 
     event = _make_event("test-bucket", "spotify/processed/test.csv")
@@ -99,6 +100,37 @@ def test_lambda_handler_processes_csv(mock_get, mock_put, sample_csv_content):
     assert "load_timestamp_utc" in rows[0]
 
 
+@patch("spotify_lambda_transform_ingest.s3.put_object")
+@patch("spotify_lambda_transform_ingest.s3.get_object")
+def test_lambda_handler_reads_gzipped_csv(mock_get, mock_put, sample_csv_content):
+    import gzip
+
+    mock_get.return_value = {"Body": io.BytesIO(gzip.compress(sample_csv_content.encode("utf-8")))}
+
+    resp = lambda_handler(_make_event("test-bucket", "spotify/processed/test.csv.gz"), {})
+
+    assert resp["results"][0]["status"] == "ok"
+    assert mock_put.call_args.kwargs["Key"] == "spotify/transformed/test_transformed.csv"
+    rows = list(csv.DictReader(io.StringIO(mock_put.call_args.kwargs["Body"].decode("utf-8"))))
+    assert [r["duration_min"] for r in rows] == ["3.0", "4.0"]
+
+
+@pytest.mark.parametrize("key", ["spotify/processed/test.csv", "spotify/processed/test.csv.gz"])
+@patch("spotify_lambda_transform_ingest.s3.put_object")
+@patch("spotify_lambda_transform_ingest.s3.get_object")
+def test_lambda_handler_keeps_unicode_line_separators_in_fields(mock_get, mock_put, key):
+    import gzip
+
+    raw = "artist,track_name,duration_ms\nArtist A,Line\u2028Sep\x85song,180000\n".encode("utf-8")
+    mock_get.return_value = {"Body": io.BytesIO(gzip.compress(raw) if key.endswith(".gz") else raw)}
+
+    lambda_handler(_make_event("test-bucket", key), {})
+
+    body = mock_put.call_args.kwargs["Body"].decode("utf-8")
+    rows = list(csv.DictReader(io.StringIO(body, newline="")))
+    assert [(r["track_name"], r["duration_min"]) for r in rows] == [("Line\u2028Sep\x85song", "3.0")]
+
+
 @patch("spotify_lambda_transform_ingest.s3.put_object")
 @patch("spotify_lambda_transform_ingest.s3.get_object")
 def test_lambda_handler_skips_non_csv(mock_get, mock_put):
@@ -122,10 +154,21 @@ def test_lambda_handler_skips_wrong_prefix(mock_get, mock_put):
     assert resp is None or resp.get("status") in ("ok", "skipped")
 
 
+@patch("spotify_lambda_transform_ingest.s3.put_object")
+@patch("spotify_lambda_transform_ingest.s3.get_object")
+def test_lambda_handler_skips_compaction_output(mock_get, mock_put):
+    event = _make_event("test-bucket", "spotify/processed/compacted/tracks_transformed_x.csv")
+    resp = lambda_handler(event, {})
+
+    mock_get.assert_not_called()
+    mock_put.assert_not_called()
+    assert resp["results"][0]["reason"] == "compaction output"
+
+
 @patch("spotify_lambda_transform_ingest.s3.put_object")
 @patch("spotify_lambda_transform_ingest.s3.get_object")
 def test_lambda_handler_decodes_url_encoded_key(mock_get, mock_put, sample_csv_content):
-    mock_get.return_value = {"Body": Mock(read=lambda: sample_csv_content.encode("utf-8"))}
+    mock_get.return_value = {"Body": io.BytesIO(sample_csv_content.encode("utf-8"))}
     mock_put.return_value = {}
 
     encoded_key = urllib.parse.quote_plus("spotify/processed/tracks data.csv")
@@ -140,10 +183,116 @@ def test_lambda_handler_decodes_url_encoded_key(mock_get, mock_put, sample_csv_c
 @patch("spotify_lambda_transform_ingest.s3.put_object")
 @patch("spotify_lambda_transform_ingest.s3.get_object")
 def test_lambda_handler_sets_content_type(mock_get, mock_put, sample_csv_content):
-    mock_get.return_value = {"Body": Mock(read=lambda: sample_csv_content.encode("utf-8"))}
+    mock_get.return_value = {"Body": io.BytesIO(sample_csv_content.encode("utf-8"))}
     mock_put.return_value = {}
 
     event = _make_event("test-bucket", "spotify/processed/test.csv")
     lambda_handler(event, {})
 
     assert mock_put.call_args.kwargs["ContentType"] == "text/csv"
+
+
+@patch("spotify_lambda_transform_ingest.s3.put_object")
+@patch("spotify_lambda_transform_ingest.s3.get_object")
+def test_lambda_handler_writes_parquet(mock_get, mock_put, monkeypatch):
+    pq = pytest.importorskip("pyarrow.parquet")
+    import spotify_lambda_transform_ingest as mod
+
+    monkeypatch.setattr(mod, "OUTPUT_FORMAT", "parquet")
+    body = (
+        "artist,track_id,duration_ms,explicit\n"
+        "Artist A,t1,180000.0,True\n"
+        "Artist B,t2,,False\n"
+    )
+    mock_get.return_value = {"Body": io.BytesIO(body.encode("utf-8"))}
+
+    lambda_handler(_make_event("test-bucket", "spotify/processed/test.csv"), {})
+
+    kwargs = mock_put.call_args.kwargs
+    assert kwargs["Key"] == "spotify/transformed_parquet/test_transformed.parquet"
+    table = pq.read_table(io.BytesIO(kwargs["Body"]))
+    assert table.column_names == [name for name, _ in mod.TRANSFORMED_PARQUET_COLUMNS]
+    assert table.column("duration_ms").to_pylist() == [180000, None]
+    assert table.column("explicit").to_pylist() == [True, False]
+    assert table.column("duration_min").to_pylist() == [3.0, 0.0]
+    metadata = pq.ParquetFile(io.BytesIO(kwargs["Body"])).metadata
+    assert metadata.row_group(0).column(0).compression == "ZSTD"
+    assert metadata.row_group(0).column(0).statistics.has_min_max
+
+
+def test_lambda_handler_streams_large_file_in_multipart_parts(monkeypatch):
+    boto3 = pytest.importorskip("boto3")
+    moto = pytest.importorskip("moto")
+    import spotify_lambda_transform_ingest as mod
+
+    with moto.mock_aws():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket="test-bucket")
+        monkeypatch.setattr(mod, "s3", client)
+
+        lines = ["artist,track_id,duration_ms"]
+        lines += [f"Artist {i % 7},t{i},{120000 + i}" for i in range(250_000)]
+        lines.append('"Multi\nline, artist",tz,60000')
+        client.put_object(Bucket="test-bucket", Key="spotify/processed/big.csv",
+                          Body="\n".join(lines).encode("utf-8") + b"\n")
+
+        multipart_calls = []
+        upload_part = client.upload_part
+        monkeypatch.setattr(client, "upload_part",
+                            lambda **kw: multipart_calls.append(kw["PartNumber"]) or upload_part(**kw))
+
+        lambda_handler(_make_event("test-bucket", "spotify/processed/big.csv"), {})
+
+        body = client.get_object(
+            Bucket="test-bucket", Key="spotify/transformed/big_transformed.csv"
+        )["Body"].read().decode("utf-8")
+
+    rows = list(csv.DictReader(io.StringIO(body)))
+    assert len(multipart_calls) >= 2
+    assert len(rows) == 250_001
+    assert rows[1]["duration_min"] == "2.0"
+    assert rows[-1]["artist"] == "Multi\nline, artist"
+    assert rows[-1]["duration_min"] == "1.0"
+
+
+def test_lambda_handler_processes_records_concurrently_and_isolates_failures(monkeypatch, capsys):
+    boto3 = pytest.importorskip("boto3")
+    moto = pytest.importorskip("moto")
+    import spotify_lambda_transform_ingest as mod
+
+    monkeypatch.setattr(mod, "RECORD_CONCURRENCY", 4)
+    with moto.mock_aws():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket="test-bucket")
+        monkeypatch.setattr(mod, "s3", client)
+
+        keys = [f"spotify/processed/part{i}.csv" for i in range(6)]
+        for i, key in enumerate(keys):
+            client.put_object(Bucket="test-bucket", Key=key,
+                              Body=f"track_id,duration_ms\nt{i},{60000 * (i + 1)}\n".encode())
+        keys.insert(2, "spotify/processed/missing.csv")  # never uploaded
+        keys.append("spotify/raw/other.csv")
+
+        event = {"Records": [
+            {"s3": {"bucket": {"name": "test-bucket"}, "object": {"key": k}}} for k in keys
+        ]}
+        # the bad key fails the invocation (so S3 retries it), but only after
+        # every other record has been processed
+        with pytest.raises(RuntimeError, match=r"1 of 8 records failed: .*missing\.csv.*NoSuchKey") as exc:
+            lambda_handler(event, {})
+        # successes are still reported, on the exception and as a JSON log line
+        statuses = [r["status"] for r in exc.value.results]
+        assert statuses == ["ok"] * 2 + ["error"] + ["ok"] * 4 + ["skipped"]
+        logged = json.loads(capsys.readouterr().out.strip().splitlines()[-1])
+        assert logged == {"status": "error", "results": exc.value.results}
+
+        del event["Records"][2]
+        resp = lambda_handler(event, {})
+        assert resp["status"] == "ok"
+        assert [r["key"] for r in resp["results"]] == keys[:2] + keys[3:]
+        assert [r["status"] for r in resp["results"]] == ["ok"] * 6 + ["skipped"]
+        for i in range(6):
+            body = client.get_object(
+                Bucket="test-bucket", Key=f"spotify/transformed/part{i}_transformed.csv"
+            )["Body"].read().decode("utf-8")
+            assert list(csv.DictReader(io.StringIO(body)))[0]["duration_min"] == str(float(i + 1))
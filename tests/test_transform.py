@@ -0,0 +1,204 @@
+"""
+Unit tests for the pandas transform stage: src/transform/transform.py
+
+Focus:
+- the 10-column Snowflake schema
+- length category buckets and album aggregates
+- byte-for-byte parity with the original per-row implementation
+- chunked and multi-process modes write exactly what transform() writes
+"""
+
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.transform.transform import (
+    FINAL_COLUMNS,
+    transform,
+    transform_chunked,
+    transform_df,
+    transform_parallel,
+)
+
+
+def reference_transform_df(df: pd.DataFrame) -> pd.DataFrame:
+    """The original apply/map implementation, kept as the parity oracle."""
+    df = df.dropna(subset=["track_id"])
+    df = df.drop_duplicates(subset=["track_id"])
+    df = df.rename(columns={"album": "album_name", "track": "track_name"})
+    df["duration_minutes"] = (df["duration_ms"] / 1000 / 60).round(2)
+
+    def categorize_length(m):
+        if m < 3:
+            return "Short (<3 min)"
+        elif 3 <= m <= 5:
+            return "Medium (3-5 min)"
+        else:
+            return "Long (>5 min)"
+
+    df["length_category"] = df["duration_minutes"].apply(categorize_length)
+    album_track_counts = df.groupby("album_name")["track_id"].nunique()
+    df["album_track_count"] = df["album_name"].map(album_track_counts)
+    album_rank = (
+        album_track_counts
+        .sort_values(ascending=False)
+        .rank(method="dense", ascending=False)
+    )
+    df["album_popularity_rank"] = df["album_name"].map(album_rank).astype(int)
+    return df[FINAL_COLUMNS]
+
+
+def test_transform_outputs_snowflake_schema(tmp_path, raw_tracks_csv):
+    raw = tmp_path / "tracks_raw.csv"
+    raw.write_text(raw_tracks_csv)
+
+    df = transform(str(raw), str(tmp_path / "tracks_transformed.csv"))
+
+    assert list(df.columns) == FINAL_COLUMNS
+    assert df.loc[0, "duration_minutes"] == 3.33
+    assert df.loc[0, "length_category"] == "Medium (3-5 min)"
+    assert df.loc[0, "album_track_count"] == 1
+    assert df.loc[0, "album_popularity_rank"] == 1
+
+
+def test_transform_length_buckets_and_dense_rank():
+    raw = pd.DataFrame(
+        {
+            "artist": ["A"] * 6,
+            "album_name": ["Big", "Big", "Big", "Mid", "Mid", "Small"],
+            "track_name": list("abcdef"),
+            "track_id": ["t1", "t2", "t3", "t4", "t5", "t6"],
+            "duration_ms": [120000, 180000, 300000, 300600, np.nan, 200000],
+            "explicit": [False] * 6,
+        }
+    )
+
+    df = transform_df(raw)
+
+    assert list(df["length_category"]) == [
+        "Short (<3 min)",
+        "Medium (3-5 min)",
+        "Medium (3-5 min)",
+        "Long (>5 min)",
+        "Long (>5 min)",  # NaN duration falls through to Long
+        "Medium (3-5 min)",
+    ]
+    assert list(df["album_track_count"]) == [3, 3, 3, 2, 2, 1]
+    assert list(df["album_popularity_rank"]) == [1, 1, 1, 2, 2, 3]
+
+
+@pytest.mark.parametrize("n", [1, 1_000, 20_000])
+def test_transform_matches_reference_byte_for_byte(n, make_raw_tracks):
+    raw = make_raw_tracks(n)
+
+    expected = reference_transform_df(raw.copy())
+    actual = transform_df(raw.copy())
+
+    pd.testing.assert_frame_equal(actual, expected)
+    assert actual.to_csv(index=False) == expected.to_csv(index=False)
+
+
+def test_transform_keeps_large_durations_exact(tmp_path, make_raw_tracks):
+    raw = make_raw_tracks(20)
+    raw["duration_ms"] = raw["duration_ms"].astype(float)
+    raw["track_id"] = [f"t{i}" for i in range(len(raw))]
+    raw.loc[0, "duration_ms"] = 10000012200.0   # 166666.87 minutes
+    raw.loc[1, "duration_ms"] = 300000000000.0  # 5000000.0 minutes
+    raw.loc[2, "duration_ms"] = np.nan
+    path = tmp_path / "raw.csv"
+    raw.to_csv(path, index=False)
+    out = tmp_path / "out.csv"
+
+    transform(str(path), str(out))
+
+    expected = reference_transform_df(raw.copy()).to_csv(index=False)
+    assert out.read_text() == expected
+    assert ",166666.87," in expected and ",5000000.0," in expected
+
+
+@pytest.mark.parametrize("chunksize", [97, 1_000, 100_000])
+def test_transform_chunked_matches_in_memory_output(tmp_path, chunksize, make_raw_tracks):
+    raw = make_raw_tracks(5_000, seed=1)
+    # ints in the file with blanks only near the end: early chunks parse as
+    # int64, the full read as float64
+    raw["duration_ms"] = raw["duration_ms"].fillna(200_000).astype("Int64")
+    raw.loc[4_990:, "duration_ms"] = pd.NA
+    raw["explicit"] = raw["explicit"].astype(object)
+    raw.loc[4_995, "explicit"] = None
+    raw.loc[4_996, "track_id"] = None
+
+    raw_path = tmp_path / "tracks_raw.csv"
+    raw.to_csv(raw_path, index=False)
+
+    expected_path = tmp_path / "expected.csv"
+    chunked_path = tmp_path / "chunked.csv"
+    expected = transform(str(raw_path), str(expected_path))
+
+    stats = transform_chunked(str(raw_path), str(chunked_path), chunksize=chunksize)
+
+    assert chunked_path.read_bytes() == expected_path.read_bytes()
+    assert stats["rows_out"] == len(expected)
+    assert stats["albums"] == expected["album_name"].nunique()
+
+
+@pytest.mark.parametrize("workers", [1, 3, 8])
+def test_transform_parallel_matches_in_memory_output(tmp_path, workers, make_raw_tracks):
+    raw = make_raw_tracks(5_000, seed=2)
+    # dtypes differ between ranges, and quoted commas/newlines/quotes must
+    # not be taken for row ends when the file is cut
+    raw["duration_ms"] = raw["duration_ms"].fillna(200_000).astype("Int64")
+    raw.loc[4_990:, "duration_ms"] = pd.NA
+    raw.loc[::7, "track_name"] = 'Say "hi",\nagain'
+    raw.loc[4_996, "track_id"] = None
+
+    raw_path = tmp_path / "tracks_raw.csv"
+    raw.to_csv(raw_path, index=False)
+    expected_path = tmp_path / "expected.csv"
+    parallel_path = tmp_path / "parallel.csv"
+    expected = transform(str(raw_path), str(expected_path))
+
+    stats = transform_parallel(str(raw_path), str(parallel_path), workers=workers, chunksize=500)
+
+    assert parallel_path.read_bytes() == expected_path.read_bytes()
+    assert stats["ranges"] == workers
+    assert stats["rows_out"] == len(expected)
+    assert stats["albums"] == expected["album_name"].nunique()
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["expected.csv", "parallel.csv",
+                                                          "tracks_raw.csv"]
+
+
+@pytest.mark.parametrize("compression", ["zstd", "snappy"])
+def test_transform_writes_parquet_matching_csv_values(tmp_path, make_raw_tracks, compression):
+    pq = pytest.importorskip("pyarrow.parquet")
+    raw = make_raw_tracks(2_000, seed=5)
+    raw_path = tmp_path / "tracks_raw.csv"
+    raw.to_csv(raw_path, index=False)
+
+    transform(str(raw_path), str(tmp_path / "out.csv"))
+    transform(str(raw_path), str(tmp_path / "out.parquet"),
+              output_format="parquet", compression=compression)
+
+    expected = pd.read_csv(tmp_path / "out.csv")
+    parquet = pq.ParquetFile(tmp_path / "out.parquet")
+    assert parquet.metadata.row_group(0).column(0).compression == compression.upper()
+    assert parquet.metadata.row_group(0).column(6).statistics.has_min_max
+    actual = parquet.read().to_pandas()
+    assert list(actual.columns) == FINAL_COLUMNS
+    assert actual["duration_minutes"].tolist()[:5] == expected["duration_minutes"].tolist()[:5]
+    pd.testing.assert_frame_equal(actual, expected, check_dtype=False)
+
+
+def test_transform_runs_as_a_script(tmp_path, make_raw_tracks):
+    make_raw_tracks(100).to_csv(tmp_path / "tracks_raw.csv", index=False)
+    script = os.path.join(os.path.dirname(__file__), "..", "src", "transform", "transform.py")
+    # no PYTHONPATH: the script puts src/ on the path itself
+    env = {k: v for k, v in os.environ.items() if k != "PYTHONPATH"}
+
+    subprocess.run([sys.executable, script], cwd=tmp_path, env=env, check=True,
+                   capture_output=True)
+
+    assert list(pd.read_csv(tmp_path / "tracks_transformed.csv").columns) == FINAL_COLUMNS
@@ -0,0 +1,66 @@
+"""
+Parity tests for the transform execution backends (src/transform/backends.py).
+
+polars and pyarrow results must match the pandas reference exactly,
+both as DataFrames and as written CSV. Backends that are not installed
+are skipped.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.transform.backends import BACKENDS, run_backend
+
+
+@pytest.fixture
+def raw_path(tmp_path, make_raw_tracks):
+    raw = make_raw_tracks(20_000, seed=3)
+    raw["explicit"] = raw["explicit"].astype(object)
+    raw.loc[::97, "explicit"] = None
+    raw.loc[::113, "track_id"] = None
+    raw.loc[5, "duration_ms"] = 300_300  # 5.005 min: rounding tie
+    path = tmp_path / "tracks_raw.csv"
+    raw.to_csv(path, index=False)
+    return str(path)
+
+
+@pytest.mark.parametrize("backend", [b for b in BACKENDS if b != "pandas"])
+def test_backend_matches_pandas_reference(raw_path, backend):
+    pytest.importorskip(backend)
+
+    expected = run_backend(raw_path, "pandas")
+    actual = run_backend(raw_path, backend)
+
+    assert list(actual.columns) == list(expected.columns)
+    assert actual.to_csv(index=False) == expected.to_csv(index=False)
+
+
+def test_unknown_backend_raises(raw_path):
+    with pytest.raises(ValueError):
+        run_backend(raw_path, "spark")
+
+
+def test_length_buckets_agree_on_boundaries(tmp_path):
+    pytest.importorskip("polars")
+    pytest.importorskip("pyarrow")
+
+    raw = pd.DataFrame(
+        {
+            "artist": "A",
+            "album_name": ["X", "X", "Y", "Y", "Z"],
+            "track_name": list("abcde"),
+            "track_id": [f"t{i}" for i in range(5)],
+            "duration_ms": [179_999, 180_000, 300_000, 300_001, np.nan],
+            "explicit": False,
+        }
+    )
+    path = tmp_path / "raw.csv"
+    raw.to_csv(path, index=False)
+
+    results = {b: run_backend(str(path), b) for b in BACKENDS}
+
+    for backend in ("polars", "pyarrow"):
+        assert list(results[backend]["length_category"]) == list(
+            results["pandas"]["length_category"]
+        )
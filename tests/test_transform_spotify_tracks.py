@@ -0,0 +1,129 @@
+"""
+Unit tests for the lightweight CSV transform: src/transform/transform_spotify_tracks.py
+"""
+
+import pytest
+
+from src.transform.transform_spotify_tracks import main, open_text, transform
+
+
+@pytest.fixture
+def raw_csv(tmp_path):
+    lines = ["artist,track_id,duration_ms"]
+    lines += [f"A,t{i},{60_000 + i * 997}" for i in range(1_000)]
+    lines.append("A,bad,not-a-number")
+    path = tmp_path / "raw.csv"
+    path.write_text("\n".join(lines) + "\n")
+    return path
+
+
+def test_transform_adds_duration_minutes(raw_csv, tmp_path):
+    out = tmp_path / "out.csv"
+
+    transform(raw_csv, out)
+
+    rows = out.read_text().splitlines()
+    assert rows[0] == "artist,track_id,duration_ms,duration_minutes"
+    assert rows[1] == "A,t0,60000,1.0"
+    assert rows[-1] == "A,bad,not-a-number,"
+
+
+def test_transform_batch_size_does_not_change_output(raw_csv, tmp_path):
+    whole, batched = tmp_path / "whole.csv", tmp_path / "batched.csv"
+
+    transform(raw_csv, whole)
+    transform(raw_csv, batched, batch_rows=64)
+
+    assert batched.read_bytes() == whole.read_bytes()
+
+
+@pytest.mark.parametrize("workers", [2, 5])
+def test_transform_byte_ranges_across_workers_match_one_process(raw_csv, tmp_path, workers):
+    # a quoted newline must stay inside its row when the file is cut
+    raw = tmp_path / "quoted.csv"
+    raw.write_text(raw_csv.read_text().replace("A,t500,", '"two\nlines",t500,'))
+    single, parallel = tmp_path / "single.csv", tmp_path / "parallel.csv"
+
+    transform(raw, single)
+    stats = transform(raw, parallel, batch_rows=64, workers=workers)
+
+    assert parallel.read_bytes() == single.read_bytes()
+    assert stats["rows"] == 1_001
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        "parallel.csv", "quoted.csv", "raw.csv", "single.csv"]
+
+
+def test_transform_fits_rows_to_header_and_skips_blank_lines(tmp_path):
+    raw = tmp_path / "raw.csv"
+    raw.write_text("artist,duration_ms,track_id\nA,120000,t1\n\nB\nC,60000,t3,extra,x\n")
+    out = tmp_path / "out.csv"
+
+    stats = transform(raw, out)
+
+    assert out.read_text().splitlines() == [
+        "artist,duration_ms,track_id,duration_minutes",
+        "A,120000,t1,2.0",
+        "B,,,",
+        "C,60000,t3,1.0",
+    ]
+    assert stats["rows"] == 3
+
+
+@pytest.mark.parametrize("suffix", [".csv.gz", ".csv.zst"])
+def test_transform_reads_and_writes_compressed_files(raw_csv, tmp_path, suffix):
+    pytest.importorskip("zstandard")
+    compressed = tmp_path / f"raw{suffix}"
+    with open_text(compressed, "w") as f:
+        f.write(raw_csv.read_text())
+    plain, out = tmp_path / "plain.csv", tmp_path / f"out{suffix}"
+
+    transform(raw_csv, plain)
+    transform(compressed, out)
+
+    assert out.read_bytes() != plain.read_bytes()  # really compressed
+    with open_text(out) as f:
+        assert f.read() == plain.read_bytes().decode("utf-8")
+
+
+def test_cli_processes_directories_and_globs_in_parallel(raw_csv, tmp_path, capsys):
+    dumps = tmp_path / "dumps"
+    (dumps / "2023").mkdir(parents=True)
+    (dumps / "2023" / "a.csv").write_bytes(raw_csv.read_bytes())
+    with open_text(dumps / "b.csv.gz", "w") as f:
+        f.write(raw_csv.read_text())
+    (tmp_path / "c.csv").write_bytes(raw_csv.read_bytes())
+    out_dir = tmp_path / "out"
+
+    main([str(dumps), str(tmp_path / "c*.csv"), "-o", str(out_dir),
+          "--workers", "2", "--compression", "none"])
+
+    expected = tmp_path / "expected.csv"
+    transform(raw_csv, expected)
+    for name in ("2023/a.csv", "b.csv", "c.csv"):
+        assert (out_dir / name).read_bytes() == expected.read_bytes()
+    assert "Total: 3 files, 3,003 rows" in capsys.readouterr().out
+
+
+def test_cli_keeps_legacy_input_output_form(raw_csv, tmp_path):
+    out = tmp_path / "out.csv"
+
+    assert main([str(raw_csv), str(out), "--workers", "1"]) == 0
+    assert out.read_text().startswith("artist,track_id,duration_ms,duration_minutes")
+
+    # re-running over an existing output still overwrites it
+    out.write_text("stale\n")
+    assert main([str(raw_csv), str(out)]) == 0
+    assert out.read_text().startswith("artist,track_id,duration_ms,duration_minutes")
+
+
+def test_cli_rejects_output_that_is_its_input(raw_csv, tmp_path):
+    before = raw_csv.read_bytes()
+
+    with pytest.raises(SystemExit):
+        main([str(tmp_path), "-o", str(tmp_path)])
+    with pytest.raises(SystemExit):
+        main([str(raw_csv), str(raw_csv)])
+    with pytest.raises(ValueError, match="overwrite its input"):
+        transform(raw_csv, tmp_path / "." / raw_csv.name)
+
+    assert raw_csv.read_bytes() == before
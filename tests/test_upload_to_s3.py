@@ -0,0 +1,81 @@
+"""
+Unit tests for S3 uploads: src/ingestion/upload_to_s3.py
+
+Focus:
+- the content hash lands in object metadata
+- an identical re-upload is skipped after a HEAD check, a changed file is not
+- upload_many sends a batch over one client, keeping input order
+"""
+
+import hashlib
+
+import boto3
+import pytest
+from moto import mock_aws
+
+from src.ingestion import upload_to_s3 as mod
+
+
+@pytest.fixture
+def s3():
+    with mock_aws():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket="test-bucket")
+        yield client
+
+
+def _spy_uploads(monkeypatch, client):
+    calls = []
+    upload_file = client.upload_file
+    monkeypatch.setattr(client, "upload_file",
+                        lambda *a, **kw: calls.append(a[2]) or upload_file(*a, **kw))
+    return calls
+
+
+def test_upload_stores_sha256_and_skips_identical_content(s3, tmp_path, monkeypatch):
+    path = tmp_path / "tracks_from_airflow.csv"
+    path.write_text("track_id,duration_ms\nt1,180000\n")
+    calls = _spy_uploads(monkeypatch, s3)
+
+    uri = mod.upload_csv_to_s3(str(path), "test-bucket", "spotify/processed/tracks.csv", client=s3)
+    mod.upload_csv_to_s3(str(path), "test-bucket", "spotify/processed/tracks.csv", client=s3)
+
+    assert uri == "s3://test-bucket/spotify/processed/tracks.csv"
+    assert calls == ["spotify/processed/tracks.csv"]
+    head = s3.head_object(Bucket="test-bucket", Key="spotify/processed/tracks.csv")
+    assert head["Metadata"]["sha256"] == hashlib.sha256(path.read_bytes()).hexdigest()
+
+    path.write_text("track_id,duration_ms\nt1,180000\nt2,200000\n")
+    mod.upload_csv_to_s3(str(path), "test-bucket", "spotify/processed/tracks.csv", client=s3)
+    mod.upload_csv_to_s3(str(path), "test-bucket", "spotify/processed/tracks.csv",
+                         skip_unchanged=False, client=s3)
+
+    assert len(calls) == 3
+    body = s3.get_object(Bucket="test-bucket", Key="spotify/processed/tracks.csv")["Body"].read()
+    assert body == path.read_bytes()
+
+
+def test_upload_many_shares_client_and_keeps_order(s3, tmp_path, monkeypatch):
+    paths = []
+    for i in range(5):
+        path = tmp_path / f"part{i}.csv"
+        path.write_text(f"track_id\nt{i}\n")
+        paths.append(str(path))
+    mod.upload_csv_to_s3(paths[0], "test-bucket", "spotify/processed/part0.csv", client=s3)
+    calls = _spy_uploads(monkeypatch, s3)
+
+    uris = mod.upload_many(paths, "test-bucket", "spotify/processed/", workers=3, client=s3)
+
+    assert uris == [f"s3://test-bucket/spotify/processed/part{i}.csv" for i in range(5)]
+    assert sorted(calls) == [f"spotify/processed/part{i}.csv" for i in range(1, 5)]
+    for i in range(5):
+        body = s3.get_object(Bucket="test-bucket", Key=f"spotify/processed/part{i}.csv")["Body"]
+        assert body.read() == f"track_id\nt{i}\n".encode()
+
+
+def test_transfer_config_splits_concurrency():
+    config = mod.transfer_config(max_concurrency=1)
+
+    assert config.max_request_concurrency == 1
+    assert config.use_threads is False
+    assert config.multipart_chunksize == mod.S3_MULTIPART_CHUNK_MB * 1024 * 1024